@@ -10,8 +10,8 @@ if exist __pycache__ rmdir /s /q __pycache__
 for /r %%d in (__pycache__) do @if exist "%%d" rmdir /s /q "%%d"
 del /s /q *.pyc 2>nul
 
-echo Starting Flask server on http://localhost:5000
+echo Starting production server (waitress) on http://localhost:5000
 echo Press Ctrl+C to stop the server
 echo.
-python app.py
+python serve.py
 pause
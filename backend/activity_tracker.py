@@ -0,0 +1,190 @@
+"""
+Write-coalescing tracker for user activity heartbeats
+
+Every open page sends a heartbeat every couple of minutes. Instead of writing
+users.last_activity on each one, heartbeats are recorded in memory and flushed
+to MongoDB by a background thread in one bulk_write per interval. A user whose
+last flushed time is younger than the dedupe window is not written again, so
+several tabs (or login followed by the first heartbeat) cost a single write.
+Writes use $max, so processes flushing out of order never move a time backwards.
+
+Presence ("who was active in the last N minutes", "is X active") is answered
+from a PresenceIndex: last-seen times bucketed by minute for the retention
+window. It is fed by this process's heartbeats and, on every flush cycle, by
+the last_activity values other worker processes wrote since the previous sync.
+"""
+import atexit
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+
+class PresenceIndex:
+    """Latest heartbeat per user, bucketed by minute so queries only touch recently active users"""
+
+    def __init__(self, retention_minutes: int):
+        self.retention_minutes = retention_minutes
+        self._latest: Dict[str, datetime] = {}
+        self._buckets: Dict[int, set] = {}
+
+    @staticmethod
+    def _minute(when: datetime) -> int:
+        return int(when.timestamp() // 60)
+
+    def touch(self, username: str, when: datetime):
+        """Record that a user was active at when (older times than known are ignored)"""
+        previous = self._latest.get(username)
+        if previous and previous >= when:
+            return
+        if previous:
+            bucket = self._buckets.get(self._minute(previous))
+            if bucket:
+                bucket.discard(username)
+        self._latest[username] = when
+        self._buckets.setdefault(self._minute(when), set()).add(username)
+
+    def last_seen(self, username: str) -> Optional[datetime]:
+        """Latest known activity within the retention window"""
+        return self._latest.get(username)
+
+    def active_since(self, cutoff: datetime) -> Dict[str, datetime]:
+        """Users active at or after cutoff, read from the buckets that overlap the window"""
+        self.prune(datetime.utcnow())
+        first_minute = self._minute(cutoff)
+        active = {}
+        for minute, usernames in self._buckets.items():
+            if minute < first_minute:
+                continue
+            for username in usernames:
+                when = self._latest[username]
+                if when >= cutoff:
+                    active[username] = when
+        return active
+
+    def prune(self, now: datetime):
+        """Drop buckets (and their users) older than the retention window"""
+        oldest_minute = self._minute(now - timedelta(minutes=self.retention_minutes))
+        for minute in [minute for minute in self._buckets if minute < oldest_minute]:
+            for username in self._buckets.pop(minute):
+                self._latest.pop(username, None)
+
+
+class ActivityTracker:
+    """Buffers last-activity times per user and flushes them in batches"""
+
+    def __init__(self, collection, flush_interval: float, dedupe_seconds: float, retention_minutes: int = 60):
+        self.collection = collection
+        self.flush_interval = flush_interval
+        self.dedupe_window = timedelta(seconds=dedupe_seconds)
+        self.retention_minutes = retention_minutes
+        self._lock = threading.Lock()
+        self._presence = PresenceIndex(retention_minutes)
+        self._synced_until: Optional[datetime] = None
+        self._last_written: Dict[str, datetime] = {}
+        self._pending: Dict[str, datetime] = {}
+        self._thread = None
+        self._stop = threading.Event()
+        self.heartbeats = 0
+        self.writes = 0
+
+    def record(self, username: str, when: Optional[datetime] = None):
+        """Record a heartbeat (cheap; the database write happens on the next flush)"""
+        when = when or datetime.utcnow()
+        with self._lock:
+            self.heartbeats += 1
+            self._presence.touch(username, when)
+            last_written = self._last_written.get(username)
+            if last_written is None or when - last_written >= self.dedupe_window:
+                self._pending[username] = when
+        self._ensure_started()
+
+    def last_seen(self, username: str) -> Optional[datetime]:
+        """Latest activity of a user within the retention window (None if not seen)"""
+        self._ensure_synced()
+        with self._lock:
+            return self._presence.last_seen(username)
+
+    def seen_since(self, cutoff: datetime) -> Dict[str, datetime]:
+        """Users active at or after cutoff (cutoff must lie within the retention window)"""
+        self._ensure_synced()
+        with self._lock:
+            return self._presence.active_since(cutoff)
+
+    def sync(self):
+        """Add last_activity values written since the previous sync (by any process) to the presence index"""
+        since = self._synced_until or datetime.utcnow() - timedelta(minutes=self.retention_minutes)
+        # Other processes write a heartbeat's own time up to a flush interval (plus the
+        # dedupe window) late, so re-read that overlap; touch() ignores values already seen
+        overlap = timedelta(seconds=self.flush_interval) + self.dedupe_window
+        try:
+            users = list(self.collection.find(
+                {"last_activity": {"$gt": since - overlap}},
+                {"username": 1, "last_activity": 1}
+            ))
+        except Exception as e:
+            print(f"Error syncing user activity: {e}")
+            return
+        with self._lock:
+            for user in users:
+                self._presence.touch(user["username"], user["last_activity"])
+                since = max(since, user["last_activity"])
+            self._synced_until = since
+
+    def _ensure_synced(self):
+        """Load recent activity from the database before the first presence query"""
+        if self._synced_until is None:
+            self.sync()
+            self._ensure_started()
+
+    def flush(self) -> int:
+        """Write pending heartbeats in one bulk_write; returns the number of users written"""
+        from pymongo import UpdateOne
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        try:
+            self.collection.bulk_write([
+                UpdateOne({"username": username}, {"$max": {"last_activity": when}})
+                for username, when in pending.items()
+            ], ordered=False)
+        except Exception as e:
+            print(f"Error flushing user activity: {e}")
+            with self._lock:
+                # Keep them for the next flush unless a newer heartbeat replaced them
+                for username, when in pending.items():
+                    if when > self._pending.get(username, datetime.min):
+                        self._pending[username] = when
+            return 0
+        with self._lock:
+            self._last_written.update(pending)
+            self.writes += len(pending)
+        return len(pending)
+
+    def _ensure_started(self):
+        """Start the flush thread on first use (after any fork of the worker process)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="activity-flush", daemon=True)
+            self._thread.start()
+        atexit.register(self.stop)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+            self.sync()
+
+    def stop(self):
+        """Stop the flush thread and write what is still pending"""
+        self._stop.set()
+        self.flush()
+
+    def stats(self) -> Dict:
+        """Heartbeat and write counters for monitoring"""
+        with self._lock:
+            return {"heartbeats": self.heartbeats, "writes": self.writes, "pending": len(self._pending)}
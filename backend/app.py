@@ -1,12 +1,29 @@
 """
 QEPipeline Backend - Flask API with MongoDB
 """
-from flask import Flask, jsonify, request, send_file, session
+from flask import Flask, jsonify, request, session, Response, stream_with_context, make_response
 from flask_cors import CORS
-from database import db
-from config import ADMIN_USERNAME
+from database import db, SHOT_SORT_FIELDS
+from config import ADMIN_USERNAME, SECRET_KEY, UPLOAD_CHUNK_SIZE, MAX_UPLOAD_SIZE, UPLOAD_SESSION_TTL_HOURS, FILE_CACHE_MAX_AGE
+from config import THUMBNAIL_MAX_UPLOAD_SIZE, THUMBNAIL_CACHE_MAX_AGE, AUTH_TOKEN_MAX_AGE_HOURS, BCRYPT_RETRY_AFTER_SECONDS
+from config import PRESENCE_RETENTION_MINUTES, MAX_PRESENCE_USERNAMES, MAX_SHOT_IMPORT_ROWS, MAX_SHOT_BULK_UPDATES
+from config import DELETION_BATCH_SIZE, DELETION_JOB_LEASE_SECONDS, DELETION_POLL_INTERVAL_SECONDS, DELETION_MAX_ATTEMPTS
+from config import CHAT_EVENT_STREAM_SECONDS, CHAT_EVENT_MAX_STREAMS
+from file_serving import send_media_file
+from auth import issue_token, admin_required
+from password_pool import password_pool, PasswordPoolBusy
+from chunked_uploads import ChunkError, create_part_file, write_chunk, remove_part_file
+from deletion_jobs import ProjectDeletionWorker
+import blob_store
+import thumbnails
 import os
+import json
+import hashlib
+import time
+import threading
+from functools import wraps
 from werkzeug.utils import secure_filename
+from werkzeug.exceptions import ClientDisconnected
 from bson import ObjectId
 from datetime import datetime, timezone
 
@@ -15,7 +32,8 @@ from datetime import datetime, timezone
 def create_app():
     """Create and configure Flask app"""
     app = Flask(__name__)
-    app.secret_key = os.environ.get("SECRET_KEY", "dev-secret-key-change-in-production")
+    # Signs login tokens; auth refuses to use it while it is unset or a default value
+    app.secret_key = SECRET_KEY
     
     # CORS configuration - allow all origins including Amplify and ngrok
     # Note: flask-cors handles CORS headers automatically, so we don't need to add them manually
@@ -24,6 +42,7 @@ def create_app():
          supports_credentials=True,
          allow_headers=["Content-Type", "Authorization", "ngrok-skip-browser-warning", "X-Requested-With"],
          methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+         expose_headers=["Accept-Ranges", "Content-Range", "Content-Length", "ETag", "Last-Modified"],
          max_age=3600)
     
     # Handle OPTIONS requests for CORS preflight (flask-cors handles this, but we ensure it works)
@@ -36,13 +55,103 @@ def create_app():
     # Configure upload folders
     SHOTS_UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "uploads", "shots")
     PROJECTS_UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "uploads", "projects")
+    # Partial chunked uploads (same filesystem as the targets so commits are a rename)
+    INCOMING_UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "uploads", "incoming")
     app.config['SHOTS_UPLOAD_FOLDER'] = SHOTS_UPLOAD_FOLDER
     app.config['PROJECTS_UPLOAD_FOLDER'] = PROJECTS_UPLOAD_FOLDER
+    app.config['INCOMING_UPLOAD_FOLDER'] = INCOMING_UPLOAD_FOLDER
     app.config['MAX_CONTENT_LENGTH'] = 500 * 1024 * 1024  # 500MB max file size
     
     # Create upload directories if they don't exist
     os.makedirs(SHOTS_UPLOAD_FOLDER, exist_ok=True)
     os.makedirs(PROJECTS_UPLOAD_FOLDER, exist_ok=True)
+    os.makedirs(INCOMING_UPLOAD_FOLDER, exist_ok=True)
+    
+    # Approved project deletions are carried out in the background (also resumes jobs interrupted by a restart)
+    deletion_worker = ProjectDeletionWorker(db, DELETION_BATCH_SIZE, DELETION_JOB_LEASE_SECONDS,
+                                            DELETION_POLL_INTERVAL_SECONDS, DELETION_MAX_ATTEMPTS)
+    
+    # Each open chat event stream holds a server thread; past this many, clients poll instead
+    event_stream_slots = threading.BoundedSemaphore(CHAT_EVENT_MAX_STREAMS)
+    
+    @app.before_request
+    def start_deletion_worker():
+        # Started from a request so each worker process runs its own thread
+        deletion_worker.ensure_started()
+    
+    def conditional_get(*scopes):
+        """
+        Answer If-None-Match with 304 while the data behind a GET endpoint is unchanged
+        Scopes name the change counters the response depends on; "{name}" is filled
+        from the route arguments (e.g. "chat:{username}")
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                # Tag is read before the view runs, so a concurrent write can only make it stale-low
+                version = db.get_version_tag([scope.format(**kwargs) for scope in scopes])
+                etag = None
+                if version is not None:
+                    etag = hashlib.sha1(f"{version}|{request.query_string.decode()}".encode()).hexdigest()
+                    if etag in request.if_none_match:
+                        response = make_response("", 304)
+                        response.set_etag(etag)
+                        response.headers["Cache-Control"] = "no-cache"
+                        return response
+                
+                response = make_response(view(*args, **kwargs))
+                if etag and response.status_code == 200:
+                    response.set_etag(etag)
+                    # Clients must revalidate, but may reuse the body on 304
+                    response.headers["Cache-Control"] = "no-cache"
+                return response
+            return wrapper
+        return decorator
+    
+    def password_pool_busy_response():
+        """503 telling the client to retry a login/registration once the password pool drains"""
+        response = make_response(jsonify({"error": "Server is busy, please try again shortly"}), 503)
+        response.headers["Retry-After"] = str(BCRYPT_RETRY_AFTER_SECONDS)
+        return response
+    
+    def get_page_args(default_limit=100, max_limit=500):
+        """Read limit, cursor and fields query parameters of a paginated listing"""
+        limit = request.args.get("limit", default_limit, type=int)
+        if limit is not None:
+            limit = max(1, min(limit, max_limit))
+        cursor = request.args.get("cursor") or None
+        fields = [field.strip() for field in request.args.get("fields", "").split(",") if field.strip()]
+        return limit, cursor, fields or None
+    
+    def create_file_from_blob(target_type, target_id, username, filename, file_type, digest, file_size, temp_path=None):
+        """
+        Create a files record for hashed upload data and move the data into the blob store
+        Identical content already in the store is referenced instead of stored again.
+        Returns the file ID, or None (temp_path is then left for the caller)
+        """
+        if not db.add_blob_reference(digest, file_size):
+            return None
+        
+        file_path = blob_store.blob_path(digest)
+        if target_type == "project":
+            file_id = db.create_project_file(target_id, username, filename, file_path, file_size, file_type, blob_sha256=digest)
+        else:
+            file_id = db.create_shot_file(target_id, username, filename, file_path, file_size, file_type, blob_sha256=digest)
+        
+        if not file_id:
+            if db.release_blob_reference(digest):
+                blob_store.remove_blob(db, digest)
+            return None
+        
+        if temp_path:
+            blob_store.commit_blob(temp_path, digest)
+        elif not os.path.exists(file_path):
+            # Data freed by a concurrent release before our reference counted: undo
+            db.delete_file(file_id)
+            if db.release_blob_reference(digest):
+                blob_store.remove_blob(db, digest)
+            return None
+        return file_id
     
     @app.route("/", methods=["GET"])
     def root():
@@ -98,6 +207,8 @@ def create_app():
                 "message": "Registration submitted. Awaiting admin approval."
             }), 201
             
+        except PasswordPoolBusy:
+            return password_pool_busy_response()
         except Exception as e:
             return jsonify({"error": str(e)}), 500
     
@@ -124,31 +235,31 @@ def create_app():
             if not user.get("approved", False):
                 return jsonify({"error": "Registration pending admin approval"}), 403
             
-            # Authenticate
+            # Authenticate (also records activity)
             if not db.authenticate_user(username, password):
                 return jsonify({"error": "Invalid credentials"}), 401
             
-            # Update activity on login
-            db.update_user_activity(username)
-            
+            # bcrypt runs only here; later requests present the signed token
+            # (token is None while SECRET_KEY is not configured, so admin endpoints stay closed)
+            is_admin = user.get("is_admin", False)
             return jsonify({
                 "message": "Login successful",
-                "username": username
+                "username": username,
+                "is_admin": is_admin,
+                "token": issue_token(username, is_admin),
+                "expires_in": int(AUTH_TOKEN_MAX_AGE_HOURS * 3600)
             }), 200
             
+        except PasswordPoolBusy:
+            return password_pool_busy_response()
         except Exception as e:
             return jsonify({"error": str(e)}), 500
     
     @app.route("/api/admin/pending", methods=["GET"])
+    @admin_required
     def get_pending():
         """Get pending registrations (admin only)"""
         try:
-            username = request.args.get("username")
-            password = request.args.get("password")
-            
-            if not db.is_admin(username, password):
-                return jsonify({"error": "Unauthorized"}), 401
-            
             pending = db.get_pending_registrations()
             return jsonify({"pending": pending}), 200
             
@@ -156,6 +267,7 @@ def create_app():
             return jsonify({"error": str(e)}), 500
     
     @app.route("/api/admin/approve", methods=["POST"])
+    @admin_required
     def approve_registration():
         """Approve or reject registration (admin only)"""
         try:
@@ -163,14 +275,9 @@ def create_app():
             if not data:
                 return jsonify({"error": "No data provided"}), 400
             
-            admin_username = data.get("admin_username")
-            admin_password = data.get("admin_password")
             username = data.get("username")
             approve = data.get("approve", True)
             
-            if not db.is_admin(admin_username, admin_password):
-                return jsonify({"error": "Unauthorized"}), 401
-            
             if not username:
                 return jsonify({"error": "Username is required"}), 400
             
@@ -267,6 +374,7 @@ def create_app():
             return jsonify({"error": str(e)}), 500
     
     @app.route("/api/users", methods=["GET"])
+    @conditional_get("users")
     def get_users():
         """Get all approved users (for project member selection)"""
         try:
@@ -373,6 +481,25 @@ def create_app():
         except Exception as e:
             return jsonify({"error": str(e)}), 500
     
+    @app.route("/api/users/presence", methods=["GET"])
+    def get_users_presence():
+        """Get whether specific users are active (usernames=a,b,c)"""
+        try:
+            usernames = [name.strip() for name in request.args.get("usernames", "").split(",") if name.strip()]
+            if not usernames:
+                return jsonify({"error": "usernames is required"}), 400
+            if len(usernames) > MAX_PRESENCE_USERNAMES:
+                return jsonify({"error": f"At most {MAX_PRESENCE_USERNAMES} usernames per request"}), 400
+            
+            minutes = request.args.get("minutes", 5, type=int)
+            if minutes > PRESENCE_RETENTION_MINUTES:
+                return jsonify({"error": f"minutes must be at most {PRESENCE_RETENTION_MINUTES}"}), 400
+            
+            presence = db.get_users_presence(list(dict.fromkeys(usernames)), minutes=minutes)
+            return jsonify({"presence": presence}), 200
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+    
     @app.route("/api/users/activity", methods=["POST"])
     def update_activity():
         """Update user activity (heartbeat)"""
@@ -412,6 +539,7 @@ def create_app():
             return jsonify({"error": str(e)}), 500
     
     @app.route("/api/project/<project_id>", methods=["GET"])
+    @conditional_get("projects", "users")
     def get_project(project_id):
         """Get a single project by ID"""
         try:
@@ -492,17 +620,35 @@ def create_app():
             return jsonify({"error": str(e)}), 500
     
     @app.route("/api/project/<project_id>/shots", methods=["GET"])
+    @conditional_get("shots")
     def get_shots(project_id):
-        """Get all shots for a project"""
+        """
+        Get shots for a project
+        Query: status, worker, resolution_locked / description_locked / duration_locked (true/false),
+        name_prefix, sort (created_at, updated_at or shot_name; "-" prefix for descending, default -created_at),
+        limit, cursor, fields. Without limit every matching shot is returned.
+        """
         try:
-            print(f"API: Getting shots for project_id: {project_id}")
-            shots = db.get_shots(project_id)
-            print(f"API: Returning {len(shots)} shots")
-            return jsonify({"shots": shots}), 200
+            sort = request.args.get("sort", "-created_at")
+            if sort.lstrip("-") not in SHOT_SORT_FIELDS:
+                return jsonify({"error": f"Invalid sort. Allowed: {', '.join(SHOT_SORT_FIELDS)}"}), 400
+            
+            filters = {
+                "status": request.args.get("status"),
+                "worker": request.args.get("worker"),
+                "name_prefix": request.args.get("name_prefix")
+            }
+            for lock_field in ("resolution_locked", "description_locked", "duration_locked"):
+                if lock_field in request.args:
+                    filters[lock_field] = request.args[lock_field].lower() in ("true", "1")
+            
+            limit, cursor, fields = get_page_args(default_limit=None, max_limit=1000)
+            if cursor and not db.is_valid_page_cursor(cursor, sort.lstrip("-")):
+                return jsonify({"error": "Invalid cursor"}), 400
+            
+            shots, next_cursor = db.get_shots_page(project_id, filters, sort, limit, cursor, fields)
+            return jsonify({"shots": shots, "next_cursor": next_cursor}), 200
         except Exception as e:
-            print(f"API Error getting shots: {e}")
-            import traceback
-            traceback.print_exc()
             return jsonify({"error": str(e)}), 500
     
     @app.route("/api/project/<project_id>/shots", methods=["POST"])
@@ -531,7 +677,187 @@ def create_app():
         except Exception as e:
             return jsonify({"error": str(e)}), 500
     
+    def parse_shot_import_row(index, row):
+        """Validate one import row; returns (shot fields, None) or (None, error message)"""
+        if not isinstance(row, dict):
+            return None, "Row must be an object"
+        
+        shot_name = str(row.get("shot_name") or "").strip()
+        if not shot_name:
+            return None, "Shot name is required"
+        
+        fields = {"row": index, "shot_name": shot_name, "description": str(row.get("description") or "").strip()}
+        duration = {}
+        for name in ("start_frame", "end_frame", "total_frames"):
+            value = row.get(name)
+            if value is None or value == "":
+                continue
+            try:
+                value = int(value)
+            except (ValueError, TypeError):
+                return None, f"{name} must be a number"
+            if value < 0:
+                return None, f"{name} must be non-negative"
+            duration[name] = value
+        if duration:
+            fields["duration"] = duration
+        return fields, None
+    
+    @app.route("/api/project/<project_id>/shots/import", methods=["POST"])
+    def import_shots(project_id):
+        """
+        Create many shots at once (e.g. from an EDL or CSV)
+        Body: {"shots": [{shot_name, description, start_frame, end_frame, total_frames}, ...], "dry_run": false}
+        Valid rows are created; the others are reported in errors with their row index
+        """
+        try:
+            data = request.get_json()
+            if not data:
+                return jsonify({"error": "No data provided"}), 400
+            
+            rows = data.get("shots")
+            if not isinstance(rows, list) or not rows:
+                return jsonify({"error": "shots must be a non-empty list"}), 400
+            if len(rows) > MAX_SHOT_IMPORT_ROWS:
+                return jsonify({"error": f"At most {MAX_SHOT_IMPORT_ROWS} shots per import"}), 413
+            
+            valid_rows = []
+            errors = []
+            for index, row in enumerate(rows):
+                fields, error = parse_shot_import_row(index, row)
+                if error:
+                    shot_name = row.get("shot_name") if isinstance(row, dict) else None
+                    errors.append({"row": index, "shot_name": shot_name, "error": error})
+                else:
+                    valid_rows.append(fields)
+            
+            dry_run = bool(data.get("dry_run", False))
+            result = db.create_shots(project_id, valid_rows, dry_run=dry_run) if valid_rows else {"created": [], "errors": []}
+            if result is None:
+                return jsonify({"error": "Failed to import shots or project not found"}), 404
+            
+            errors = sorted(errors + result["errors"], key=lambda error: error["row"])
+            return jsonify({
+                "message": f"{len(result['created'])} shot(s) {'valid' if dry_run else 'created'}, {len(errors)} error(s)",
+                "created": result["created"],
+                "errors": errors,
+                "dry_run": dry_run
+            }), 200 if dry_run or not result["created"] else 201
+            
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+    
+    def parse_shot_patch(patch):
+        """Validate the fields of one bulk update entry; returns (fields, None) or (None, error message)"""
+        fields = {}
+        if "description" in patch:
+            fields["description"] = str(patch["description"] or "").strip()
+        
+        if "resolution" in patch:
+            resolution = patch["resolution"]
+            if not isinstance(resolution, dict):
+                return None, "resolution must be an object with width and height"
+            try:
+                width = int(resolution.get("width"))
+                height = int(resolution.get("height"))
+            except (ValueError, TypeError):
+                return None, "Width and height must be numbers"
+            if width < 1 or height < 1:
+                return None, "Width and height must be positive numbers"
+            fields["resolution"] = {"width": width, "height": height}
+        
+        if "duration" in patch:
+            duration = patch["duration"]
+            if not isinstance(duration, dict):
+                return None, "duration must be an object"
+            frames = {}
+            for name in ("start_frame", "end_frame", "total_frames"):
+                if duration.get(name) is None:
+                    continue
+                try:
+                    frames[name] = int(duration[name])
+                except (ValueError, TypeError):
+                    return None, f"{name} must be a number"
+                if frames[name] < 0:
+                    return None, f"{name} must be non-negative"
+            if frames:
+                fields["duration"] = frames
+        
+        for lock in ("description_locked", "resolution_locked", "duration_locked"):
+            if lock in patch:
+                if not isinstance(patch[lock], bool):
+                    return None, f"{lock} must be true or false"
+                fields[lock] = patch[lock]
+        
+        if "shot_workers" in patch:
+            shot_workers = patch["shot_workers"]
+            if not isinstance(shot_workers, list) or not all(isinstance(worker, str) for worker in shot_workers):
+                return None, "shot_workers must be a list of usernames"
+            fields["shot_workers"] = shot_workers
+        
+        if not fields:
+            return None, "No fields to update"
+        return fields, None
+    
+    @app.route("/api/project/<project_id>/shots/bulk", methods=["PUT"])
+    def bulk_update_shots(project_id):
+        """
+        Update fields of many shots at once
+        Body: {"updates": [{"shot_id": ..., "description"?, "resolution"?: {width, height},
+               "duration"?: {start_frame, end_frame, total_frames}, "*_locked"?, "shot_workers"?}, ...]}
+        Changes to locked fields are refused per shot; results are returned in request order
+        """
+        try:
+            data = request.get_json()
+            if not data:
+                return jsonify({"error": "No data provided"}), 400
+            
+            updates = data.get("updates")
+            if not isinstance(updates, list) or not updates:
+                return jsonify({"error": "updates must be a non-empty list"}), 400
+            if len(updates) > MAX_SHOT_BULK_UPDATES:
+                return jsonify({"error": f"At most {MAX_SHOT_BULK_UPDATES} shots per request"}), 413
+            
+            patches = {}
+            invalid = {}
+            seen = set()
+            for index, entry in enumerate(updates):
+                shot_id = str(entry.get("shot_id") or "") if isinstance(entry, dict) else ""
+                if not shot_id:
+                    invalid[index] = "shot_id is required"
+                elif shot_id in seen:
+                    invalid[index] = "Duplicate shot_id"
+                else:
+                    seen.add(shot_id)
+                    fields, error = parse_shot_patch(entry)
+                    if error:
+                        invalid[index] = error
+                    else:
+                        patches[shot_id] = fields
+            
+            outcome = db.update_shots(project_id, patches) if patches else {}
+            if outcome is None:
+                return jsonify({"error": "Failed to update shots"}), 500
+            
+            results = []
+            for index, entry in enumerate(updates):
+                shot_id = entry.get("shot_id") if isinstance(entry, dict) else None
+                if index in invalid:
+                    results.append({"shot_id": shot_id, "status": "invalid", "error": invalid[index]})
+                else:
+                    results.append(dict(outcome[str(shot_id)], shot_id=str(shot_id)))
+            
+            updated = sum(1 for result in results if result["status"] == "updated")
+            return jsonify({
+                "message": f"{updated} of {len(results)} shot(s) updated",
+                "results": results
+            }), 200
+            
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+    
     @app.route("/api/shot/<shot_id>", methods=["GET"])
+    @conditional_get("shots", "projects")
     def get_shot(shot_id):
         """Get a single shot by ID"""
         try:
@@ -570,8 +896,15 @@ def create_app():
             if ext not in allowed_extensions:
                 return jsonify({"error": f"Invalid file type. Allowed: {', '.join(allowed_extensions)}"}), 400
             
+            # Reject oversized images before writing them
+            file.stream.seek(0, os.SEEK_END)
+            file_size = file.stream.tell()
+            file.stream.seek(0)
+            if file_size > THUMBNAIL_MAX_UPLOAD_SIZE:
+                return jsonify({"error": f"Thumbnail exceeds maximum size of {THUMBNAIL_MAX_UPLOAD_SIZE} bytes"}), 413
+            
             # Create shot directory
-            shot_dir = os.path.join(app.config['UPLOAD_FOLDER'], shot_id)
+            shot_dir = os.path.join(app.config['SHOTS_UPLOAD_FOLDER'], shot_id)
             os.makedirs(shot_dir, exist_ok=True)
             
             # Save file
@@ -579,20 +912,43 @@ def create_app():
             file_path = os.path.join(shot_dir, secure_name)
             file.save(file_path)
             
-            # Update shot with thumbnail path
-            db.update_shot_thumbnail(shot_id, file_path)
+            # Remove the previous original if it had a different extension
+            previous_path = shot.get('thumbnail_path')
+            if previous_path and previous_path != file_path and os.path.exists(previous_path):
+                os.remove(previous_path)
+            
+            # Derive the grid/card/full renditions now so the first views are cache hits
+            version = thumbnails.new_version()
+            thumbnails.generate_renditions(file_path, shot_id, version)
+            
+            # Update shot with thumbnail path and version
+            db.update_shot_thumbnail(shot_id, file_path, version)
+            thumbnails.remove_renditions(shot_id, keep_version=version)
             
-            return jsonify({"message": "Thumbnail uploaded successfully"}), 200
+            return jsonify({
+                "message": "Thumbnail uploaded successfully",
+                "thumbnail_version": version
+            }), 200
             
         except Exception as e:
             return jsonify({"error": str(e)}), 500
     
     @app.route("/api/shot/<shot_id>/thumbnail", methods=["GET"])
     def get_thumbnail(shot_id):
-        """Get thumbnail for a shot"""
+        """
+        Get thumbnail for a shot
+        Query: size (grid, card, full or original; default full), v (thumbnail_version of the shot)
+        """
         try:
-            # Check if shot exists
-            shot = db.get_shot(shot_id)
+            size = request.args.get('size', 'full')
+            if size != 'original' and size not in thumbnails.RENDITIONS:
+                return jsonify({"error": f"Invalid size. Allowed: original, {', '.join(thumbnails.RENDITIONS)}"}), 400
+            
+            # Check if shot exists (only the thumbnail fields are needed)
+            shot = None
+            if ObjectId.is_valid(shot_id):
+                shot = db.db.shots.find_one({"_id": ObjectId(shot_id)},
+                                            {"thumbnail_path": 1, "thumbnail_version": 1})
             if not shot:
                 return jsonify({"error": "Shot not found"}), 404
             
@@ -601,7 +957,19 @@ def create_app():
             if not thumbnail_path or not os.path.exists(thumbnail_path):
                 return jsonify({"error": "Thumbnail not found"}), 404
             
-            return send_file(thumbnail_path)
+            version = thumbnails.current_version(thumbnail_path, shot.get('thumbnail_version'))
+            
+            # A URL carrying the current version never changes content; anything else revalidates
+            max_age = THUMBNAIL_CACHE_MAX_AGE if request.args.get('v') == version else 0
+            
+            if size != 'original':
+                # Generated on first request when missing; without Pillow the original is served
+                rendition_path = thumbnails.generate_rendition(thumbnail_path, shot_id, version, size)
+                if rendition_path:
+                    return send_media_file(rendition_path, max_age=max_age,
+                                           mimetype=thumbnails.rendition_mimetype())
+            
+            return send_media_file(thumbnail_path, max_age=max_age)
             
         except Exception as e:
             return jsonify({"error": str(e)}), 500
@@ -619,6 +987,7 @@ def create_app():
             thumbnail_path = shot.get('thumbnail_path')
             if thumbnail_path and os.path.exists(thumbnail_path):
                 os.remove(thumbnail_path)
+            thumbnails.remove_renditions(shot_id)
             
             # Update shot to remove thumbnail path
             db.update_shot_thumbnail(shot_id, None)
@@ -628,6 +997,71 @@ def create_app():
         except Exception as e:
             return jsonify({"error": str(e)}), 500
     
+    @app.route("/api/project/<project_id>/thumbnail-sheet", methods=["GET"])
+    @conditional_get("shots")
+    def get_thumbnail_sheet(project_id):
+        """
+        Layout of a sprite sheet holding the thumbnails of a page of shots
+        Query: size (grid or card; default grid), ids (comma-separated shot IDs, in tile order),
+        limit (without ids: newest shots first, at most 400)
+        Shots without a thumbnail are left out. Without Pillow sheet_url is null and
+        each shot's versioned url is used instead.
+        """
+        try:
+            size = request.args.get('size', 'grid')
+            if size not in thumbnails.SHEET_SIZES:
+                return jsonify({"error": f"Invalid size. Allowed: {', '.join(thumbnails.SHEET_SIZES)}"}), 400
+            
+            limit = max(1, min(request.args.get('limit', 400, type=int), 400))
+            shot_ids = None
+            if request.args.get('ids'):
+                shot_ids = [shot_id.strip() for shot_id in request.args['ids'].split(',') if shot_id.strip()]
+            
+            members = []
+            for shot in db.get_shot_thumbnails(project_id, shot_ids, limit):
+                if os.path.exists(shot['thumbnail_path']):
+                    version = thumbnails.current_version(shot['thumbnail_path'], shot.get('thumbnail_version'))
+                    members.append((shot['_id'], version, shot['thumbnail_path']))
+            
+            sheet = thumbnails.build_sheet(members, size)
+            layout = sheet[1] if sheet else {}
+            cell_width, cell_height = thumbnails.RENDITIONS[size]
+            return jsonify({
+                "size": size,
+                "sheet_url": f"/api/project/{project_id}/thumbnail-sheets/{sheet[0]}" if sheet else None,
+                "cell_width": cell_width,
+                "cell_height": cell_height,
+                "shots": {
+                    shot_id: {
+                        "x": layout.get(shot_id, (0, 0))[0],
+                        "y": layout.get(shot_id, (0, 0))[1],
+                        "url": f"/api/shot/{shot_id}/thumbnail?size={size}&v={version}"
+                    }
+                    for shot_id, version, _ in members
+                }
+            }), 200
+            
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+    
+    @app.route("/api/project/<project_id>/thumbnail-sheets/<sheet_key>", methods=["GET"])
+    def get_thumbnail_sheet_image(project_id, sheet_key):
+        """Sprite sheet image; the key covers every member's thumbnail version, so it never changes"""
+        try:
+            if not thumbnails.renditions_available() or len(sheet_key) != 40 \
+                    or any(c not in "0123456789abcdef" for c in sheet_key):
+                return jsonify({"error": "Sheet not found"}), 404
+            
+            sheet_path = thumbnails.sheet_path(sheet_key)
+            if not os.path.exists(sheet_path):
+                return jsonify({"error": "Sheet not found"}), 404
+            
+            return send_media_file(sheet_path, max_age=THUMBNAIL_CACHE_MAX_AGE,
+                                   mimetype=thumbnails.rendition_mimetype())
+            
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+    
     @app.route("/api/shot/<shot_id>/resolution", methods=["PUT"])
     def update_resolution(shot_id):
         """Update resolution for a shot"""
@@ -780,17 +1214,8 @@ def create_app():
     
     @app.route("/api/shot/<shot_id>/duration", methods=["PUT"])
     def update_duration(shot_id):
-        """Update duration for a shot"""
+        """Update duration for a shot (only the frames sent are changed)"""
         try:
-            # Check if shot exists
-            shot = db.get_shot(shot_id)
-            if not shot:
-                return jsonify({"error": "Shot not found"}), 404
-            
-            # Check if duration is locked
-            if shot.get("duration_locked", False):
-                return jsonify({"error": "Duration is locked and cannot be modified"}), 403
-            
             # Get duration data
             data = request.get_json()
             if not data:
@@ -825,16 +1250,19 @@ def create_app():
                 except (ValueError, TypeError):
                     return jsonify({"error": "Total frames must be a number"}), 400
             
-            # Update duration
-            success = db.update_shot_duration(shot_id, start_frame, end_frame, total_frames)
+            # Update duration (the lock is checked in the same atomic update)
+            status, duration = db.update_shot_duration(shot_id, start_frame, end_frame, total_frames)
             
-            if success:
-                # Return updated shot
-                updated_shot = db.get_shot(shot_id)
+            if status == "updated":
                 return jsonify({
-                    "shot": updated_shot,
+                    "shot_id": shot_id,
+                    "duration": duration,
                     "message": "Duration updated successfully"
                 }), 200
+            elif status == "not_found":
+                return jsonify({"error": "Shot not found"}), 404
+            elif status == "locked":
+                return jsonify({"error": "Duration is locked and cannot be modified"}), 403
             else:
                 return jsonify({"error": "Failed to update duration"}), 500
             
@@ -875,18 +1303,23 @@ def create_app():
     
     @app.route("/api/project/<project_id>/messages", methods=["GET"])
     def get_project_messages(project_id):
-        """Get all messages for a project"""
+        """Get messages for a project, one page at a time (limit, cursor and fields query parameters)"""
         try:
             # Check if project exists
             project = db.get_project(project_id)
             if not project:
                 return jsonify({"error": "Project not found"}), 404
             
-            # Get messages
-            messages = db.get_project_messages(project_id)
+            limit, cursor, fields = get_page_args()
+            if cursor and not db.is_valid_page_cursor(cursor):
+                return jsonify({"error": "Invalid cursor"}), 400
+            
+            # Get one page of messages
+            messages, next_cursor = db.get_project_messages_page(project_id, limit=limit, cursor=cursor, fields=fields)
             
             return jsonify({
                 "messages": messages,
+                "next_cursor": next_cursor,
                 "message": "Messages retrieved successfully"
             }), 200
             
@@ -940,18 +1373,23 @@ def create_app():
     
     @app.route("/api/shot/<shot_id>/messages", methods=["GET"])
     def get_shot_messages(shot_id):
-        """Get all messages for a shot"""
+        """Get messages for a shot, one page at a time (limit, cursor and fields query parameters)"""
         try:
             # Check if shot exists
             shot = db.get_shot(shot_id)
             if not shot:
                 return jsonify({"error": "Shot not found"}), 404
             
-            # Get messages
-            messages = db.get_shot_messages(shot_id)
+            limit, cursor, fields = get_page_args()
+            if cursor and not db.is_valid_page_cursor(cursor):
+                return jsonify({"error": "Invalid cursor"}), 400
+            
+            # Get one page of messages
+            messages, next_cursor = db.get_shot_messages_page(shot_id, limit=limit, cursor=cursor, fields=fields)
             
             return jsonify({
                 "messages": messages,
+                "next_cursor": next_cursor,
                 "message": "Messages retrieved successfully"
             }), 200
             
@@ -986,22 +1424,15 @@ def create_app():
                     # Get content from form data
                     content = request.form.get("content", "").strip()
                     
-                    # Upload file
-                    from werkzeug.utils import secure_filename
-                    import os
-                    
+                    # Upload file into the blob store (hashed while streaming)
                     filename = secure_filename(file.filename)
-                    upload_folder = os.path.join(app.config.get('SHOTS_UPLOAD_FOLDER', 'uploads/shots'))
-                    os.makedirs(upload_folder, exist_ok=True)
-                    
-                    file_path = os.path.join(upload_folder, filename)
-                    file.save(file_path)
-                    file_size = os.path.getsize(file_path)
                     file_type = file.content_type or "application/octet-stream"
+                    digest, file_size, temp_path = blob_store.write_temp_blob(file.stream)
                     
                     # Create file record
-                    file_id = db.create_shot_file(shot_id, username, filename, file_path, file_size, file_type)
+                    file_id = create_file_from_blob("shot", shot_id, username, filename, file_type, digest, file_size, temp_path)
                     if not file_id:
+                        blob_store.discard_temp_blob(temp_path)
                         return jsonify({"error": "Failed to create file record"}), 500
             else:
                 # Get message data from JSON
@@ -1027,19 +1458,8 @@ def create_app():
             message_id = db.create_shot_message(shot_id, username, content, file_id)
             
             if message_id:
-                # Return created message
+                # Return created message (file info is already attached)
                 message = db.get_shot_message(message_id)
-                # Include file info if message has file_id
-                if file_id and "file_id" in message:
-                    from bson import ObjectId
-                    file_record = db.db.files.find_one({"_id": ObjectId(file_id)})
-                    if file_record:
-                        message["file"] = {
-                            "id": str(file_record["_id"]),
-                            "filename": file_record.get("filename", ""),
-                            "file_type": file_record.get("file_type", ""),
-                            "file_size": file_record.get("file_size", 0),
-                        }
                 return jsonify({
                     "message": message,
                     "message_text": "Message created successfully"
@@ -1052,18 +1472,23 @@ def create_app():
     
     @app.route("/api/project/<project_id>/files", methods=["GET"])
     def get_project_files(project_id):
-        """Get all files for a project"""
+        """Get files for a project, one page at a time (limit, cursor and fields query parameters)"""
         try:
             # Check if project exists
             project = db.get_project(project_id)
             if not project:
                 return jsonify({"error": "Project not found"}), 404
             
-            # Get files
-            files = db.get_project_files(project_id)
+            limit, cursor, fields = get_page_args()
+            if cursor and not db.is_valid_page_cursor(cursor):
+                return jsonify({"error": "Invalid cursor"}), 400
+            
+            # Get one page of files
+            files, next_cursor = db.get_project_files_page(project_id, limit=limit, cursor=cursor, fields=fields)
             
             return jsonify({
                 "files": files,
+                "next_cursor": next_cursor,
                 "message": "Files retrieved successfully"
             }), 200
             
@@ -1094,31 +1519,14 @@ def create_app():
             if not username:
                 return jsonify({"error": "User not authenticated"}), 401
             
-            # Create project-specific upload directory
-            project_upload_dir = os.path.join(app.config['PROJECTS_UPLOAD_FOLDER'], project_id)
-            os.makedirs(project_upload_dir, exist_ok=True)
-            
-            # Save file
+            # Save file into the blob store, hashing while streaming
+            # (content that is already stored is referenced, not written again)
             filename = secure_filename(file.filename)
-            file_path = os.path.join(project_upload_dir, filename)
-            
-            # Handle duplicate filenames
-            counter = 1
-            original_filename = filename
-            while os.path.exists(file_path):
-                name, ext = os.path.splitext(original_filename)
-                filename = f"{name}_{counter}{ext}"
-                file_path = os.path.join(project_upload_dir, filename)
-                counter += 1
-            
-            file.save(file_path)
-            
-            # Get file info
-            file_size = os.path.getsize(file_path)
             file_type = file.content_type or "application/octet-stream"
+            digest, file_size, temp_path = blob_store.write_temp_blob(file.stream)
             
             # Create file record
-            file_id = db.create_project_file(project_id, username, filename, file_path, file_size, file_type)
+            file_id = create_file_from_blob("project", project_id, username, filename, file_type, digest, file_size, temp_path)
             
             if file_id:
                 return jsonify({
@@ -1129,6 +1537,7 @@ def create_app():
                     "message": "File uploaded successfully"
                 }), 201
             else:
+                blob_store.discard_temp_blob(temp_path)
                 return jsonify({"error": "Failed to create file record"}), 500
             
         except Exception as e:
@@ -1149,7 +1558,9 @@ def create_app():
             if not file_path or not os.path.exists(file_path):
                 return jsonify({"error": "File not found on disk"}), 404
             
-            return send_file(file_path, as_attachment=True, download_name=file_record.get("filename"))
+            # Stored files never change, so browsers may cache them
+            return send_media_file(file_path, as_attachment=True, download_name=file_record.get("filename"),
+                                   max_age=FILE_CACHE_MAX_AGE)
             
         except Exception as e:
             return jsonify({"error": str(e)}), 500
@@ -1165,17 +1576,10 @@ def create_app():
             if not file_record:
                 return jsonify({"error": "File not found"}), 404
             
-            # Delete file from disk
-            file_path = file_record.get("file_path")
-            if file_path and os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                except Exception as e:
-                    print(f"Error deleting file from disk: {e}")
-            
-            # Delete file record
+            # Delete file record, then its data if nothing else uses it
             success = db.delete_file(file_id)
             if success:
+                blob_store.release_file_data(db, file_record)
                 return jsonify({"message": "File deleted successfully"}), 200
             else:
                 return jsonify({"error": "Failed to delete file"}), 500
@@ -1185,18 +1589,23 @@ def create_app():
     
     @app.route("/api/shot/<shot_id>/files", methods=["GET"])
     def get_shot_files(shot_id):
-        """Get all files for a shot"""
+        """Get files for a shot, one page at a time (limit, cursor and fields query parameters)"""
         try:
             # Check if shot exists
             shot = db.get_shot(shot_id)
             if not shot:
                 return jsonify({"error": "Shot not found"}), 404
             
-            # Get files
-            files = db.get_shot_files(shot_id)
+            limit, cursor, fields = get_page_args()
+            if cursor and not db.is_valid_page_cursor(cursor):
+                return jsonify({"error": "Invalid cursor"}), 400
+            
+            # Get one page of files
+            files, next_cursor = db.get_shot_files_page(shot_id, limit=limit, cursor=cursor, fields=fields)
             
             return jsonify({
                 "files": files,
+                "next_cursor": next_cursor,
                 "message": "Files retrieved successfully"
             }), 200
             
@@ -1227,31 +1636,14 @@ def create_app():
             if not username:
                 return jsonify({"error": "User not authenticated"}), 401
             
-            # Create shot-specific upload directory
-            shot_upload_dir = os.path.join(app.config['SHOTS_UPLOAD_FOLDER'], shot_id)
-            os.makedirs(shot_upload_dir, exist_ok=True)
-            
-            # Save file
+            # Save file into the blob store, hashing while streaming
+            # (content that is already stored is referenced, not written again)
             filename = secure_filename(file.filename)
-            file_path = os.path.join(shot_upload_dir, filename)
-            
-            # Handle duplicate filenames
-            counter = 1
-            original_filename = filename
-            while os.path.exists(file_path):
-                name, ext = os.path.splitext(original_filename)
-                filename = f"{name}_{counter}{ext}"
-                file_path = os.path.join(shot_upload_dir, filename)
-                counter += 1
-            
-            file.save(file_path)
-            
-            # Get file info
-            file_size = os.path.getsize(file_path)
             file_type = file.content_type or "application/octet-stream"
+            digest, file_size, temp_path = blob_store.write_temp_blob(file.stream)
             
             # Create file record
-            file_id = db.create_shot_file(shot_id, username, filename, file_path, file_size, file_type)
+            file_id = create_file_from_blob("shot", shot_id, username, filename, file_type, digest, file_size, temp_path)
             
             if file_id:
                 return jsonify({
@@ -1262,6 +1654,7 @@ def create_app():
                     "message": "File uploaded successfully"
                 }), 201
             else:
+                blob_store.discard_temp_blob(temp_path)
                 return jsonify({"error": "Failed to create file record"}), 500
             
         except Exception as e:
@@ -1290,7 +1683,10 @@ def create_app():
             # Check if inline viewing is requested (for images/videos)
             inline = request.args.get("inline", "false").lower() == "true"
             
-            return send_file(file_path, as_attachment=not inline, download_name=file_record.get("filename") if not inline else None)
+            # Range requests let players seek without downloading the whole file
+            return send_media_file(file_path, as_attachment=not inline,
+                                   download_name=file_record.get("filename") if not inline else None,
+                                   max_age=FILE_CACHE_MAX_AGE)
             
         except Exception as e:
             return jsonify({"error": str(e)}), 500
@@ -1306,17 +1702,10 @@ def create_app():
             if not file_record:
                 return jsonify({"error": "File not found"}), 404
             
-            # Delete file from disk
-            file_path = file_record.get("file_path")
-            if file_path and os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                except Exception as e:
-                    print(f"Error deleting file from disk: {e}")
-            
-            # Delete file record
+            # Delete file record, then its data if nothing else uses it
             success = db.delete_file(file_id)
             if success:
+                blob_store.release_file_data(db, file_record)
                 return jsonify({"message": "File deleted successfully"}), 200
             else:
                 return jsonify({"error": "Failed to delete file"}), 500
@@ -1324,6 +1713,221 @@ def create_app():
         except Exception as e:
             return jsonify({"error": str(e)}), 500
     
+    # Chunked uploads: POST /api/uploads, PUT chunks at ?offset=N, then POST .../commit
+    def serialize_upload(upload):
+        """Client view of an upload session"""
+        return {
+            "upload_id": str(upload["_id"]),
+            "target_type": upload.get("target_type"),
+            "target_id": upload.get("target_id"),
+            "filename": upload.get("filename"),
+            "file_size": upload.get("file_size", 0),
+            "file_type": upload.get("file_type"),
+            "offset": upload.get("offset", 0),
+            "status": upload.get("status"),
+            "chunk_size": UPLOAD_CHUNK_SIZE
+        }
+    
+    def cleanup_expired_uploads():
+        """Remove abandoned upload sessions and their partial files"""
+        for upload in db.get_expired_upload_sessions():
+            if upload.get("status") != "committed":
+                remove_part_file(upload.get("part_path"))
+            db.delete_upload_session(str(upload["_id"]))
+    
+    @app.route("/api/uploads", methods=["POST"])
+    def initiate_upload():
+        """Start a chunked upload of a project or shot file"""
+        try:
+            data = request.get_json()
+            if not data:
+                return jsonify({"error": "No data provided"}), 400
+            
+            target_type = data.get("target_type")
+            target_id = data.get("target_id")
+            if target_type not in ("project", "shot") or not target_id:
+                return jsonify({"error": "target_type must be 'project' or 'shot' and target_id is required"}), 400
+            
+            username = data.get("username") or session.get("username")
+            if not username:
+                return jsonify({"error": "User not authenticated"}), 401
+            
+            filename = secure_filename(data.get("filename") or "")
+            if not filename:
+                return jsonify({"error": "No file selected"}), 400
+            
+            file_size = data.get("file_size")
+            if not isinstance(file_size, int) or file_size <= 0:
+                return jsonify({"error": "file_size must be a positive integer"}), 400
+            if file_size > MAX_UPLOAD_SIZE:
+                return jsonify({"error": "File is too large"}), 413
+            
+            # Check if target exists
+            project_id = target_id
+            if target_type == "project" and not db.get_project(target_id):
+                return jsonify({"error": "Project not found"}), 404
+            if target_type == "shot":
+                shot = db.get_shot(target_id)
+                if not shot:
+                    return jsonify({"error": "Shot not found"}), 404
+                project_id = shot["project_id"]
+            
+            file_type = data.get("file_type") or "application/octet-stream"
+            
+            # Content already attached somewhere in this project (e.g. a plate re-used across its
+            # shots) needs no transfer; the client sends the SHA-256 it computed. Other blobs are
+            # only deduplicated after the upload, on the digest of the received bytes, so a known
+            # hash cannot be used to read data of another project.
+            sha256 = str(data.get("sha256") or "").lower()
+            if len(sha256) == 64 and all(c in "0123456789abcdef" for c in sha256):
+                blob = db.get_blob(sha256)
+                if (blob and blob.get("size") == file_size and db.project_has_blob(project_id, sha256)
+                        and os.path.exists(blob_store.blob_path(sha256))):
+                    file_id = create_file_from_blob(target_type, target_id, username, filename, file_type, sha256, file_size)
+                    if file_id:
+                        return jsonify({
+                            "file_id": file_id,
+                            "filename": filename,
+                            "file_size": file_size,
+                            "file_type": file_type,
+                            "deduplicated": True,
+                            "message": "File uploaded successfully"
+                        }), 201
+            
+            cleanup_expired_uploads()
+            
+            upload_id = db.create_upload_session(
+                target_type, target_id, username, filename, file_size, file_type,
+                part_dir=app.config['INCOMING_UPLOAD_FOLDER'],
+                ttl_hours=UPLOAD_SESSION_TTL_HOURS
+            )
+            if not upload_id:
+                return jsonify({"error": "Failed to create upload"}), 500
+            
+            upload = db.get_upload_session(upload_id)
+            create_part_file(upload["part_path"])
+            
+            return jsonify({
+                "upload": serialize_upload(upload),
+                "message": "Upload started"
+            }), 201
+            
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+    
+    @app.route("/api/uploads/<upload_id>", methods=["GET"])
+    def get_upload(upload_id):
+        """Get upload progress (the offset to resume from)"""
+        try:
+            upload = db.get_upload_session(upload_id)
+            if not upload:
+                return jsonify({"error": "Upload not found"}), 404
+            return jsonify({"upload": serialize_upload(upload)}), 200
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+    
+    @app.route("/api/uploads/<upload_id>", methods=["PUT"])
+    def upload_chunk(upload_id):
+        """Write one chunk (raw request body) at ?offset=N"""
+        try:
+            upload = db.get_upload_session(upload_id)
+            if not upload:
+                return jsonify({"error": "Upload not found"}), 404
+            if upload.get("status") != "uploading":
+                return jsonify({"error": "Upload is already committed", "upload": serialize_upload(upload)}), 409
+            
+            offset = request.args.get("offset", type=int)
+            if offset is None:
+                return jsonify({"error": "offset is required"}), 400
+            if offset != upload["offset"]:
+                # Client resumes from the offset the server has
+                return jsonify({"error": "Offset mismatch", "upload": serialize_upload(upload)}), 409
+            
+            length = request.content_length
+            if not length:
+                return jsonify({"error": "Empty chunk"}), 400
+            if offset + length > upload["file_size"]:
+                return jsonify({"error": "Chunk exceeds declared file size"}), 400
+            
+            try:
+                new_offset = write_chunk(upload["part_path"], offset, request.stream, length)
+            except (ChunkError, ClientDisconnected) as e:
+                # Offset is not advanced, so the chunk can simply be resent
+                return jsonify({"error": str(e), "upload": serialize_upload(upload)}), 400
+            
+            if not db.advance_upload_session(upload_id, offset, new_offset, UPLOAD_SESSION_TTL_HOURS):
+                upload = db.get_upload_session(upload_id) or upload
+                return jsonify({"error": "Upload changed concurrently", "upload": serialize_upload(upload)}), 409
+            
+            upload["offset"] = new_offset
+            return jsonify({"upload": serialize_upload(upload)}), 200
+            
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+    
+    @app.route("/api/uploads/<upload_id>/commit", methods=["POST"])
+    def commit_upload(upload_id):
+        """Finish a chunked upload and create the file record"""
+        try:
+            upload = db.get_upload_session(upload_id)
+            if not upload:
+                return jsonify({"error": "Upload not found"}), 404
+            
+            if upload.get("status") != "committed":
+                if not db.claim_upload_session_for_commit(upload_id):
+                    upload = db.get_upload_session(upload_id) or upload
+                    return jsonify({"error": "Upload is incomplete or being committed", "upload": serialize_upload(upload)}), 409
+                
+                try:
+                    # Hash the assembled file; the part file becomes the blob (or is dropped as a duplicate)
+                    digest, file_size = blob_store.hash_file(upload["part_path"])
+                    filename = upload["filename"]
+                    file_id = create_file_from_blob(
+                        upload["target_type"], upload["target_id"], upload["username"],
+                        filename, upload["file_type"], digest, file_size, upload["part_path"]
+                    )
+                except Exception:
+                    db.complete_upload_session(upload_id, None)
+                    raise
+                
+                if not file_id:
+                    # The part file is untouched, so the commit can be retried
+                    db.complete_upload_session(upload_id, None)
+                    return jsonify({"error": "Failed to create file record"}), 500
+                
+                db.complete_upload_session(upload_id, file_id, filename)
+                upload.update({"file_id": file_id, "stored_filename": filename})
+            
+            # Committing again (e.g. after a lost response) returns the same file
+            return jsonify({
+                "file_id": upload["file_id"],
+                "filename": upload.get("stored_filename", upload["filename"]),
+                "file_size": upload["file_size"],
+                "file_type": upload["file_type"],
+                "message": "File uploaded successfully"
+            }), 201
+            
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+    
+    @app.route("/api/uploads/<upload_id>", methods=["DELETE"])
+    def abort_upload(upload_id):
+        """Abandon a chunked upload and delete its partial file"""
+        try:
+            upload = db.get_upload_session(upload_id)
+            if not upload:
+                return jsonify({"error": "Upload not found"}), 404
+            if upload.get("status") == "committing":
+                return jsonify({"error": "Upload is being committed"}), 409
+            
+            if upload.get("status") != "committed":
+                remove_part_file(upload.get("part_path"))
+            db.delete_upload_session(upload_id)
+            return jsonify({"message": "Upload cancelled"}), 200
+            
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+    
     @app.route("/api/project/<project_id>/delete", methods=["POST"])
     def request_project_deletion(project_id):
         """Request project deletion (only owner can request, requires admin approval)"""
@@ -1363,15 +1967,10 @@ def create_app():
             return jsonify({"error": str(e)}), 500
     
     @app.route("/api/admin/pending-deletions", methods=["GET"])
+    @admin_required
     def get_pending_deletions():
         """Get pending project deletion requests (admin only)"""
         try:
-            username = request.args.get("username")
-            password = request.args.get("password")
-            
-            if not db.is_admin(username, password):
-                return jsonify({"error": "Unauthorized"}), 401
-            
             deletions = db.get_pending_deletions()
             return jsonify({"deletions": deletions}), 200
             
@@ -1379,6 +1978,7 @@ def create_app():
             return jsonify({"error": str(e)}), 500
     
     @app.route("/api/admin/approve-deletion", methods=["POST"])
+    @admin_required
     def approve_deletion():
         """Approve or reject project deletion (admin only)"""
         try:
@@ -1386,14 +1986,9 @@ def create_app():
             if not data:
                 return jsonify({"error": "No data provided"}), 400
             
-            admin_username = data.get("admin_username")
-            admin_password = data.get("admin_password")
             project_id = data.get("project_id")
             approve = data.get("approve", True)
             
-            if not db.is_admin(admin_username, admin_password):
-                return jsonify({"error": "Unauthorized"}), 401
-            
             if not project_id:
                 return jsonify({"error": "Project ID is required"}), 400
             
@@ -1401,7 +1996,9 @@ def create_app():
             if not success:
                 return jsonify({"error": "Deletion request not found"}), 404
             
-            status = "approved and deleted" if approve else "rejected"
+            if approve:
+                deletion_worker.wake()
+            status = "approved; project data is being removed" if approve else "rejected"
             return jsonify({
                 "message": f"Project deletion {status}"
             }), 200
@@ -1409,6 +2006,17 @@ def create_app():
         except Exception as e:
             return jsonify({"error": str(e)}), 500
     
+    @app.route("/api/admin/deletion-jobs", methods=["GET"])
+    @admin_required
+    def get_deletion_jobs():
+        """Get recent project deletion jobs and their progress (admin only)"""
+        try:
+            jobs = db.get_deletion_jobs()
+            return jsonify({"jobs": jobs}), 200
+            
+        except Exception as e:
+            return jsonify({"error": str(e)}), 500
+    
     @app.route("/api/project/<project_id>/workers", methods=["PUT"])
     def update_project_workers(project_id):
         """Add or remove workers from a project (only owner can do this)"""
@@ -1511,8 +2119,13 @@ def create_app():
     
     @app.route("/api/health", methods=["GET"])
     def health():
-        """Health check endpoint"""
-        return jsonify({"status": "ok"}), 200
+        """Health check endpoint (includes cache, password pool and activity metrics of this process)"""
+        return jsonify({
+            "status": "ok",
+            "user_cache": db.user_cache.stats(),
+            "password_pool": password_pool.stats(),
+            "activity": db.activity.stats()
+        }), 200
     
     # Chat Room endpoints
     @app.route("/api/project/<project_id>/chat/room", methods=["GET"])
@@ -1585,17 +2198,33 @@ def create_app():
             # Get username from session or request
             username = session.get("username") or request.args.get("username")
             
-            limit = request.args.get("limit", 100, type=int)
-            messages = db.get_chat_room_messages(chat_room_id, limit)
+            limit = min(max(request.args.get("limit", 100, type=int), 1), 500)
+            # Cursors (message _id or ISO created_at): after = only newer messages, before = older page
+            after = request.args.get("after")
+            before = request.args.get("before")
+            # Reject bad cursors up front: an empty result would still mark the room as read
+            for cursor in (after, before):
+                if cursor:
+                    try:
+                        db.parse_message_cursor(chat_room_id, cursor)
+                    except ValueError:
+                        return jsonify({"error": f"Invalid message cursor: {cursor}"}), 400
+            messages = db.get_chat_room_messages(chat_room_id, limit, after=after, before=before)
             
             # Mark messages as read by current user (if logged in)
-            if username:
+            if username and not before:
                 db.mark_chat_room_messages_as_read(chat_room_id, username)
             
-            return jsonify({
+            response = {
                 "messages": messages,
+                "has_more": len(messages) == limit,
                 "message": "Messages retrieved successfully"
-            }), 200
+            }
+            if after:
+                # Delta polls don't resend old messages, so send read cursors for read receipts
+                response["read_cursors"] = db.get_chat_room_read_cursors(chat_room_id)
+            
+            return jsonify(response), 200
             
         except Exception as e:
             return jsonify({"error": str(e)}), 500
@@ -1640,26 +2269,7 @@ def create_app():
             
             if message_id:
                 # Get created message
-                message = db.db.messages.find_one({"_id": ObjectId(message_id)})
-                if message:
-                    message["_id"] = str(message["_id"])
-                    if "chat_room_id" in message:
-                        message["chat_room_id"] = str(message["chat_room_id"])
-                    if "project_id" in message:
-                        message["project_id"] = str(message["project_id"])
-                    if "shot_id" in message:
-                        message["shot_id"] = str(message["shot_id"])
-                    if "created_at" in message:
-                        message["created_at"] = message["created_at"].isoformat()
-                    if "updated_at" in message:
-                        message["updated_at"] = message["updated_at"].isoformat()
-                    # Ensure read_by field exists and is properly formatted
-                    if "read_by" not in message:
-                        message["read_by"] = []
-                    elif isinstance(message.get("read_by"), list):
-                        message["read_by"] = [str(r) for r in message["read_by"]]
-                    else:
-                        message["read_by"] = []
+                message = db.get_chat_message(message_id)
                 
                 return jsonify({
                     "message": message,
@@ -1671,6 +2281,55 @@ def create_app():
         except Exception as e:
             return jsonify({"error": str(e)}), 500
     
+    @app.route("/api/users/<username>/events", methods=["GET"])
+    def stream_chat_events(username):
+        """Stream chat events (new messages, read receipts, room changes) as Server-Sent Events"""
+        if not event_stream_slots.acquire(blocking=False):
+            response = jsonify({"error": "Too many open event streams, poll for updates instead"})
+            response.headers["Retry-After"] = str(CHAT_EVENT_STREAM_SECONDS)
+            return response, 503
+        subscription = db.events.subscribe(username)
+        released = []
+        
+        def release():
+            # Runs when the server closes the response, even if the stream never started
+            if not released:
+                released.append(True)
+                subscription.close()
+                event_stream_slots.release()
+        
+        def generate():
+            try:
+                # Reconnect delay for the browser's EventSource
+                yield "retry: 3000\n\n"
+                yield "event: ready\ndata: {}\n\n"
+                # End after a bounded lifetime so the stream does not hold a server thread forever
+                deadline = time.monotonic() + CHAT_EVENT_STREAM_SECONDS
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        # The browser reconnects at once and catches up on "ready"
+                        yield "retry: 100\n\n"
+                        return
+                    event = subscription.get(timeout=min(15, remaining))
+                    if subscription.overflowed:
+                        # Events were dropped; client should refetch everything
+                        subscription.overflowed = False
+                        yield "event: resync\ndata: {}\n\n"
+                    if event is None:
+                        # Keep-alive comment so proxies don't close an idle connection
+                        yield ": keep-alive\n\n"
+                        continue
+                    yield f"event: {event.get('type', 'message')}\ndata: {json.dumps(event)}\n\n"
+            finally:
+                release()
+        
+        response = Response(stream_with_context(generate()), mimetype="text/event-stream")
+        response.call_on_close(release)
+        response.headers["Cache-Control"] = "no-cache"
+        response.headers["X-Accel-Buffering"] = "no"
+        return response
+    
     # Personal chat endpoints
     @app.route("/api/users/<username>/personal-chat-rooms", methods=["GET"])
     def get_user_personal_chat_rooms(username):
@@ -1705,6 +2364,7 @@ def create_app():
     
     # Get all chat rooms for a user
     @app.route("/api/users/<username>/chat-rooms", methods=["GET"])
+    @conditional_get("projects", "shots", "users", "chat:{username}")
     def get_user_all_chat_rooms(username):
         """Get all chat rooms for a user (project, shot, and personal)"""
         try:
@@ -1722,6 +2382,7 @@ def create_app():
 
 
 if __name__ == "__main__":
+    # Development server (reloader and debugger); production runs serve.py / gunicorn wsgi:app
     app = create_app()
     try:
         app.run(host="0.0.0.0", port=5000, debug=True)
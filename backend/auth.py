@@ -0,0 +1,73 @@
+"""
+Signed bearer tokens issued at login
+
+The password is checked with bcrypt once, in /api/login, which returns a token
+carrying the username and admin flag signed with the app's SECRET_KEY. Later
+requests send it as "Authorization: Bearer <token>"; verifying it is an HMAC
+comparison (constant time), so admin endpoints no longer run bcrypt per request.
+Admin status is taken from the token, so a change takes effect at the next login.
+
+Tokens are only issued and accepted when SECRET_KEY is set to a private value:
+with the key unset or left at a published default anyone could sign an admin
+token, so admin endpoints fail closed instead. All worker processes must share
+the key, which is why no random per-process key is generated either.
+"""
+from functools import wraps
+from typing import Dict, Optional
+from flask import current_app, g, jsonify, request
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from config import AUTH_TOKEN_MAX_AGE_HOURS
+
+TOKEN_SALT = "qepipeline-auth"
+
+# Published placeholder values (config.py default, .env.example) that must never sign tokens
+INSECURE_SECRET_KEYS = {"dev-secret-key-change-in-production", "your_secret_key_here_change_in_production"}
+
+
+def _serializer() -> Optional[URLSafeTimedSerializer]:
+    """Token serializer, or None (and an error in the log) when SECRET_KEY is not configured"""
+    secret_key = current_app.secret_key
+    if not secret_key or secret_key in INSECURE_SECRET_KEYS:
+        print("ERROR: SECRET_KEY is unset or a default value; login tokens are disabled (set SECRET_KEY in .env)")
+        return None
+    return URLSafeTimedSerializer(secret_key, salt=TOKEN_SALT)
+
+
+def issue_token(username: str, is_admin: bool) -> Optional[str]:
+    """Create a signed token for a user who just logged in (None when SECRET_KEY is not configured)"""
+    serializer = _serializer()
+    if serializer is None:
+        return None
+    return serializer.dumps({"username": username, "is_admin": bool(is_admin)})
+
+
+def verify_token(token: str) -> Optional[Dict]:
+    """Claims of a valid, unexpired token (None otherwise, and always when SECRET_KEY is not configured)"""
+    serializer = _serializer()
+    if serializer is None:
+        return None
+    try:
+        return serializer.loads(token, max_age=AUTH_TOKEN_MAX_AGE_HOURS * 3600)
+    except BadSignature:
+        # Also raised for expired tokens (SignatureExpired is a subclass)
+        return None
+
+
+def get_request_claims() -> Optional[Dict]:
+    """Claims of the bearer token sent with the current request (None if missing or invalid)"""
+    header = request.headers.get("Authorization", "")
+    if not header.startswith("Bearer "):
+        return None
+    return verify_token(header[len("Bearer "):].strip())
+
+
+def admin_required(view):
+    """Reject requests without a valid admin token; the claims are available as g.auth_claims"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        claims = get_request_claims()
+        if not claims or not claims.get("is_admin"):
+            return jsonify({"error": "Unauthorized"}), 401
+        g.auth_claims = claims
+        return view(*args, **kwargs)
+    return wrapper
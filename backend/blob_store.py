@@ -0,0 +1,165 @@
+"""
+Content-addressed storage for uploaded files
+
+Every upload is hashed (SHA-256) while it is written to a temporary file and
+stored once under uploads/blobs/<aa>/<bb>/<sha256>. files records point at
+the blob and the blobs collection counts references, so the same plate
+uploaded to many shots takes disk space once, and deleting a file only frees
+the blob when nothing else references it.
+
+Order of operations for a new file:
+    digest, size, temp_path = write_temp_blob(stream)   # or hash_file(path)
+    db.add_blob_reference(digest, size)
+    ... create the files record with file_path=blob_path(digest) ...
+    commit_blob(temp_path, digest)
+
+Deleting a file releases its reference; remove_blob(db, digest) frees the data
+only through a conditional delete of the blobs entry while ref_count is 0.
+"""
+import hashlib
+import os
+import shutil
+import uuid
+from typing import Tuple
+
+BLOBS_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "uploads", "blobs")
+TEMP_ROOT = os.path.join(BLOBS_ROOT, "tmp")
+
+# Size of the pieces read from the upload stream
+STREAM_BUFFER_SIZE = 1024 * 1024
+
+
+def blob_path(digest: str) -> str:
+    """Location of a blob on disk"""
+    return os.path.join(BLOBS_ROOT, digest[:2], digest[2:4], digest)
+
+
+def write_temp_blob(stream) -> Tuple[str, int, str]:
+    """
+    Copy a stream to a temporary file, hashing it on the way
+    Returns (sha256 hex digest, size, temp_path)
+    """
+    os.makedirs(TEMP_ROOT, exist_ok=True)
+    temp_path = os.path.join(TEMP_ROOT, uuid.uuid4().hex)
+    sha256 = hashlib.sha256()
+    size = 0
+    try:
+        with open(temp_path, "wb") as temp_file:
+            while True:
+                data = stream.read(STREAM_BUFFER_SIZE)
+                if not data:
+                    break
+                sha256.update(data)
+                temp_file.write(data)
+                size += len(data)
+    except Exception:
+        discard_temp_blob(temp_path)
+        raise
+    return sha256.hexdigest(), size, temp_path
+
+
+def hash_file(path: str) -> Tuple[str, int]:
+    """Hash a file that is already on disk; returns (sha256 hex digest, size)"""
+    sha256 = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as file:
+        while True:
+            data = file.read(STREAM_BUFFER_SIZE)
+            if not data:
+                break
+            sha256.update(data)
+            size += len(data)
+    return sha256.hexdigest(), size
+
+
+def commit_blob(temp_path: str, digest: str) -> str:
+    """
+    Move a hashed file into the store, or drop it if the content is already stored
+    Call after the reference was added, so a concurrent release cannot free the blob.
+    Returns the blob path
+    """
+    path = blob_path(digest)
+    if os.path.exists(path):
+        discard_temp_blob(temp_path)
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(temp_path, path)
+    return path
+
+
+def link_blob(path: str, digest: str) -> str:
+    """
+    Add a file stored outside the blob store without moving the original
+    (hard link, or a copy across filesystems); the caller removes the original afterwards.
+    Returns the blob path
+    """
+    target = blob_path(digest)
+    if not os.path.exists(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            os.link(path, target)
+        except OSError:
+            shutil.copy2(path, target)
+    return target
+
+
+def discard_temp_blob(temp_path: str):
+    """Delete a temporary file if it still exists"""
+    try:
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+    except OSError as e:
+        print(f"Error removing temporary blob: {e}")
+
+
+def remove_blob(db, digest: str):
+    """
+    Delete a blob whose last reference was released
+    The file is moved aside before the blobs entry is deleted (only while its
+    ref_count is still 0), so a concurrent add_blob_reference + commit_blob either
+    keeps the entry (the file is put back) or finds no file and stores its own copy.
+    """
+    path = blob_path(digest)
+    trash_path = f"{path}.{uuid.uuid4().hex}.deleting"
+    try:
+        os.replace(path, trash_path)
+    except FileNotFoundError:
+        trash_path = None
+    except OSError as e:
+        print(f"Error removing blob: {e}")
+        return
+
+    if not db.delete_unreferenced_blob(digest):
+        # Referenced again meanwhile: restore the data unless a new upload already did
+        if trash_path:
+            try:
+                if os.path.exists(path):
+                    os.remove(trash_path)
+                else:
+                    os.replace(trash_path, path)
+            except OSError as e:
+                print(f"Error restoring blob: {e}")
+        return
+
+    try:
+        if trash_path:
+            os.remove(trash_path)
+    except OSError as e:
+        print(f"Error removing blob: {e}")
+
+
+def release_file_data(db, file_record):
+    """Free the data of a deleted files record (a blob only once no other file references it)"""
+    digest = file_record.get("blob_sha256")
+    if digest:
+        if db.release_blob_reference(digest):
+            remove_blob(db, digest)
+        return
+
+    # Files stored before the blob store own their path
+    file_path = file_record.get("file_path")
+    if file_path and os.path.exists(file_path):
+        try:
+            os.remove(file_path)
+        except OSError as e:
+            print(f"Error deleting file from disk: {e}")
@@ -0,0 +1,164 @@
+"""
+Chat event fan-out for server-push delivery (Server-Sent Events)
+
+Database publishes chat events (new messages, read cursor changes) to a broker;
+each open /events stream holds a Subscription that receives the events addressed
+to its user.
+
+Brokers:
+- "memory": fan-out inside one process (single worker / dev server)
+- "mongodb": events go through a capped collection so every worker process sees them
+"""
+import queue
+import threading
+import time
+from typing import Optional, Dict, List
+
+
+class Subscription:
+    """Queue of chat events for one connected user"""
+
+    def __init__(self, broker, username: str, max_queue_size: int = 1000):
+        self.broker = broker
+        self.username = username
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        # Set when events were dropped because the client was too slow;
+        # the stream tells the client to resync with a full fetch
+        self.overflowed = False
+
+    def deliver(self, event: Dict):
+        """Queue an event for this subscriber (never blocks the publisher)"""
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout: float) -> Optional[Dict]:
+        """Wait up to timeout seconds for the next event"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        """Stop receiving events"""
+        self.broker.unsubscribe(self)
+
+
+class InMemoryEventBroker:
+    """Fans chat events out to subscribers in this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions: Dict[str, List[Subscription]] = {}
+
+    def subscribe(self, username: str) -> Subscription:
+        """Subscribe to events addressed to a user"""
+        subscription = Subscription(self, username)
+        with self._lock:
+            self._subscriptions.setdefault(username, []).append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Remove a subscription"""
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.username, [])
+            if subscription in subscriptions:
+                subscriptions.remove(subscription)
+            if not subscriptions:
+                self._subscriptions.pop(subscription.username, None)
+
+    def publish(self, event: Dict, usernames: List[str]):
+        """Publish an event to the given users"""
+        self._dispatch(event, usernames)
+
+    def _dispatch(self, event: Dict, usernames: List[str]):
+        with self._lock:
+            targets = [s for username in set(usernames) for s in self._subscriptions.get(username, [])]
+        for subscription in targets:
+            subscription.deliver(event)
+
+
+class MongoEventBroker(InMemoryEventBroker):
+    """
+    Shares chat events between worker processes through a capped MongoDB collection
+    Each process tails the collection in a background thread and fans events out locally
+    """
+
+    def __init__(self, mongo_db, collection_name: str = "chat_events", size_bytes: int = 16 * 1024 * 1024):
+        super().__init__()
+        self.mongo_db = mongo_db
+        self.collection_name = collection_name
+        self.size_bytes = size_bytes
+        self._tail_thread = None
+        self._ensure_collection()
+
+    def _ensure_collection(self):
+        if self.collection_name not in self.mongo_db.list_collection_names():
+            try:
+                self.mongo_db.create_collection(self.collection_name, capped=True, size=self.size_bytes)
+            except Exception as e:
+                # Another worker may have created it first
+                print(f"Chat events collection not created: {e}")
+        self.collection = self.mongo_db[self.collection_name]
+
+    def subscribe(self, username: str) -> Subscription:
+        """Subscribe to events addressed to a user (starts tailing on first use)"""
+        self._start_tailing()
+        return super().subscribe(username)
+
+    def publish(self, event: Dict, usernames: List[str]):
+        """Publish an event through the capped collection (delivered by the tail thread)"""
+        self.collection.insert_one({"event": event, "usernames": list(set(usernames))})
+
+    def _start_tailing(self):
+        with self._lock:
+            if self._tail_thread and self._tail_thread.is_alive():
+                return
+            self._tail_thread = threading.Thread(target=self._tail, name="chat-events-tail", daemon=True)
+            self._tail_thread.start()
+
+    def _tail(self):
+        from pymongo import CursorType
+
+        # Only deliver events published after this process started tailing
+        last = self.collection.find_one(sort=[("$natural", -1)], projection={"_id": 1})
+        last_id = last["_id"] if last else None
+        while True:
+            try:
+                # Resume in the collection's natural (insertion) order, skipping up to the last
+                # event delivered: ObjectIds from different processes are not ordered by insertion
+                skipping = last_id is not None
+                if skipping and not self.collection.find_one({"_id": last_id}, {"_id": 1}):
+                    # Overwritten by newer events while disconnected: everything left is new
+                    skipping = False
+                    self._resync_all()
+                cursor = self.collection.find({}, cursor_type=CursorType.TAILABLE_AWAIT)
+                while cursor.alive:
+                    for document in cursor:
+                        if skipping:
+                            skipping = document["_id"] != last_id
+                            continue
+                        last_id = document["_id"]
+                        self._dispatch(document.get("event", {}), document.get("usernames", []))
+                    if skipping:
+                        # Reached the newest event without passing last_id (it was just overwritten)
+                        skipping = False
+                        self._resync_all()
+            except Exception as e:
+                print(f"Chat events tail error: {e}")
+            time.sleep(1)
+
+    def _resync_all(self):
+        """Tell every subscriber that events may have been missed"""
+        with self._lock:
+            targets = [s for subscriptions in self._subscriptions.values() for s in subscriptions]
+        for subscription in targets:
+            subscription.overflowed = True
+
+
+def create_event_broker(mongo_db=None, broker_type: str = "memory"):
+    """Create the chat event broker configured for this deployment"""
+    if broker_type == "mongodb" and mongo_db is not None:
+        return MongoEventBroker(mongo_db)
+    return InMemoryEventBroker()
@@ -0,0 +1,55 @@
+"""
+Chunked, resumable file uploads
+
+A client initiates an upload session, PUTs the file in chunks at explicit byte
+offsets and commits once every byte has arrived. Chunks are streamed straight
+into a .part file; the session (offset, target, metadata) lives in MongoDB so
+any worker process can accept the next chunk and a dropped connection only
+costs the chunk that was in flight. On commit the assembled file is hashed
+and moved into the blob store (see blob_store.py).
+"""
+import os
+
+# Size of the pieces copied from the request stream to disk
+STREAM_BUFFER_SIZE = 1024 * 1024
+
+
+class ChunkError(Exception):
+    """Raised when a chunk body does not match its declared length"""
+
+
+def create_part_file(part_path: str):
+    """Create the empty file that chunks are written into"""
+    os.makedirs(os.path.dirname(part_path), exist_ok=True)
+    with open(part_path, "wb"):
+        pass
+
+
+def write_chunk(part_path: str, offset: int, stream, length: int) -> int:
+    """
+    Stream length bytes from stream into part_path starting at offset
+    Anything past the chunk (left by an earlier interrupted attempt) is truncated.
+    Returns the new end offset
+    """
+    written = 0
+    with open(part_path, "r+b") as part_file:
+        part_file.seek(offset)
+        while written < length:
+            data = stream.read(min(STREAM_BUFFER_SIZE, length - written))
+            if not data:
+                break
+            part_file.write(data)
+            written += len(data)
+        if written != length:
+            raise ChunkError(f"Expected {length} bytes, received {written}")
+        part_file.truncate(offset + written)
+    return offset + written
+
+
+def remove_part_file(part_path: str):
+    """Delete a .part file if it still exists"""
+    try:
+        if part_path and os.path.exists(part_path):
+            os.remove(part_path)
+    except OSError as e:
+        print(f"Error removing upload part file: {e}")
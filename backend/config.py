@@ -29,5 +29,96 @@ ADMIN_USERNAME = os.getenv("ADMIN_USERNAME", "admin")
 ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "NSRM0902@")
 
 # Flask Configuration
-SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key-change-in-production")
+# Signs login tokens and must be the same for every worker; admin endpoints stay closed while it is unset
+SECRET_KEY = os.getenv("SECRET_KEY", "")
 
+# Chat push delivery
+# "memory" fans events out inside one process; use "mongodb" when running several worker processes
+CHAT_EVENT_BROKER = os.getenv("CHAT_EVENT_BROKER", "memory")
+# An event stream ends after this many seconds and the browser reconnects, so open
+# tabs give their server thread back regularly instead of holding it forever
+CHAT_EVENT_STREAM_SECONDS = int(os.getenv("CHAT_EVENT_STREAM_SECONDS", "60"))
+# Open event streams per server process; each holds a thread, so further tabs get 503
+# and poll instead, leaving the remaining SERVER_THREADS for API requests
+CHAT_EVENT_MAX_STREAMS = int(os.getenv("CHAT_EVENT_MAX_STREAMS", "16"))
+
+# Chunked uploads
+# Clients send large files in chunks of this size; the total file may exceed the per-request limit
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(8 * 1024 * 1024)))
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", str(50 * 1024 * 1024 * 1024)))
+# Unfinished upload sessions (and their partial files) are removed after this many hours of inactivity
+UPLOAD_SESSION_TTL_HOURS = int(os.getenv("UPLOAD_SESSION_TTL_HOURS", "24"))
+
+# File downloads
+# "direct" streams files from Flask; "x-accel" (nginx) or "x-sendfile" (Apache/lighttpd) let the front proxy send them
+FILE_SERVE_MODE = os.getenv("FILE_SERVE_MODE", "direct")
+# nginx "internal" location aliased to backend/uploads, used in x-accel mode
+X_ACCEL_UPLOADS_PREFIX = os.getenv("X_ACCEL_UPLOADS_PREFIX", "/protected-uploads/")
+# Browser cache lifetime for uploaded files (they never change once stored)
+FILE_CACHE_MAX_AGE = int(os.getenv("FILE_CACHE_MAX_AGE", str(7 * 24 * 3600)))
+
+# Shot thumbnails
+THUMBNAIL_MAX_UPLOAD_SIZE = int(os.getenv("THUMBNAIL_MAX_UPLOAD_SIZE", str(20 * 1024 * 1024)))
+# Versioned thumbnail URLs (?v=...) never change content, so browsers may keep them this long
+THUMBNAIL_CACHE_MAX_AGE = int(os.getenv("THUMBNAIL_CACHE_MAX_AGE", str(365 * 24 * 3600)))
+
+# Bulk shot import and update
+# Most rows accepted by one POST /api/project/<id>/shots/import request
+MAX_SHOT_IMPORT_ROWS = int(os.getenv("MAX_SHOT_IMPORT_ROWS", "5000"))
+# Most shots changed by one PUT /api/project/<id>/shots/bulk request
+MAX_SHOT_BULK_UPDATES = int(os.getenv("MAX_SHOT_BULK_UPDATES", "5000"))
+
+# User display info cache
+# Names and roles are cached per process for this many seconds (0 disables caching)
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+
+# Authentication
+# Login tokens (signed with SECRET_KEY) expire after this many hours
+AUTH_TOKEN_MAX_AGE_HOURS = float(os.getenv("AUTH_TOKEN_MAX_AGE_HOURS", "12"))
+
+# User activity heartbeats
+# Heartbeats are buffered in memory and written to MongoDB in one batch per interval
+ACTIVITY_FLUSH_INTERVAL_SECONDS = float(os.getenv("ACTIVITY_FLUSH_INTERVAL_SECONDS", "15"))
+# A user's last_activity is rewritten at most once per window
+ACTIVITY_DEDUPE_SECONDS = float(os.getenv("ACTIVITY_DEDUPE_SECONDS", "60"))
+# Presence queries ("active in the last N minutes") up to this window are answered from memory
+PRESENCE_RETENTION_MINUTES = int(os.getenv("PRESENCE_RETENTION_MINUTES", "60"))
+# Most usernames accepted by one /api/users/presence request
+MAX_PRESENCE_USERNAMES = int(os.getenv("MAX_PRESENCE_USERNAMES", "200"))
+
+# Approved project deletions
+# Shots, files, chats and uploads of a deleted project are removed by a background job in batches of this size
+DELETION_BATCH_SIZE = int(os.getenv("DELETION_BATCH_SIZE", "200"))
+# A job whose worker stopped renewing its lease for this long (crash, restart) is resumed by another worker
+DELETION_JOB_LEASE_SECONDS = int(os.getenv("DELETION_JOB_LEASE_SECONDS", "300"))
+# How often idle workers look for queued or abandoned jobs
+DELETION_POLL_INTERVAL_SECONDS = float(os.getenv("DELETION_POLL_INTERVAL_SECONDS", "30"))
+# Failed jobs are retried this many times before they are left as "failed"
+DELETION_MAX_ATTEMPTS = int(os.getenv("DELETION_MAX_ATTEMPTS", "5"))
+
+# Production server (serve.py, gunicorn.conf.py)
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "5000"))
+# gunicorn worker processes; each has its own MongoDB client and caches (waitress always runs one process)
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", str(min(os.cpu_count() or 1, 4))))
+# Threads per process: up to CHAT_EVENT_MAX_STREAMS are held by chat event streams,
+# the rest serve API requests
+SERVER_THREADS = int(os.getenv("SERVER_THREADS", str(CHAT_EVENT_MAX_STREAMS + 16)))
+# Seconds an idle keep-alive connection stays open (behind a load balancer, set it above the balancer's idle timeout)
+SERVER_KEEPALIVE_SECONDS = int(os.getenv("SERVER_KEEPALIVE_SECONDS", "5"))
+# Workers that stop responding for this long are restarted
+SERVER_TIMEOUT_SECONDS = int(os.getenv("SERVER_TIMEOUT_SECONDS", "120"))
+# On shutdown or reload, in-flight requests get this long to finish
+SERVER_GRACEFUL_TIMEOUT_SECONDS = int(os.getenv("SERVER_GRACEFUL_TIMEOUT_SECONDS", "30"))
+# Workers are recycled after this many requests (0 disables), with jitter so they do not restart together
+SERVER_MAX_REQUESTS = int(os.getenv("SERVER_MAX_REQUESTS", "0"))
+
+# Password hashing
+# bcrypt cost factor for new hashes (existing hashes keep the cost they were created with)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Passwords hashed/verified in parallel per server process, and how many more may wait before
+# requests get 503. The SERVER_WORKERS processes share the CPUs, so the default splits them
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", str(max(1, (os.cpu_count() or 2) // max(1, SERVER_WORKERS)))))
+BCRYPT_MAX_QUEUE = int(os.getenv("BCRYPT_MAX_QUEUE", "32"))
+# Retry-After (seconds) sent with 503 when the pool is saturated
+BCRYPT_RETRY_AFTER_SECONDS = int(os.getenv("BCRYPT_RETRY_AFTER_SECONDS", "2"))
@@ -3,10 +3,36 @@ MongoDB database connection and operations
 """
 from pymongo import MongoClient
 from pymongo.errors import ConnectionFailure, DuplicateKeyError
-import bcrypt
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Optional, Dict, List
-from config import MONGODB_URI, MONGODB_DB_NAME, ADMIN_USERNAME, ADMIN_PASSWORD
+from config import MONGODB_URI, MONGODB_DB_NAME, ADMIN_USERNAME, ADMIN_PASSWORD, CHAT_EVENT_BROKER, USER_CACHE_TTL_SECONDS
+from config import ACTIVITY_FLUSH_INTERVAL_SECONDS, ACTIVITY_DEDUPE_SECONDS, PRESENCE_RETENTION_MINUTES
+from chat_events import create_event_broker
+from user_cache import UserProfileCache
+from password_pool import password_pool, PasswordPoolBusy
+from activity_tracker import ActivityTracker
+
+# Fields shot listings can be sorted by (each backed by a (project_id, field, _id) index)
+SHOT_SORT_FIELDS = ("created_at", "updated_at", "shot_name")
+
+# Shot fields that can be locked, and the flag that locks each
+SHOT_LOCK_FIELDS = {
+    "description": "description_locked",
+    "resolution": "resolution_locked",
+    "duration": "duration_locked",
+}
+
+
+def reference_id_match(*ids) -> Dict:
+    """
+    Query value matching project_id / shot_id references stored as ObjectIds or as strings
+    During a rolling deploy, processes of the previous release still write strings. Match
+    ObjectIds only once every process runs this release and `python migrate.py reference-ids`
+    has been run again.
+    """
+    from bson import ObjectId
+    object_ids = [ObjectId(str(value)) for value in ids]
+    return {"$in": object_ids + [str(object_id) for object_id in object_ids]}
 
 
 class Database:
@@ -15,8 +41,27 @@ class Database:
     def __init__(self):
         self.client = None
         self.db = None
+        self.user_cache = UserProfileCache(USER_CACHE_TTL_SECONDS)
         self.connect()
         self.initialize_database()
+        self._create_process_state()
+    
+    def _create_process_state(self):
+        """Create the per-process chat event broker and activity tracker"""
+        self.events = create_event_broker(self.db, CHAT_EVENT_BROKER)
+        self.activity = ActivityTracker(
+            self.db.users, ACTIVITY_FLUSH_INTERVAL_SECONDS, ACTIVITY_DEDUPE_SECONDS, PRESENCE_RETENTION_MINUTES
+        )
+    
+    def reinitialize_after_fork(self):
+        """
+        Give a forked worker process its own MongoDB client, caches and background state
+        A MongoClient must not be used across fork; called from gunicorn's post_fork hook
+        """
+        self.connect()
+        self.user_cache = UserProfileCache(USER_CACHE_TTL_SECONDS)
+        password_pool.reinitialize()
+        self._create_process_state()
     
     def connect(self):
         """Connect to MongoDB"""
@@ -36,10 +81,7 @@ class Database:
     
     def create_or_update_admin(self, password: str):
         """Create or update admin user with specified password"""
-        hashed_password = bcrypt.hashpw(
-            password.encode('utf-8'),
-            bcrypt.gensalt()
-        )
+        hashed_password = self.hash_password(password)
         
         admin_user = self.db.users.find_one({"username": ADMIN_USERNAME})
         if admin_user:
@@ -53,6 +95,8 @@ class Database:
                 }}
             )
             print(f"Admin user '{ADMIN_USERNAME}' password updated")
+            self.bump_versions("users")
+            self.user_cache.invalidate(ADMIN_USERNAME)
         else:
             # Create new admin
             self.db.users.insert_one({
@@ -63,41 +107,94 @@ class Database:
                 "created_at": datetime.utcnow()
             })
             print(f"Admin user '{ADMIN_USERNAME}' created")
+            self.bump_versions("users")
     
     def initialize_database(self):
         """Initialize database with indexes and admin user"""
         # Create indexes
         self.db.users.create_index("username", unique=True)
+        self.db.users.create_index("last_activity")
         self.db.pending_registrations.create_index("username", unique=True)
         self.db.projects.create_index("owner")
         self.db.projects.create_index("members")
         self.db.projects.create_index("workers")
         self.db.shots.create_index("project_id")
+        self.db.shots.create_index([("project_id", 1), ("created_at", 1), ("_id", 1)])
+        self.db.shots.create_index([("project_id", 1), ("updated_at", 1), ("_id", 1)])
+        self.db.shots.create_index([("project_id", 1), ("shot_name", 1), ("_id", 1)])
+        self.db.shots.create_index([("project_id", 1), ("status", 1), ("created_at", 1)])
+        self.db.shots.create_index([("project_id", 1), ("shot_workers", 1)])
         self.db.pending_deletions.create_index("project_id", unique=True)
+        self.db.deletion_jobs.create_index("project_id", unique=True)
+        self.db.deletion_jobs.create_index([("status", 1), ("lease_until", 1)])
         self.db.messages.create_index("project_id")
         self.db.messages.create_index("shot_id")
         self.db.messages.create_index("created_at")
         self.db.files.create_index("project_id")
         self.db.files.create_index("shot_id")
         self.db.files.create_index("created_at")
+        # Files referencing a blob (upload deduplication)
+        self.db.files.create_index("blob_sha256", sparse=True)
+        self.db.messages.create_index([("project_id", 1), ("created_at", 1), ("_id", 1)])
+        self.db.messages.create_index([("shot_id", 1), ("created_at", 1), ("_id", 1)])
+        self.db.files.create_index([("project_id", 1), ("created_at", 1), ("_id", 1)])
+        self.db.files.create_index([("shot_id", 1), ("created_at", 1), ("_id", 1)])
+        self.db.upload_sessions.create_index("expires_at")
         # Chat rooms indexes
         self.db.chat_rooms.create_index("project_id")
         self.db.chat_rooms.create_index("shot_id")
         self.db.chat_rooms.create_index("participants")
         self.db.chat_rooms.create_index("chat_type")  # "project", "shot", "personal"
         self.db.messages.create_index("chat_room_id")
+        self.db.messages.create_index([("chat_room_id", 1), ("created_at", -1)])
+        self.db.chat_read_states.create_index([("chat_room_id", 1), ("username", 1)], unique=True)
+        self.db.chat_read_states.create_index([("username", 1), ("chat_room_id", 1)])
         
         # Create admin user if it doesn't exist (using default password)
         admin_user = self.db.users.find_one({"username": ADMIN_USERNAME})
         if not admin_user:
             self.create_or_update_admin(ADMIN_PASSWORD)
-    
+
+    def bump_versions(self, *scopes: str):
+        """
+        Increment change counters for the given scopes
+        Scopes are collection names ("users", "projects", "shots") or "chat:<username>";
+        the counters back the ETags of read-mostly GET endpoints
+        """
+        try:
+            from pymongo import UpdateOne
+
+            scopes = {scope for scope in scopes if scope}
+            if scopes:
+                self.db.change_versions.bulk_write([
+                    UpdateOne({"_id": scope}, {"$inc": {"version": 1}}, upsert=True)
+                    for scope in scopes
+                ], ordered=False)
+        except Exception as e:
+            print(f"Error bumping change versions: {e}")
+
+    def get_version_tag(self, scopes: List[str]) -> Optional[str]:
+        """Get a version string for the given scopes (one indexed query, no enrichment)"""
+        try:
+            documents = self.db.change_versions.find({"_id": {"$in": list(scopes)}})
+            versions = {document["_id"]: document.get("version", 0) for document in documents}
+            return ";".join(f"{scope}={versions.get(scope, 0)}" for scope in sorted(scopes))
+        except Exception as e:
+            print(f"Error getting version tag: {e}")
+            return None
+
     def hash_password(self, password: str) -> bytes:
-        """Hash a password using bcrypt"""
-        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+        """
+        Hash a password using bcrypt (on the bounded password pool)
+        Raises PasswordPoolBusy when the pool is saturated
+        """
+        return password_pool.hash(password)
     
     def verify_password(self, password: str, password_hash) -> bool:
-        """Verify a password against a hash"""
+        """
+        Verify a password against a hash (on the bounded password pool)
+        Raises PasswordPoolBusy when the pool is saturated
+        """
         # Handle both bytes and str types from MongoDB
         if isinstance(password_hash, str):
             password_hash = password_hash.encode('utf-8')
@@ -105,7 +202,9 @@ class Database:
             return False
         
         try:
-            return bcrypt.checkpw(password.encode('utf-8'), password_hash)
+            return password_pool.verify(password, password_hash)
+        except PasswordPoolBusy:
+            raise
         except Exception as e:
             print(f"Password verification error: {e}")
             return False
@@ -144,6 +243,8 @@ class Database:
                     "is_admin": False
                 })
                 self.db.users.insert_one(user_data)
+                self.bump_versions("users")
+                self.user_cache.invalidate(username)
             else:
                 # Create pending registration
                 self.db.pending_registrations.insert_one(user_data)
@@ -161,6 +262,24 @@ class Database:
             return user
         return None
     
+    def _load_user_infos(self, usernames: List[str]) -> Dict[str, Dict]:
+        """Fetch display info of several users in one query (loader for user_cache)"""
+        fields = ("username", "name", "role", "is_admin", "approved")
+        users = self.db.users.find({"username": {"$in": usernames}}, {field: 1 for field in fields})
+        return {user["username"]: {field: user[field] for field in fields if field in user} for user in users}
+    
+    def get_user_info(self, username: str) -> Optional[Dict]:
+        """
+        Get a user's display info (username, name, role, is_admin, approved) from the user cache
+        The returned dict is shared with the cache and must not be modified
+        """
+        return self.user_cache.get(username, self._load_user_infos)
+    
+    def get_user_infos(self, usernames) -> Dict[str, Dict]:
+        """Get display info of several users from the user cache; unknown users are left out"""
+        infos = self.user_cache.get_many(usernames, self._load_user_infos)
+        return {username: info for username, info in infos.items() if info}
+    
     def authenticate_user(self, username: str, password: str) -> bool:
         """Authenticate a user"""
         user = self.db.users.find_one({"username": username})
@@ -184,13 +303,14 @@ class Database:
         return is_valid
     
     def update_user_activity(self, username: str) -> bool:
-        """Update user's last activity time"""
+        """
+        Update user's last activity time
+        Recorded in memory and written by the activity tracker's next bulk flush
+        """
         try:
-            self.db.users.update_one(
-                {"username": username},
-                {"$set": {"last_activity": datetime.utcnow()}},
-                upsert=False
-            )
+            # Unknown users are ignored, as the direct update used to match nothing
+            if self.get_user_info(username):
+                self.activity.record(username)
             return True
         except Exception as e:
             print(f"Error updating user activity: {e}")
@@ -271,7 +391,7 @@ class Database:
     def get_partner_requests(self, username: str) -> List[Dict]:
         """Get all pending partner requests for a user"""
         try:
-            user = self.db.users.find_one({"username": username})
+            user = self.db.users.find_one({"username": username}, {"partner_requests": 1})
             if not user:
                 return []
             
@@ -280,7 +400,7 @@ class Database:
                 return []
             
             # Get requester user details
-            requesters = list(self.db.users.find({"username": {"$in": request_usernames}}))
+            requesters = self.get_user_infos(request_usernames).values()
             
             result = []
             for requester in requesters:
@@ -310,7 +430,7 @@ class Database:
     def get_partners(self, username: str) -> List[Dict]:
         """Get all partners (friends) of a user"""
         try:
-            user = self.db.users.find_one({"username": username})
+            user = self.db.users.find_one({"username": username}, {"partners": 1})
             if not user:
                 return []
             
@@ -319,7 +439,7 @@ class Database:
                 return []
             
             # Get partner user details
-            partners = list(self.db.users.find({"username": {"$in": partners_usernames}}))
+            partners = self.get_user_infos(partners_usernames).values()
             
             result = []
             for partner in partners:
@@ -335,31 +455,76 @@ class Database:
             return []
     
     def get_active_users(self, minutes: int = 5) -> List[Dict]:
-        """Get users who were active in the last N minutes"""
+        """
+        Get users who were active in the last N minutes
+        Windows within the presence retention are answered from the in-memory presence index
+        """
         try:
             from datetime import timedelta
             cutoff_time = datetime.utcnow() - timedelta(minutes=minutes)
             
+            if minutes <= self.activity.retention_minutes:
+                recent = self.activity.seen_since(cutoff_time)
+                users = []
+                for username, info in self.get_user_infos(recent).items():
+                    if info.get("approved"):
+                        users.append(dict(info, last_activity=recent[username]))
+                users.sort(key=lambda user: user["last_activity"], reverse=True)
+                return self._active_user_list(users)
+            
             # Get users with last_activity field set and within the time window
             users = list(self.db.users.find({
                 "approved": True,
                 "last_activity": {"$exists": True, "$gte": cutoff_time}
-            }).sort("last_activity", -1))
-            
-            user_list = []
+            }, {"username": 1, "name": 1, "role": 1, "last_activity": 1}))
+            
+            # Heartbeats not flushed yet are newer than what the database has
+            recent = self.activity.seen_since(cutoff_time)
+            listed = {user.get("username") for user in users}
+            unflushed = [username for username in recent if username not in listed]
+            for info in self.get_user_infos(unflushed).values():
+                if info.get("approved"):
+                    users.append(dict(info))
             for user in users:
-                last_activity = user.get("last_activity")
-                user_list.append({
-                    "username": user.get("username"),
-                    "name": user.get("name", user.get("username")),
-                    "role": user.get("role", ""),
-                    "last_activity": last_activity.isoformat() if last_activity else None
-                })
-            return user_list
+                seen = recent.get(user.get("username"))
+                if seen and (not user.get("last_activity") or seen > user["last_activity"]):
+                    user["last_activity"] = seen
+            users.sort(key=lambda user: user["last_activity"], reverse=True)
+            return self._active_user_list(users)
         except Exception as e:
             print(f"Error getting active users: {e}")
             return []
     
+    def _active_user_list(self, users: List[Dict]) -> List[Dict]:
+        """API representation of active users"""
+        user_list = []
+        for user in users:
+            last_activity = user.get("last_activity")
+            user_list.append({
+                "username": user.get("username"),
+                "name": user.get("name", user.get("username")),
+                "role": user.get("role", ""),
+                "last_activity": last_activity.isoformat() if last_activity else None
+            })
+        return user_list
+    
+    def get_users_presence(self, usernames: List[str], minutes: int = 5) -> Dict[str, Dict]:
+        """
+        Presence of specific users, e.g. the ones displayed on a page
+        Returns {username: {"active": bool, "last_activity": iso or None}};
+        last_activity is only known within the presence retention window
+        """
+        from datetime import timedelta
+        cutoff_time = datetime.utcnow() - timedelta(minutes=minutes)
+        presence = {}
+        for username in usernames:
+            last_activity = self.activity.last_seen(username)
+            presence[username] = {
+                "active": bool(last_activity and last_activity >= cutoff_time),
+                "last_activity": last_activity.isoformat() if last_activity else None
+            }
+        return presence
+    
     def get_pending_registrations(self) -> List[Dict]:
         """Get all pending registrations"""
         pending = list(self.db.pending_registrations.find())
@@ -391,6 +556,8 @@ class Database:
                 "is_admin": False,
                 "created_at": pending.get("created_at", datetime.utcnow())
             })
+            self.bump_versions("users")
+            self.user_cache.invalidate(username)
         
         # Remove from pending
         self.db.pending_registrations.delete_one({"username": username})
@@ -414,21 +581,6 @@ class Database:
         }
         return profile
     
-    def is_admin(self, username: str, password: str) -> bool:
-        """Check if user is admin with correct password"""
-        user = self.db.users.find_one({"username": username})
-        if not user:
-            return False
-        
-        if not user.get("is_admin", False):
-            return False
-        
-        password_hash = user.get("password_hash")
-        if not password_hash:
-            return False
-        
-        return self.verify_password(password, password_hash)
-    
     def get_projects(self, username: str = None) -> List[Dict]:
         """Get all projects, optionally filtered by username"""
         query = {}
@@ -470,6 +622,7 @@ class Database:
                 "updated_at": datetime.utcnow()
             })
             project_id = str(result.inserted_id)
+            self.bump_versions("projects")
             
             # Create project chat room automatically
             chat_room_id = self.create_chat_room(
@@ -520,12 +673,37 @@ class Database:
                 {"_id": ObjectId(project_id)},
                 {"$set": update_data}
             )
+            if result.modified_count > 0:
+                self.bump_versions("projects")
+                if workers is not None:
+                    self._set_project_chat_participants(project_id, workers)
             
             return result.modified_count > 0
         except Exception as e:
             print(f"Error updating project: {e}")
             return False
     
+    def _set_project_chat_participants(self, project_id: str, workers: List[str]):
+        """Make the project chat room's participants match the project workers"""
+        room = self.db.chat_rooms.find_one(
+            {"chat_type": "project", "project_id": reference_id_match(project_id)}, {"participants": 1}
+        )
+        if not room:
+            return
+        
+        previous = set(room.get("participants", []))
+        current = set(workers)
+        if previous == current:
+            return
+        self.db.chat_rooms.update_one(
+            {"_id": room["_id"]},
+            {"$set": {"participants": list(current), "updated_at": datetime.utcnow()}}
+        )
+        
+        # Let added and removed participants refresh their room list
+        self._publish_chat_event({"type": "rooms_changed", "chat_room_id": str(room["_id"])}, list(previous ^ current))
+        self.bump_versions(*[f"chat:{participant}" for participant in previous | current])
+    
     def get_all_users(self) -> List[Dict]:
         """Get all approved users (for project member selection)"""
         users = list(self.db.users.find({"approved": True}))
@@ -555,10 +733,10 @@ class Database:
                 if 'workers' in project and project['workers']:
                     usernames_to_lookup.update(project['workers'])
                 
-                # Fetch all users in one query
+                # Fetch all users in one query (or from the user cache)
                 user_map = {}
                 if usernames_to_lookup:
-                    users = list(self.db.users.find({"username": {"$in": list(usernames_to_lookup)}}))
+                    users = self.get_user_infos(usernames_to_lookup).values()
                     for user in users:
                         username = user.get("username")
                         name = user.get("name", username)
@@ -626,19 +804,48 @@ class Database:
     
     def get_shots(self, project_id: str) -> List[Dict]:
         """Get all shots for a project"""
+        shots, _ = self.get_shots_page(project_id)
+        return shots
+    
+    def get_shots_page(self, project_id: str, filters: Optional[Dict] = None, sort: str = "-created_at",
+                       limit: int = None, cursor: str = None, fields: List[str] = None):
+        """
+        Get one page of a project's shots
+        filters: status, worker (in shot_workers), resolution_locked / description_locked /
+        duration_locked (bool), name_prefix (shot_name starts with)
+        sort: one of SHOT_SORT_FIELDS, prefixed with "-" for descending (default newest first)
+        Returns (shots, next_cursor)
+        """
         try:
-            from bson import ObjectId
-            print(f"Getting shots for project_id: {project_id}")
-            shots = list(self.db.shots.find({"project_id": project_id}).sort("created_at", -1))
-            print(f"Found {len(shots)} shots")
+            import re
+            filters = filters or {}
+            query = {"project_id": reference_id_match(project_id)}
+            if filters.get("status"):
+                query["status"] = filters["status"]
+            if filters.get("worker"):
+                query["shot_workers"] = filters["worker"]
+            for lock_field in ("resolution_locked", "description_locked", "duration_locked"):
+                if filters.get(lock_field) is True:
+                    query[lock_field] = True
+                elif filters.get(lock_field) is False:
+                    # Shots that were never locked have no lock field
+                    query[lock_field] = {"$ne": True}
+            if filters.get("name_prefix"):
+                # Anchored, case-sensitive prefix so the (project_id, shot_name) index is used
+                query["shot_name"] = {"$regex": "^" + re.escape(filters["name_prefix"])}
+            
+            direction = -1 if sort.startswith("-") else 1
+            shots, next_cursor = self._find_page(
+                self.db.shots, query, direction, limit, cursor, fields, sort_field=sort.lstrip("-")
+            )
             for shot in shots:
                 shot['_id'] = str(shot['_id'])
-            return shots
+                if 'project_id' in shot:
+                    shot['project_id'] = str(shot['project_id'])
+            return shots, next_cursor
         except Exception as e:
             print(f"Error getting shots: {e}")
-            import traceback
-            traceback.print_exc()
-            return []
+            return [], None
     
     def get_shot(self, shot_id: str) -> Optional[Dict]:
         """Get a single shot by ID"""
@@ -647,8 +854,9 @@ class Database:
             shot = self.db.shots.find_one({"_id": ObjectId(shot_id)})
             if shot:
                 shot['_id'] = str(shot['_id'])
+                shot['project_id'] = str(shot.get("project_id"))
                 # Get project info
-                project = self.db.projects.find_one({"_id": ObjectId(shot.get("project_id"))})
+                project = self.db.projects.find_one({"_id": ObjectId(shot["project_id"])})
                 if project:
                     shot['project'] = {
                         "_id": str(project['_id']),
@@ -661,20 +869,50 @@ class Database:
             print(f"Error getting shot: {e}")
             return None
     
-    def update_shot_thumbnail(self, shot_id: str, thumbnail_path: Optional[str]) -> bool:
-        """Update thumbnail path for a shot"""
+    def get_shot_thumbnails(self, project_id: str, shot_ids: Optional[List[str]] = None, limit: int = 400) -> List[Dict]:
+        """
+        Get the thumbnail fields of a project's shots in one query
+        With shot_ids the result follows their order; otherwise newest shots first (as get_shots)
+        Shots without a thumbnail are left out
+        """
+        try:
+            from bson import ObjectId
+            query = {"project_id": reference_id_match(project_id), "thumbnail_path": {"$exists": True}}
+            projection = {"thumbnail_path": 1, "thumbnail_version": 1}
+            if shot_ids is not None:
+                object_ids = [ObjectId(shot_id) for shot_id in shot_ids if ObjectId.is_valid(shot_id)][:limit]
+                query["_id"] = {"$in": object_ids}
+                shots = {str(shot["_id"]): shot for shot in self.db.shots.find(query, projection)}
+                ordered = [shots[str(object_id)] for object_id in object_ids if str(object_id) in shots]
+            else:
+                ordered = list(self.db.shots.find(query, projection).sort("created_at", -1).limit(limit))
+            for shot in ordered:
+                shot['_id'] = str(shot['_id'])
+            return ordered
+        except Exception as e:
+            print(f"Error getting shot thumbnails: {e}")
+            return []
+    
+    def update_shot_thumbnail(self, shot_id: str, thumbnail_path: Optional[str],
+                              thumbnail_version: Optional[str] = None) -> bool:
+        """Update thumbnail path (and rendition version) for a shot"""
         try:
             from bson import ObjectId
             if thumbnail_path:
+                update = {"thumbnail_path": thumbnail_path}
+                if thumbnail_version:
+                    update["thumbnail_version"] = thumbnail_version
                 result = self.db.shots.update_one(
                     {"_id": ObjectId(shot_id)},
-                    {"$set": {"thumbnail_path": thumbnail_path}}
+                    {"$set": update}
                 )
             else:
                 result = self.db.shots.update_one(
                     {"_id": ObjectId(shot_id)},
-                    {"$unset": {"thumbnail_path": ""}}
+                    {"$unset": {"thumbnail_path": "", "thumbnail_version": ""}}
                 )
+            if result.modified_count > 0:
+                self.bump_versions("shots")
             return result.modified_count > 0 or result.matched_count > 0
         except Exception as e:
             print(f"Error updating shot thumbnail: {e}")
@@ -688,6 +926,8 @@ class Database:
                 {"_id": ObjectId(shot_id)},
                 {"$set": {"resolution": {"width": width, "height": height}}}
             )
+            if result.modified_count > 0:
+                self.bump_versions("shots")
             return result.modified_count > 0 or result.matched_count > 0
         except Exception as e:
             print(f"Error updating shot resolution: {e}")
@@ -701,6 +941,8 @@ class Database:
                 {"_id": ObjectId(shot_id)},
                 {"$set": {"description": description, "updated_at": datetime.utcnow()}}
             )
+            if result.modified_count > 0:
+                self.bump_versions("shots")
             return result.modified_count > 0 or result.matched_count > 0
         except Exception as e:
             print(f"Error updating shot description: {e}")
@@ -714,6 +956,8 @@ class Database:
                 {"_id": ObjectId(shot_id)},
                 {"$set": {"resolution_locked": locked, "updated_at": datetime.utcnow()}}
             )
+            if result.modified_count > 0:
+                self.bump_versions("shots")
             return result.modified_count > 0 or result.matched_count > 0
         except Exception as e:
             print(f"Error updating shot resolution lock: {e}")
@@ -727,6 +971,8 @@ class Database:
                 {"_id": ObjectId(shot_id)},
                 {"$set": {"description_locked": locked, "updated_at": datetime.utcnow()}}
             )
+            if result.modified_count > 0:
+                self.bump_versions("shots")
             return result.modified_count > 0 or result.matched_count > 0
         except Exception as e:
             print(f"Error updating shot description lock: {e}")
@@ -753,6 +999,8 @@ class Database:
                     # Update participants to match shot_workers
                     self.set_chat_room_participants(str(shot_chat_room["_id"]), shot_workers)
             
+            if result.modified_count > 0:
+                self.bump_versions("shots")
             return result.modified_count > 0 or result.matched_count > 0
         except Exception as e:
             print(f"Error updating shot workers: {e}")
@@ -766,41 +1014,148 @@ class Database:
                 {"_id": ObjectId(shot_id)},
                 {"$set": {"workers_assignment": workers_assignment, "updated_at": datetime.utcnow()}}
             )
+            if result.modified_count > 0:
+                self.bump_versions("shots")
             return result.modified_count > 0 or result.matched_count > 0
         except Exception as e:
             print(f"Error updating shot workers assignment: {e}")
             return False
     
-    def update_shot_duration(self, shot_id: str, start_frame: Optional[int], end_frame: Optional[int], total_frames: Optional[int]) -> bool:
-        """Update duration for a shot"""
+    def update_shots(self, project_id: str, patches: Dict[str, Dict]) -> Optional[Dict[str, Dict]]:
+        """
+        Apply field patches to many shots of a project with one bulk_write
+        patches maps shot IDs to validated fields: description, resolution, duration (only the
+        given frames change), description_locked / resolution_locked / duration_locked, shot_workers.
+        A patch that changes a locked field is not applied (locks set in the same patch apply after it).
+        Returns {shot_id: {"status": "updated" | "locked" | "not_found", "locked_fields": [...]}}
+        """
         try:
             from bson import ObjectId
-            
-            # Get current shot to preserve existing duration fields
-            shot = self.db.shots.find_one({"_id": ObjectId(shot_id)})
-            if not shot:
-                return False
-            
-            # Get existing duration or create new one
-            duration = shot.get("duration", {})
-            
-            # Update only provided fields
-            if start_frame is not None:
-                duration["start_frame"] = start_frame
-            if end_frame is not None:
-                duration["end_frame"] = end_frame
-            if total_frames is not None:
-                duration["total_frames"] = total_frames
-            
-            # Update shot with duration object
-            result = self.db.shots.update_one(
-                {"_id": ObjectId(shot_id)},
-                {"$set": {"duration": duration, "updated_at": datetime.utcnow()}}
+            from pymongo import UpdateOne
+            
+            object_ids = [ObjectId(shot_id) for shot_id in patches if ObjectId.is_valid(shot_id)]
+            lock_projection = {lock: 1 for lock in SHOT_LOCK_FIELDS.values()}
+            shots = {str(shot["_id"]): shot for shot in self.db.shots.find(
+                {"_id": {"$in": object_ids}, "project_id": reference_id_match(project_id)}, lock_projection
+            )}
+            
+            now = datetime.utcnow()
+            results = {}
+            operations = []
+            guarded = {}
+            for shot_id, patch in patches.items():
+                shot = shots.get(shot_id)
+                if not shot:
+                    results[shot_id] = {"status": "not_found"}
+                    continue
+                locked = [field for field, lock in SHOT_LOCK_FIELDS.items() if field in patch and shot.get(lock)]
+                if locked:
+                    results[shot_id] = {"status": "locked", "locked_fields": locked}
+                    continue
+                
+                # The lock flags are checked again in the filter, so a lock set meanwhile still wins
+                query = {"_id": shot["_id"]}
+                update = {"updated_at": now}
+                for field, value in patch.items():
+                    if field == "duration":
+                        for name, frame in value.items():
+                            update[f"duration.{name}"] = frame
+                    else:
+                        update[field] = value
+                    if field in SHOT_LOCK_FIELDS:
+                        query[SHOT_LOCK_FIELDS[field]] = {"$ne": True}
+                operations.append(UpdateOne(query, {"$set": update}))
+                guarded[shot_id] = [field for field in patch if field in SHOT_LOCK_FIELDS]
+                results[shot_id] = {"status": "updated"}
+            
+            if not operations:
+                return results
+            
+            result = self.db.shots.bulk_write(operations, ordered=False)
+            if result.matched_count < len(operations):
+                # Some lock was set between the read and the write; find out which shots it blocked
+                for shot in self.db.shots.find({"_id": {"$in": [shots[shot_id]["_id"] for shot_id in guarded]}}, lock_projection):
+                    shot_id = str(shot["_id"])
+                    locked = [field for field in guarded[shot_id]
+                              if shot.get(SHOT_LOCK_FIELDS[field]) and not patches[shot_id].get(SHOT_LOCK_FIELDS[field])]
+                    if locked:
+                        results[shot_id] = {"status": "locked", "locked_fields": locked}
+            self.bump_versions("shots")
+            
+            workers_by_shot = {shots[shot_id]["_id"]: patch["shot_workers"] for shot_id, patch in patches.items()
+                               if "shot_workers" in patch and results[shot_id]["status"] == "updated"}
+            if workers_by_shot:
+                self._set_shot_chat_participants(workers_by_shot)
+            return results
+        except Exception as e:
+            print(f"Error updating shots: {e}")
+            return None
+    
+    def _set_shot_chat_participants(self, workers_by_shot: Dict):
+        """Make shot chat room participants match shot_workers for many shots ({shot ObjectId: workers})"""
+        from pymongo import UpdateOne
+        
+        rooms = list(self.db.chat_rooms.find(
+            {"chat_type": "shot", "shot_id": {"$in": list(workers_by_shot)}}, {"shot_id": 1, "participants": 1}
+        ))
+        if not rooms:
+            return
+        
+        now = datetime.utcnow()
+        changed = set()
+        affected = set()
+        for room in rooms:
+            previous = set(room.get("participants", []))
+            current = set(workers_by_shot[room["shot_id"]])
+            changed |= previous ^ current
+            affected |= previous | current
+        self.db.chat_rooms.bulk_write([
+            UpdateOne({"_id": room["_id"]}, {"$set": {"participants": workers_by_shot[room["shot_id"]], "updated_at": now}})
+            for room in rooms
+        ], ordered=False)
+        
+        # Let added and removed participants refresh their room list
+        self._publish_chat_event({"type": "rooms_changed"}, list(changed))
+        self.bump_versions(*[f"chat:{participant}" for participant in affected])
+    
+    def update_shot_duration(self, shot_id: str, start_frame: Optional[int], end_frame: Optional[int],
+                             total_frames: Optional[int]):
+        """
+        Update the given duration frames of a shot in one atomic update (other frames are kept)
+        The update only matches while duration_locked is not set.
+        Returns (status, duration): status is "updated", "locked", "not_found" or "error";
+        duration is the stored duration after an update
+        """
+        try:
+            from bson import ObjectId
+            from pymongo import ReturnDocument
+            
+            if not ObjectId.is_valid(shot_id):
+                return "not_found", None
+            
+            # Dotted paths change only the provided frames, so concurrent edits of other frames survive
+            update = {"updated_at": datetime.utcnow()}
+            for name, frame in (("start_frame", start_frame), ("end_frame", end_frame), ("total_frames", total_frames)):
+                if frame is not None:
+                    update[f"duration.{name}"] = frame
+            
+            shot = self.db.shots.find_one_and_update(
+                {"_id": ObjectId(shot_id), "duration_locked": {"$ne": True}},
+                {"$set": update},
+                projection={"duration": 1},
+                return_document=ReturnDocument.AFTER
             )
-            return result.modified_count > 0 or result.matched_count > 0
+            if shot:
+                self.bump_versions("shots")
+                return "updated", shot.get("duration", {})
+            
+            # Nothing matched: tell a locked shot from a missing one
+            if self.db.shots.find_one({"_id": ObjectId(shot_id)}, {"_id": 1}):
+                return "locked", None
+            return "not_found", None
         except Exception as e:
             print(f"Error updating shot duration: {e}")
-            return False
+            return "error", None
     
     def update_shot_duration_lock(self, shot_id: str, locked: bool) -> bool:
         """Update duration lock status for a shot"""
@@ -810,18 +1165,97 @@ class Database:
                 {"_id": ObjectId(shot_id)},
                 {"$set": {"duration_locked": locked, "updated_at": datetime.utcnow()}}
             )
+            if result.modified_count > 0:
+                self.bump_versions("shots")
             return result.modified_count > 0 or result.matched_count > 0
         except Exception as e:
             print(f"Error updating shot duration lock: {e}")
             return False
     
+    def _encode_page_cursor(self, document: Dict, sort_field: str = "created_at") -> str:
+        """Build an opaque cursor pointing just past a document in (sort_field, _id) order"""
+        import base64
+        import json
+        
+        value = document.get(sort_field)
+        position = {"t": value.isoformat() if isinstance(value, datetime) else value, "id": str(document["_id"])}
+        if sort_field != "created_at":
+            position["f"] = sort_field
+        return base64.urlsafe_b64encode(json.dumps(position).encode("utf-8")).decode("ascii")
+    
+    def _decode_page_cursor(self, cursor: str):
+        """Decode a cursor from _encode_page_cursor into (sort_field, value, _id)"""
+        import base64
+        import json
+        from bson import ObjectId
+        
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8"))
+        sort_field = position.get("f", "created_at")
+        value = position["t"]
+        # Timestamp fields (created_at, updated_at) are stored as ISO strings
+        if sort_field.endswith("_at") and value is not None:
+            value = datetime.fromisoformat(value)
+        return sort_field, value, ObjectId(position["id"])
+    
+    def is_valid_page_cursor(self, cursor: str, sort_field: str = "created_at") -> bool:
+        """Check that a cursor from a previous page can be decoded and matches the sort order"""
+        try:
+            return self._decode_page_cursor(cursor)[0] == sort_field
+        except Exception:
+            return False
+    
+    def _find_page(self, collection, query: Dict, direction: int, limit: int = None,
+                   cursor: str = None, fields: List[str] = None, sort_field: str = "created_at"):
+        """
+        Fetch one page of documents ordered by (sort_field, _id)
+        direction is 1 (ascending) or -1 (descending); fields limits the returned fields.
+        Returns (documents, next_cursor); next_cursor is None on the last page
+        """
+        query = dict(query)
+        if cursor:
+            _, value, last_id = self._decode_page_cursor(cursor)
+            comparison = "$gt" if direction == 1 else "$lt"
+            query["$or"] = [
+                {sort_field: {comparison: value}},
+                {sort_field: value, "_id": {comparison: last_id}}
+            ]
+        
+        projection = None
+        if fields:
+            # The sort field is always needed to build the next cursor
+            projection = {field: 1 for field in fields if field and not field.startswith("$")}
+            projection[sort_field] = 1
+        
+        find_cursor = collection.find(query, projection).sort([(sort_field, direction), ("_id", direction)])
+        if limit:
+            # One extra document tells whether another page exists
+            find_cursor = find_cursor.limit(limit + 1)
+        documents = list(find_cursor)
+        
+        next_cursor = None
+        if limit and len(documents) > limit:
+            documents = documents[:limit]
+            next_cursor = self._encode_page_cursor(documents[-1], sort_field)
+        return documents, next_cursor
+    
+    def _serialize_message_or_file(self, document: Dict) -> Dict:
+        """Convert ObjectIds and datetimes of a message or file record to strings"""
+        for key in ("_id", "project_id", "shot_id", "file_id"):
+            if key in document and not isinstance(document[key], str):
+                document[key] = str(document[key])
+        # Convert datetime to ISO format string
+        for key in ("created_at", "updated_at"):
+            if isinstance(document.get(key), datetime):
+                document[key] = document[key].isoformat()
+        return document
+    
     def create_project_message(self, project_id: str, username: str, content: str) -> Optional[str]:
         """Create a new message for a project"""
         try:
             from bson import ObjectId
             
             # Get user info
-            user = self.db.users.find_one({"username": username})
+            user = self.get_user_info(username)
             author_name = user.get("name") if user else None
             
             message = {
@@ -842,28 +1276,26 @@ class Database:
     
     def get_project_messages(self, project_id: str) -> List[Dict]:
         """Get all messages for a project"""
+        messages, _ = self.get_project_messages_page(project_id)
+        return messages
+    
+    def get_project_messages_page(self, project_id: str, limit: int = None, cursor: str = None,
+                                  fields: List[str] = None):
+        """
+        Get one page of messages for a project (oldest first)
+        Returns (messages, next_cursor)
+        """
         try:
             from bson import ObjectId
             
-            messages = list(self.db.messages.find(
-                {"project_id": ObjectId(project_id)}
-            ).sort("created_at", 1))
-            
-            # Convert ObjectId to string
-            for message in messages:
-                message["_id"] = str(message["_id"])
-                message["project_id"] = str(message["project_id"])
-                # Convert datetime to ISO format string
-                if "created_at" in message:
-                    message["created_at"] = message["created_at"].isoformat()
-                if "updated_at" in message:
-                    message["updated_at"] = message["updated_at"].isoformat()
-            
-            return messages
+            messages, next_cursor = self._find_page(
+                self.db.messages, {"project_id": ObjectId(project_id)}, 1, limit, cursor, fields
+            )
+            return [self._serialize_message_or_file(message) for message in messages], next_cursor
             
         except Exception as e:
             print(f"Error getting project messages: {e}")
-            return []
+            return [], None
     
     def get_project_message(self, message_id: str) -> Optional[Dict]:
         """Get a single message by ID"""
@@ -896,7 +1328,7 @@ class Database:
             from bson import ObjectId
             
             # Get user info
-            user = self.db.users.find_one({"username": username})
+            user = self.get_user_info(username)
             author_name = user.get("name") if user else None
             
             message = {
@@ -921,47 +1353,32 @@ class Database:
     
     def get_shot_messages(self, shot_id: str) -> List[Dict]:
         """Get all messages for a shot"""
+        messages, _ = self.get_shot_messages_page(shot_id)
+        return messages
+    
+    def get_shot_messages_page(self, shot_id: str, limit: int = None, cursor: str = None,
+                               fields: List[str] = None):
+        """
+        Get one page of messages for a shot (oldest first)
+        Returns (messages, next_cursor)
+        """
         try:
             from bson import ObjectId
             
-            messages = list(self.db.messages.find(
-                {"shot_id": ObjectId(shot_id)}
-            ).sort("created_at", 1))
+            messages, next_cursor = self._find_page(
+                self.db.messages, {"shot_id": ObjectId(shot_id)}, 1, limit, cursor, fields
+            )
             
-            # Convert ObjectId to string and include file info
+            # One batched files query for every attachment on the page
+            self._attach_file_info(messages)
             for message in messages:
-                message["_id"] = str(message["_id"])
-                message["shot_id"] = str(message["shot_id"])
-                
-                # If message has file_id, get file info
-                if "file_id" in message:
-                    file_id = message["file_id"]
-                    # Convert ObjectId to string if needed
-                    if not isinstance(file_id, str):
-                        file_id = str(file_id)
-                    message["file_id"] = file_id
-                    
-                    # Get file record
-                    file_record = self.db.files.find_one({"_id": ObjectId(file_id)})
-                    if file_record:
-                        message["file"] = {
-                            "id": str(file_record["_id"]),
-                            "filename": file_record.get("filename", ""),
-                            "file_type": file_record.get("file_type", ""),
-                            "file_size": file_record.get("file_size", 0),
-                        }
-                
-                # Convert datetime to ISO format string
-                if "created_at" in message:
-                    message["created_at"] = message["created_at"].isoformat()
-                if "updated_at" in message:
-                    message["updated_at"] = message["updated_at"].isoformat()
+                self._serialize_message_or_file(message)
             
-            return messages
+            return messages, next_cursor
             
         except Exception as e:
             print(f"Error getting shot messages: {e}")
-            return []
+            return [], None
     
     def get_shot_message(self, message_id: str) -> Optional[Dict]:
         """Get a single message by ID"""
@@ -971,35 +1388,8 @@ class Database:
             message = self.db.messages.find_one({"_id": ObjectId(message_id)})
             
             if message:
-                message["_id"] = str(message["_id"])
-                if "project_id" in message:
-                    message["project_id"] = str(message["project_id"])
-                if "shot_id" in message:
-                    message["shot_id"] = str(message["shot_id"])
-                
-                # If message has file_id, get file info
-                if "file_id" in message:
-                    file_id = message["file_id"]
-                    # Convert ObjectId to string if needed
-                    if not isinstance(file_id, str):
-                        file_id = str(file_id)
-                    message["file_id"] = file_id
-                    
-                    # Get file record
-                    file_record = self.db.files.find_one({"_id": ObjectId(file_id)})
-                    if file_record:
-                        message["file"] = {
-                            "id": str(file_record["_id"]),
-                            "filename": file_record.get("filename", ""),
-                            "file_type": file_record.get("file_type", ""),
-                            "file_size": file_record.get("file_size", 0),
-                        }
-                
-                # Convert datetime to ISO format string
-                if "created_at" in message:
-                    message["created_at"] = message["created_at"].isoformat()
-                if "updated_at" in message:
-                    message["updated_at"] = message["updated_at"].isoformat()
+                self._attach_file_info([message])
+                self._serialize_message_or_file(message)
             
             return message
             
@@ -1007,13 +1397,44 @@ class Database:
             print(f"Error getting shot message: {e}")
             return None
     
-    def create_project_file(self, project_id: str, username: str, filename: str, file_path: str, file_size: int, file_type: str) -> Optional[str]:
-        """Create a new file record for a project"""
+    def _attach_file_info(self, messages: List[Dict]):
+        """Add file metadata to messages with a file_id (one $in query for all of them)"""
+        from bson import ObjectId
+        
+        file_ids = set()
+        for message in messages:
+            file_id = message.get("file_id")
+            if isinstance(file_id, str) and ObjectId.is_valid(file_id):
+                file_id = ObjectId(file_id)
+            if isinstance(file_id, ObjectId):
+                file_ids.add(file_id)
+        if not file_ids:
+            return
+        
+        file_records = self.db.files.find(
+            {"_id": {"$in": list(file_ids)}},
+            {"filename": 1, "file_type": 1, "file_size": 1}
+        )
+        files_by_id = {str(file_record["_id"]): file_record for file_record in file_records}
+        
+        for message in messages:
+            file_record = files_by_id.get(str(message.get("file_id")))
+            if file_record:
+                message["file"] = {
+                    "id": str(file_record["_id"]),
+                    "filename": file_record.get("filename", ""),
+                    "file_type": file_record.get("file_type", ""),
+                    "file_size": file_record.get("file_size", 0),
+                }
+    
+    def create_project_file(self, project_id: str, username: str, filename: str, file_path: str, file_size: int, file_type: str,
+                            blob_sha256: str = None) -> Optional[str]:
+        """Create a new file record for a project (blob_sha256 links it to a content-addressed blob)"""
         try:
             from bson import ObjectId
             
             # Get user info
-            user = self.db.users.find_one({"username": username})
+            user = self.get_user_info(username)
             author_name = user.get("name") if user else None
             
             file_record = {
@@ -1027,6 +1448,8 @@ class Database:
                 "created_at": datetime.utcnow(),
                 "updated_at": datetime.utcnow(),
             }
+            if blob_sha256:
+                file_record["blob_sha256"] = blob_sha256
             
             result = self.db.files.insert_one(file_record)
             return str(result.inserted_id)
@@ -1037,36 +1460,35 @@ class Database:
     
     def get_project_files(self, project_id: str) -> List[Dict]:
         """Get all files for a project"""
+        files, _ = self.get_project_files_page(project_id)
+        return files
+    
+    def get_project_files_page(self, project_id: str, limit: int = None, cursor: str = None,
+                               fields: List[str] = None):
+        """
+        Get one page of files for a project (newest first)
+        Returns (files, next_cursor)
+        """
         try:
             from bson import ObjectId
             
-            files = list(self.db.files.find(
-                {"project_id": ObjectId(project_id)}
-            ).sort("created_at", -1))
-            
-            # Convert ObjectId to string
-            for file_record in files:
-                file_record["_id"] = str(file_record["_id"])
-                file_record["project_id"] = str(file_record["project_id"])
-                # Convert datetime to ISO format string
-                if "created_at" in file_record:
-                    file_record["created_at"] = file_record["created_at"].isoformat()
-                if "updated_at" in file_record:
-                    file_record["updated_at"] = file_record["updated_at"].isoformat()
-            
-            return files
+            files, next_cursor = self._find_page(
+                self.db.files, {"project_id": ObjectId(project_id)}, -1, limit, cursor, fields
+            )
+            return [self._serialize_message_or_file(file_record) for file_record in files], next_cursor
             
         except Exception as e:
             print(f"Error getting project files: {e}")
-            return []
+            return [], None
     
-    def create_shot_file(self, shot_id: str, username: str, filename: str, file_path: str, file_size: int, file_type: str) -> Optional[str]:
-        """Create a new file record for a shot"""
+    def create_shot_file(self, shot_id: str, username: str, filename: str, file_path: str, file_size: int, file_type: str,
+                         blob_sha256: str = None) -> Optional[str]:
+        """Create a new file record for a shot (blob_sha256 links it to a content-addressed blob)"""
         try:
             from bson import ObjectId
             
             # Get user info
-            user = self.db.users.find_one({"username": username})
+            user = self.get_user_info(username)
             author_name = user.get("name") if user else None
             
             file_record = {
@@ -1080,6 +1502,8 @@ class Database:
                 "created_at": datetime.utcnow(),
                 "updated_at": datetime.utcnow(),
             }
+            if blob_sha256:
+                file_record["blob_sha256"] = blob_sha256
             
             result = self.db.files.insert_one(file_record)
             return str(result.inserted_id)
@@ -1090,28 +1514,105 @@ class Database:
     
     def get_shot_files(self, shot_id: str) -> List[Dict]:
         """Get all files for a shot"""
+        files, _ = self.get_shot_files_page(shot_id)
+        return files
+    
+    def get_shot_files_page(self, shot_id: str, limit: int = None, cursor: str = None,
+                            fields: List[str] = None):
+        """
+        Get one page of files for a shot (newest first)
+        Returns (files, next_cursor)
+        """
         try:
             from bson import ObjectId
             
-            files = list(self.db.files.find(
-                {"shot_id": ObjectId(shot_id)}
-            ).sort("created_at", -1))
+            files, next_cursor = self._find_page(
+                self.db.files, {"shot_id": ObjectId(shot_id)}, -1, limit, cursor, fields
+            )
+            return [self._serialize_message_or_file(file_record) for file_record in files], next_cursor
             
-            # Convert ObjectId to string
-            for file_record in files:
-                file_record["_id"] = str(file_record["_id"])
-                file_record["shot_id"] = str(file_record["shot_id"])
-                # Convert datetime to ISO format string
-                if "created_at" in file_record:
-                    file_record["created_at"] = file_record["created_at"].isoformat()
-                if "updated_at" in file_record:
-                    file_record["updated_at"] = file_record["updated_at"].isoformat()
+        except Exception as e:
+            print(f"Error getting shot files: {e}")
+            return [], None
+    
+    def add_blob_reference(self, digest: str, size: int) -> bool:
+        """Count one more file record pointing at a blob (creates the blob entry on first use)"""
+        try:
+            self.db.blobs.update_one(
+                {"_id": digest},
+                {
+                    "$inc": {"ref_count": 1},
+                    "$setOnInsert": {"size": size, "created_at": datetime.utcnow()}
+                },
+                upsert=True
+            )
+            return True
+            
+        except Exception as e:
+            print(f"Error adding blob reference: {e}")
+            return False
+    
+    def release_blob_reference(self, digest: str) -> bool:
+        """
+        Drop one reference to a blob
+        Returns True when it was the last one (then call blob_store.remove_blob)
+        """
+        try:
+            from pymongo import ReturnDocument
             
-            return files
+            blob = self.db.blobs.find_one_and_update(
+                {"_id": digest},
+                {"$inc": {"ref_count": -1}},
+                return_document=ReturnDocument.AFTER
+            )
+            # The entry stays until delete_unreferenced_blob (a concurrent add revives it)
+            return bool(blob) and blob.get("ref_count", 0) <= 0
             
         except Exception as e:
-            print(f"Error getting shot files: {e}")
-            return []
+            print(f"Error releasing blob reference: {e}")
+            return False
+    
+    def delete_unreferenced_blob(self, digest: str) -> bool:
+        """
+        Delete a blob entry only while nothing references it
+        Returns True when it was deleted and the blob data may be removed
+        """
+        try:
+            result = self.db.blobs.delete_one({"_id": digest, "ref_count": {"$lte": 0}})
+            return result.deleted_count > 0
+            
+        except Exception as e:
+            print(f"Error deleting blob entry: {e}")
+            return False
+    
+    def project_has_blob(self, project_id: str, digest: str) -> bool:
+        """Whether a file of the project or of one of its shots references the given blob"""
+        try:
+            from bson import ObjectId
+            
+            shot_ids = []
+            for file_record in self.db.files.find({"blob_sha256": digest}, {"project_id": 1, "shot_id": 1}):
+                if str(file_record.get("project_id")) == str(project_id):
+                    return True
+                if file_record.get("shot_id"):
+                    shot_ids.append(ObjectId(str(file_record["shot_id"])))
+            if not shot_ids:
+                return False
+            return self.db.shots.find_one(
+                {"_id": {"$in": shot_ids}, "project_id": reference_id_match(project_id)}, {"_id": 1}
+            ) is not None
+            
+        except Exception as e:
+            print(f"Error checking project blob: {e}")
+            return False
+    
+    def get_blob(self, digest: str) -> Optional[Dict]:
+        """Get a blob entry (size and reference count) by SHA-256 digest"""
+        try:
+            return self.db.blobs.find_one({"_id": digest})
+        except Exception as e:
+            print(f"Error getting blob: {e}")
+            return None
     
     def delete_file(self, file_id: str) -> bool:
         """Delete a file record"""
@@ -1125,24 +1626,148 @@ class Database:
             print(f"Error deleting file: {e}")
             return False
     
-    def create_shot(self, project_id: str, shot_name: str, description: str = "") -> Optional[str]:
-        """Create a new shot"""
+    def create_upload_session(self, target_type: str, target_id: str, username: str, filename: str,
+                              file_size: int, file_type: str, part_dir: str, ttl_hours: int = 24) -> Optional[str]:
+        """
+        Create a chunked upload session for a project or shot file
+        Chunks are written to <part_dir>/<upload_id>.part
+        """
         try:
+            import os
             from bson import ObjectId
-            # Verify project exists
-            project = self.db.projects.find_one({"_id": ObjectId(project_id)})
-            if not project:
-                return None
+            from datetime import timedelta
             
-            result = self.db.shots.insert_one({
-                "project_id": project_id,
-                "shot_name": shot_name,
-                "description": description,
-                "status": "active",
+            session_id = ObjectId()
+            self.db.upload_sessions.insert_one({
+                "_id": session_id,
+                "target_type": target_type,  # "project" or "shot"
+                "target_id": target_id,
+                "username": username,
+                "filename": filename,
+                "file_size": file_size,
+                "file_type": file_type,
+                "part_path": os.path.join(part_dir, f"{session_id}.part"),
+                "offset": 0,
+                "status": "uploading",  # "uploading" -> "committing" -> "committed"
                 "created_at": datetime.utcnow(),
-                "updated_at": datetime.utcnow()
+                "expires_at": datetime.utcnow() + timedelta(hours=ttl_hours)
+            })
+            return str(session_id)
+            
+        except Exception as e:
+            print(f"Error creating upload session: {e}")
+            return None
+    
+    def get_upload_session(self, upload_id: str) -> Optional[Dict]:
+        """Get a chunked upload session by ID"""
+        try:
+            from bson import ObjectId
+            
+            if not ObjectId.is_valid(upload_id):
+                return None
+            return self.db.upload_sessions.find_one({"_id": ObjectId(upload_id)})
+            
+        except Exception as e:
+            print(f"Error getting upload session: {e}")
+            return None
+    
+    def advance_upload_session(self, upload_id: str, expected_offset: int, new_offset: int, ttl_hours: int = 24) -> bool:
+        """
+        Move an upload's offset forward after a chunk was written
+        Fails if another request already moved it (the filter checks the old offset)
+        """
+        try:
+            from bson import ObjectId
+            from datetime import timedelta
+            
+            result = self.db.upload_sessions.update_one(
+                {"_id": ObjectId(upload_id), "status": "uploading", "offset": expected_offset},
+                {"$set": {
+                    "offset": new_offset,
+                    "expires_at": datetime.utcnow() + timedelta(hours=ttl_hours)
+                }}
+            )
+            return result.modified_count > 0
+            
+        except Exception as e:
+            print(f"Error advancing upload session: {e}")
+            return False
+    
+    def claim_upload_session_for_commit(self, upload_id: str) -> Optional[Dict]:
+        """Mark a fully uploaded session as committing; returns it, or None if not claimable"""
+        try:
+            from bson import ObjectId
+            from pymongo import ReturnDocument
+            
+            return self.db.upload_sessions.find_one_and_update(
+                {"_id": ObjectId(upload_id), "status": "uploading", "$expr": {"$eq": ["$offset", "$file_size"]}},
+                {"$set": {"status": "committing"}},
+                return_document=ReturnDocument.AFTER
+            )
+            
+        except Exception as e:
+            print(f"Error claiming upload session: {e}")
+            return None
+    
+    def complete_upload_session(self, upload_id: str, file_id: Optional[str], filename: str = None) -> bool:
+        """Record the outcome of a commit (file_id None puts the session back to uploading)"""
+        try:
+            from bson import ObjectId
+            
+            if file_id:
+                update = {"status": "committed", "file_id": file_id, "stored_filename": filename}
+            else:
+                update = {"status": "uploading"}
+            self.db.upload_sessions.update_one({"_id": ObjectId(upload_id)}, {"$set": update})
+            return True
+            
+        except Exception as e:
+            print(f"Error completing upload session: {e}")
+            return False
+    
+    def delete_upload_session(self, upload_id: str) -> bool:
+        """Delete a chunked upload session"""
+        try:
+            from bson import ObjectId
+            
+            result = self.db.upload_sessions.delete_one({"_id": ObjectId(upload_id)})
+            return result.deleted_count > 0
+            
+        except Exception as e:
+            print(f"Error deleting upload session: {e}")
+            return False
+    
+    def get_expired_upload_sessions(self, limit: int = 100) -> List[Dict]:
+        """Get upload sessions whose inactivity timeout has passed"""
+        try:
+            return list(self.db.upload_sessions.find(
+                {"expires_at": {"$lt": datetime.utcnow()}},
+                {"part_path": 1, "status": 1}
+            ).limit(limit))
+            
+        except Exception as e:
+            print(f"Error getting expired upload sessions: {e}")
+            return []
+    
+    def create_shot(self, project_id: str, shot_name: str, description: str = "") -> Optional[str]:
+        """Create a new shot"""
+        try:
+            from bson import ObjectId
+            # Verify project exists
+            project = self.db.projects.find_one({"_id": ObjectId(project_id)})
+            if not project:
+                return None
+            
+            result = self.db.shots.insert_one({
+                "project_id": ObjectId(project_id),
+                "shot_name": shot_name,
+                "description": description,
+                "status": "active",
+                "created_at": datetime.utcnow(),
+                "updated_at": datetime.utcnow()
             })
             shot_id = str(result.inserted_id)
+            self.bump_versions("shots")
             
             # Create shot chat room automatically
             chat_room_id = self.create_chat_room(
@@ -1166,6 +1791,89 @@ class Database:
             print(f"Error creating shot: {e}")
             return None
     
+    def create_shots(self, project_id: str, rows: List[Dict], dry_run: bool = False) -> Optional[Dict]:
+        """
+        Create many shots (with their chat rooms) in one batch
+        rows are validated dicts with shot_name and optional description / duration;
+        names already used in the project or earlier in the batch are reported as errors.
+        Returns {"created": [{row, shot_id, shot_name}], "errors": [{row, shot_name, error}]},
+        or None when the project does not exist
+        """
+        try:
+            from bson import ObjectId
+            from pymongo.errors import BulkWriteError
+            
+            project = self.db.projects.find_one({"_id": ObjectId(project_id)}, {"workers": 1})
+            if not project:
+                return None
+            
+            names = [row["shot_name"] for row in rows]
+            existing = {shot["shot_name"] for shot in self.db.shots.find(
+                {"project_id": reference_id_match(project_id), "shot_name": {"$in": names}}, {"shot_name": 1}
+            )}
+            
+            errors = []
+            shots = []
+            rows_by_shot = {}
+            now = datetime.utcnow()
+            for row in rows:
+                if row["shot_name"] in existing:
+                    errors.append({"row": row["row"], "shot_name": row["shot_name"], "error": "Shot name already exists"})
+                    continue
+                existing.add(row["shot_name"])
+                shot = {
+                    "_id": ObjectId(),
+                    "project_id": ObjectId(project_id),
+                    "shot_name": row["shot_name"],
+                    "description": row.get("description", ""),
+                    "status": "active",
+                    "created_at": now,
+                    "updated_at": now
+                }
+                if row.get("duration"):
+                    shot["duration"] = row["duration"]
+                shots.append(shot)
+                rows_by_shot[shot["_id"]] = row["row"]
+            
+            if dry_run or not shots:
+                created = [{"row": rows_by_shot[shot["_id"]], "shot_name": shot["shot_name"]} for shot in shots]
+                return {"created": created, "errors": errors}
+            
+            try:
+                self.db.shots.insert_many(shots, ordered=False)
+            except BulkWriteError as e:
+                failed = {error["index"] for error in e.details.get("writeErrors", [])}
+                for index in sorted(failed):
+                    shot = shots[index]
+                    errors.append({"row": rows_by_shot[shot["_id"]], "shot_name": shot["shot_name"], "error": "Failed to create shot"})
+                shots = [shot for index, shot in enumerate(shots) if index not in failed]
+            if not shots:
+                return {"created": [], "errors": errors}
+            self.bump_versions("shots")
+            
+            # Shot chat rooms start with the project workers as participants
+            workers = list(project.get("workers", []))
+            self.db.chat_rooms.insert_many([{
+                "chat_type": "shot",
+                "name": shot["shot_name"],
+                "participants": workers,
+                "summary_initialized": True,
+                "project_id": shot["project_id"],
+                "shot_id": shot["_id"],
+                "created_at": now,
+                "updated_at": now
+            } for shot in shots], ordered=False)
+            if workers:
+                self._publish_chat_event({"type": "rooms_changed"}, workers)
+                self.bump_versions(*[f"chat:{worker}" for worker in workers])
+            
+            created = [{"row": rows_by_shot[shot["_id"]], "shot_id": str(shot["_id"]), "shot_name": shot["shot_name"]}
+                       for shot in shots]
+            return {"created": created, "errors": errors}
+        except Exception as e:
+            print(f"Error creating shots: {e}")
+            return None
+    
     def request_project_deletion(self, project_id: str, username: str, project_name: str) -> bool:
         """Request project deletion (pending admin approval)"""
         try:
@@ -1207,9 +1915,12 @@ class Database:
                 return False
             
             if approve:
-                # Delete project and all associated shots
+                # Shots, files, chats and uploads are removed by the background deletion job
+                if not self.create_deletion_job(project_id, deletion.get("project_name"), deletion.get("requested_by")):
+                    return False
+                # Hide the project right away; the job deletes it again if this is interrupted
                 self.db.projects.delete_one({"_id": ObjectId(project_id)})
-                self.db.shots.delete_many({"project_id": project_id})
+                self.bump_versions("projects")
             
             # Remove deletion request
             self.db.pending_deletions.delete_one({"project_id": project_id})
@@ -1218,6 +1929,311 @@ class Database:
             print(f"Error approving project deletion: {e}")
             return False
     
+    def create_deletion_job(self, project_id: str, project_name: str = None, requested_by: str = None) -> Optional[str]:
+        """Queue the cascade deletion of a project (returns the existing job if one is queued already)"""
+        try:
+            from bson import ObjectId
+            from pymongo import ReturnDocument
+            
+            now = datetime.utcnow()
+            job = self.db.deletion_jobs.find_one_and_update(
+                {"project_id": ObjectId(project_id)},
+                {"$setOnInsert": {
+                    "project_name": project_name,
+                    "requested_by": requested_by,
+                    "status": "queued",  # "queued" -> "running" -> "done" (or "failed")
+                    "step": "shots",  # "shots" -> "project"
+                    "progress": {},
+                    "attempts": 0,
+                    "lease_until": now,
+                    "created_at": now,
+                    "updated_at": now
+                }},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            return str(job["_id"])
+        except Exception as e:
+            print(f"Error creating deletion job: {e}")
+            return None
+    
+    def claim_deletion_job(self, worker_id: str, lease_seconds: int) -> Optional[Dict]:
+        """Take a queued job, or a running one whose worker stopped renewing its lease"""
+        try:
+            from datetime import timedelta
+            from pymongo import ReturnDocument
+            
+            now = datetime.utcnow()
+            return self.db.deletion_jobs.find_one_and_update(
+                {"status": {"$in": ["queued", "running"]}, "lease_until": {"$lte": now}},
+                {
+                    "$set": {
+                        "status": "running",
+                        "worker_id": worker_id,
+                        "lease_until": now + timedelta(seconds=lease_seconds),
+                        "updated_at": now
+                    },
+                    "$inc": {"attempts": 1}
+                },
+                sort=[("created_at", 1)],
+                return_document=ReturnDocument.AFTER
+            )
+        except Exception as e:
+            print(f"Error claiming deletion job: {e}")
+            return None
+    
+    def checkpoint_deletion_job(self, job_id, worker_id: str, lease_seconds: int,
+                                progress: Dict[str, int] = None, step: str = None) -> bool:
+        """
+        Add to a job's progress counters, move it to another step and renew its lease
+        Returns False when the job is no longer leased by worker_id
+        """
+        from datetime import timedelta
+        
+        now = datetime.utcnow()
+        update = {"$set": {"lease_until": now + timedelta(seconds=lease_seconds), "updated_at": now}}
+        if step:
+            update["$set"]["step"] = step
+        if progress:
+            update["$inc"] = {f"progress.{name}": count for name, count in progress.items()}
+        result = self.db.deletion_jobs.update_one({"_id": job_id, "worker_id": worker_id, "status": "running"}, update)
+        return result.matched_count > 0
+    
+    def finish_deletion_job(self, job_id, worker_id: str):
+        """Mark a job as done"""
+        try:
+            now = datetime.utcnow()
+            self.db.deletion_jobs.update_one(
+                {"_id": job_id, "worker_id": worker_id},
+                {"$set": {"status": "done", "finished_at": now, "updated_at": now}, "$unset": {"error": ""}}
+            )
+        except Exception as e:
+            print(f"Error finishing deletion job: {e}")
+    
+    def fail_deletion_job(self, job_id, worker_id: str, error: str, max_attempts: int, retry_seconds: int):
+        """Record a job error; the job is retried after retry_seconds until max_attempts runs failed"""
+        try:
+            from datetime import timedelta
+            
+            now = datetime.utcnow()
+            job = self.db.deletion_jobs.find_one({"_id": job_id, "worker_id": worker_id})
+            if not job:
+                return
+            status = "failed" if job.get("attempts", 0) >= max_attempts else "queued"
+            self.db.deletion_jobs.update_one(
+                {"_id": job_id, "worker_id": worker_id},
+                {"$set": {
+                    "status": status,
+                    "error": error,
+                    "lease_until": now + timedelta(seconds=retry_seconds),
+                    "updated_at": now
+                }}
+            )
+        except Exception as e:
+            print(f"Error recording deletion job failure: {e}")
+    
+    def get_deletion_jobs(self, limit: int = 50) -> List[Dict]:
+        """Get the most recent deletion jobs with their progress"""
+        jobs = list(self.db.deletion_jobs.find().sort("created_at", -1).limit(limit))
+        for job in jobs:
+            job["_id"] = str(job["_id"])
+            job["project_id"] = str(job["project_id"])
+            for field in ("lease_until", "created_at", "updated_at", "finished_at"):
+                if job.get(field):
+                    job[field] = job[field].isoformat()
+        return jobs
+    
+    def _serialize_chat_room(self, chat_room: Dict) -> Dict:
+        """
+        Convert a chat room document for API output
+        ObjectId/datetime fields become strings and the stored last_message summary
+        becomes lastMessage, lastMessageTime and lastMessageAuthor
+        """
+        chat_room["_id"] = str(chat_room["_id"])
+        if "project_id" in chat_room:
+            chat_room["project_id"] = str(chat_room["project_id"])
+        if "shot_id" in chat_room:
+            chat_room["shot_id"] = str(chat_room["shot_id"])
+        if "created_at" in chat_room and not isinstance(chat_room["created_at"], str):
+            chat_room["created_at"] = chat_room["created_at"].isoformat()
+        if "updated_at" in chat_room and not isinstance(chat_room["updated_at"], str):
+            chat_room["updated_at"] = chat_room["updated_at"].isoformat()
+        
+        last_message = chat_room.pop("last_message", None)
+        chat_room.pop("summary_initialized", None)
+        if last_message:
+            if last_message.get("created_at"):
+                chat_room["lastMessageTime"] = last_message["created_at"].isoformat()
+            if last_message.get("content") is not None:
+                chat_room["lastMessage"] = last_message.get("content", "")
+            if last_message.get("author_username") is not None:
+                chat_room["lastMessageAuthor"] = last_message.get("author_username", "")
+        return chat_room
+    
+    def _build_last_message_summary(self, message_id, content: Optional[str], author_username: Optional[str], created_at) -> Dict:
+        """Build the last_message summary stored on a chat room document"""
+        return {
+            "message_id": message_id,
+            "content": (content or "")[:100],  # First 100 chars
+            "author_username": author_username,
+            "created_at": created_at
+        }
+    
+    def _get_chat_room_summaries(self, chat_room_ids: List, username: str = None) -> Dict[str, Dict]:
+        """
+        Compute last message for many chat rooms in one aggregation, plus the user's
+        legacy read cursor (latest message whose read_by contains the user)
+        Only used to backfill rooms and read states that have no stored summary yet
+        Returns a dict keyed by chat room id string
+        """
+        from bson import ObjectId
+        
+        if not chat_room_ids:
+            return {}
+        
+        room_object_ids = [ObjectId(str(room_id)) for room_id in chat_room_ids]
+        group = {
+            "_id": "$chat_room_id",
+            "last_message_id": {"$first": "$_id"},
+            "last_content": {"$first": "$content"},
+            "last_created_at": {"$first": "$created_at"},
+            "last_author": {"$first": "$author_username"}
+        }
+        if username:
+            group["last_read_at"] = {"$max": {"$cond": [
+                {"$in": [username, {"$cond": [{"$isArray": "$read_by"}, "$read_by", []]}]},
+                "$created_at",
+                None
+            ]}}
+        pipeline = [
+            {"$match": {"chat_room_id": {"$in": room_object_ids}}},
+            {"$sort": {"chat_room_id": 1, "created_at": -1}},
+            {"$group": group}
+        ]
+        
+        summaries = {}
+        for summary in self.db.messages.aggregate(pipeline):
+            summaries[str(summary["_id"])] = summary
+        return summaries
+    
+    def _count_unread_messages(self, read_cursors: Dict[str, Optional[datetime]], username: str) -> Dict[str, int]:
+        """
+        Count messages newer than the user's read cursor for many chat rooms in one query
+        Each room is a range scan on the (chat_room_id, created_at) index
+        read_cursors maps chat room id string to last_read_at (None = nothing read yet)
+        """
+        from bson import ObjectId
+        
+        if not read_cursors:
+            return {}
+        
+        conditions = []
+        for chat_room_id, last_read_at in read_cursors.items():
+            condition = {"chat_room_id": ObjectId(chat_room_id)}
+            if last_read_at:
+                condition["created_at"] = {"$gt": last_read_at}
+            conditions.append(condition)
+        
+        pipeline = [
+            {"$match": {"$or": conditions, "author_username": {"$ne": username}}},
+            {"$group": {"_id": "$chat_room_id", "count": {"$sum": 1}}}
+        ]
+        
+        unread_counts = {chat_room_id: 0 for chat_room_id in read_cursors}
+        for result in self.db.messages.aggregate(pipeline):
+            unread_counts[str(result["_id"])] = result["count"]
+        return unread_counts
+    
+    def _backfill_chat_room_summaries(self, chat_rooms: List[Dict], username: str = None, read_states: Dict[str, Dict] = None) -> Dict[str, int]:
+        """
+        Fill in missing per-room summaries (and the user's read state) from messages
+        chat_rooms are raw documents; rooms without a summary get last_message set in place
+        Returns unread counts keyed by chat room id string for every backfilled read state
+        """
+        from pymongo import UpdateOne
+        
+        if read_states is None:
+            read_states = {}
+        
+        stale_rooms = [
+            room for room in chat_rooms
+            if not room.get("summary_initialized")
+            or (username and "unread_count" not in read_states.get(str(room["_id"]), {}))
+        ]
+        if not stale_rooms:
+            return {}
+        
+        summaries = self._get_chat_room_summaries([room["_id"] for room in stale_rooms], username)
+        
+        # Read cursor per stale read state: stored cursor wins over legacy read_by data
+        read_cursors = {}
+        if username:
+            for room in stale_rooms:
+                room_id = str(room["_id"])
+                state = read_states.get(room_id, {})
+                if "unread_count" in state:
+                    continue
+                summary = summaries.get(room_id) or {}
+                read_cursors[room_id] = state.get("last_read_at") or summary.get("last_read_at")
+        unread_counts = self._count_unread_messages(read_cursors, username)
+        
+        room_updates = []
+        state_updates = []
+        for room in stale_rooms:
+            room_id = str(room["_id"])
+            summary = summaries.get(room_id)
+            
+            if not room.get("summary_initialized"):
+                update = {"summary_initialized": True}
+                if summary:
+                    room["last_message"] = self._build_last_message_summary(
+                        summary.get("last_message_id"),
+                        summary.get("last_content"),
+                        summary.get("last_author"),
+                        summary.get("last_created_at")
+                    )
+                    update["last_message"] = room["last_message"]
+                room["summary_initialized"] = True
+                room_updates.append(UpdateOne({"_id": room["_id"]}, {"$set": update}))
+            
+            if room_id in read_cursors:
+                update = {"$set": {"unread_count": unread_counts.get(room_id, 0), "updated_at": datetime.utcnow()}}
+                if read_cursors[room_id]:
+                    update["$max"] = {"last_read_at": read_cursors[room_id]}
+                state_updates.append(UpdateOne(
+                    {"chat_room_id": room["_id"], "username": username},
+                    update,
+                    upsert=True
+                ))
+        
+        if room_updates:
+            self.db.chat_rooms.bulk_write(room_updates, ordered=False)
+        if state_updates:
+            self.db.chat_read_states.bulk_write(state_updates, ordered=False)
+        
+        return unread_counts
+    
+    def _get_unread_counts(self, chat_rooms: List[Dict], username: str) -> Dict[str, int]:
+        """
+        Get the user's unread count for each raw chat room document
+        Reads the per-user counters in one query and backfills any that are missing
+        """
+        if not chat_rooms:
+            return {}
+        
+        read_states = {}
+        for state in self.db.chat_read_states.find({
+            "username": username,
+            "chat_room_id": {"$in": [room["_id"] for room in chat_rooms]}
+        }):
+            read_states[str(state["chat_room_id"])] = state
+        
+        unread_counts = {
+            room_id: state["unread_count"] for room_id, state in read_states.items() if "unread_count" in state
+        }
+        unread_counts.update(self._backfill_chat_room_summaries(chat_rooms, username, read_states))
+        return unread_counts
+    
     def create_chat_room(self, chat_type: str, name: str, project_id: str = None, shot_id: str = None, created_by: str = None) -> Optional[str]:
         """Create a new chat room"""
         try:
@@ -1227,6 +2243,7 @@ class Database:
                 "chat_type": chat_type,  # "project", "shot", "personal"
                 "name": name,
                 "participants": [],
+                "summary_initialized": True,  # last_message is maintained by create_chat_message
                 "created_at": datetime.utcnow(),
                 "updated_at": datetime.utcnow()
             }
@@ -1252,30 +2269,11 @@ class Database:
             
             chat_room = self.db.chat_rooms.find_one({"_id": ObjectId(chat_room_id)})
             if chat_room:
-                chat_room["_id"] = str(chat_room["_id"])
-                if "project_id" in chat_room:
-                    chat_room["project_id"] = str(chat_room["project_id"])
-                if "shot_id" in chat_room:
-                    chat_room["shot_id"] = str(chat_room["shot_id"])
-                if "created_at" in chat_room:
-                    chat_room["created_at"] = chat_room["created_at"].isoformat()
-                if "updated_at" in chat_room:
-                    chat_room["updated_at"] = chat_room["updated_at"].isoformat()
+                # Backfill the stored last message summary for rooms created before it existed
+                if not chat_room.get("summary_initialized"):
+                    self._backfill_chat_room_summaries([chat_room])
                 
-                # Get last message time and content for this chat room
-                last_message = self.db.messages.find_one(
-                    {"chat_room_id": ObjectId(chat_room["_id"])},
-                    sort=[("created_at", -1)]
-                )
-                if last_message:
-                    if "created_at" in last_message:
-                        chat_room["lastMessageTime"] = last_message["created_at"].isoformat()
-                    if "content" in last_message:
-                        chat_room["lastMessage"] = last_message.get("content", "")[:100]  # First 100 chars
-                    if "author_username" in last_message:
-                        chat_room["lastMessageAuthor"] = last_message.get("author_username", "")
-                
-                return chat_room
+                return self._serialize_chat_room(chat_room)
             
         except Exception as e:
             print(f"Error getting chat room: {e}")
@@ -1290,29 +2288,11 @@ class Database:
             chat_room = self.db.chat_rooms.find_one({"project_id": ObjectId(project_id), "chat_type": "project"})
             
             if chat_room:
-                chat_room["_id"] = str(chat_room["_id"])
-                chat_room["project_id"] = str(chat_room["project_id"])
-                if "shot_id" in chat_room:
-                    chat_room["shot_id"] = str(chat_room["shot_id"])
-                if "created_at" in chat_room:
-                    chat_room["created_at"] = chat_room["created_at"].isoformat()
-                if "updated_at" in chat_room:
-                    chat_room["updated_at"] = chat_room["updated_at"].isoformat()
-                
-                # Get last message time and content for this chat room
-                last_message = self.db.messages.find_one(
-                    {"chat_room_id": ObjectId(chat_room["_id"])},
-                    sort=[("created_at", -1)]
-                )
-                if last_message:
-                    if "created_at" in last_message:
-                        chat_room["lastMessageTime"] = last_message["created_at"].isoformat()
-                    if "content" in last_message:
-                        chat_room["lastMessage"] = last_message.get("content", "")[:100]  # First 100 chars
-                    if "author_username" in last_message:
-                        chat_room["lastMessageAuthor"] = last_message.get("author_username", "")
+                # Backfill the stored last message summary for rooms created before it existed
+                if not chat_room.get("summary_initialized"):
+                    self._backfill_chat_room_summaries([chat_room])
                 
-                return chat_room
+                return self._serialize_chat_room(chat_room)
             
             # Create new chat room
             project = self.get_project(project_id)
@@ -1349,29 +2329,11 @@ class Database:
             chat_room = self.db.chat_rooms.find_one({"shot_id": ObjectId(shot_id), "chat_type": "shot"})
             
             if chat_room:
-                chat_room["_id"] = str(chat_room["_id"])
-                if "project_id" in chat_room:
-                    chat_room["project_id"] = str(chat_room["project_id"])
-                chat_room["shot_id"] = str(chat_room["shot_id"])
-                if "created_at" in chat_room:
-                    chat_room["created_at"] = chat_room["created_at"].isoformat()
-                if "updated_at" in chat_room:
-                    chat_room["updated_at"] = chat_room["updated_at"].isoformat()
-                
-                # Get last message time and content for this chat room
-                last_message = self.db.messages.find_one(
-                    {"chat_room_id": ObjectId(chat_room["_id"])},
-                    sort=[("created_at", -1)]
-                )
-                if last_message:
-                    if "created_at" in last_message:
-                        chat_room["lastMessageTime"] = last_message["created_at"].isoformat()
-                    if "content" in last_message:
-                        chat_room["lastMessage"] = last_message.get("content", "")[:100]  # First 100 chars
-                    if "author_username" in last_message:
-                        chat_room["lastMessageAuthor"] = last_message.get("author_username", "")
+                # Backfill the stored last message summary for rooms created before it existed
+                if not chat_room.get("summary_initialized"):
+                    self._backfill_chat_room_summaries([chat_room])
                 
-                return chat_room
+                return self._serialize_chat_room(chat_room)
             
             # Create new chat room
             shot = self.get_shot(shot_id)
@@ -1436,6 +2398,11 @@ class Database:
                 }
             )
             
+            # Let newly added participants refresh their room list
+            added = list(new_participants - current_participants)
+            self._publish_chat_event({"type": "rooms_changed", "chat_room_id": chat_room_id}, added)
+            self.bump_versions(*[f"chat:{p}" for p in all_participants])
+            
             return True
             
         except Exception as e:
@@ -1462,45 +2429,82 @@ class Database:
                 }
             )
             
+            # Let added and removed participants refresh their room list
+            changed = set(chat_room.get("participants", [])) ^ set(participants)
+            self._publish_chat_event({"type": "rooms_changed", "chat_room_id": chat_room_id}, list(changed))
+            self.bump_versions(*[f"chat:{p}" for p in set(chat_room.get("participants", [])) | set(participants)])
+            
             return True
             
         except Exception as e:
             print(f"Error setting chat room participants: {e}")
             return False
     
-    def get_chat_room_messages(self, chat_room_id: str, limit: int = 100) -> List[Dict]:
-        """Get messages for a chat room"""
+    def parse_message_cursor(self, chat_room_id: str, cursor: str):
+        """
+        Resolve a message cursor to (created_at, _id)
+        The cursor is either the _id of a message in the chat room or an ISO created_at timestamp (_id is then None)
+        Raises ValueError for an unknown or malformed cursor
+        """
+        from bson import ObjectId
+        
+        if ObjectId.is_valid(cursor):
+            message = self.db.messages.find_one(
+                {"_id": ObjectId(cursor), "chat_room_id": ObjectId(chat_room_id)}, {"created_at": 1}
+            )
+            if not message:
+                raise ValueError(f"Unknown message cursor: {cursor}")
+            return message["created_at"], message["_id"]
+        
+        created_at = datetime.fromisoformat(cursor.replace("Z", "+00:00"))
+        if created_at.tzinfo:
+            # Stored times are naive UTC
+            created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+        return created_at, None
+    
+    def get_chat_room_messages(self, chat_room_id: str, limit: int = 100, after: str = None, before: str = None) -> List[Dict]:
+        """
+        Get messages for a chat room in chronological order
+        after: only messages newer than this cursor (for polling deltas)
+        before: the `limit` messages older than this cursor (for scrolling back through history)
+        Without a cursor the latest `limit` messages are returned
+        Cursors are a message _id or an ISO created_at timestamp
+        """
         try:
             from bson import ObjectId
             
-            messages = list(self.db.messages.find(
-                {"chat_room_id": ObjectId(chat_room_id)}
-            ).sort("created_at", -1).limit(limit))
+            query = {"chat_room_id": ObjectId(chat_room_id)}
+            if after:
+                created_at, message_id = self.parse_message_cursor(chat_room_id, after)
+                if message_id:
+                    query["$or"] = [
+                        {"created_at": {"$gt": created_at}},
+                        {"created_at": created_at, "_id": {"$gt": message_id}}
+                    ]
+                else:
+                    query["created_at"] = {"$gt": created_at}
+                # Oldest first so the client receives the delta in order
+                messages = list(self.db.messages.find(query).sort([("created_at", 1), ("_id", 1)]).limit(limit))
+            else:
+                if before:
+                    created_at, message_id = self.parse_message_cursor(chat_room_id, before)
+                    if message_id:
+                        query["$or"] = [
+                            {"created_at": {"$lt": created_at}},
+                            {"created_at": created_at, "_id": {"$lt": message_id}}
+                        ]
+                    else:
+                        query["created_at"] = {"$lt": created_at}
+                messages = list(self.db.messages.find(query).sort([("created_at", -1), ("_id", -1)]).limit(limit))
+                # Reverse to get chronological order
+                messages.reverse()
             
-            # Reverse to get chronological order
-            messages.reverse()
+            # Derive read_by from the per-user read cursors
+            self._apply_read_cursors(chat_room_id, messages)
             
             # Convert ObjectId to string
             for message in messages:
-                message["_id"] = str(message["_id"])
-                if "chat_room_id" in message:
-                    message["chat_room_id"] = str(message["chat_room_id"])
-                if "project_id" in message:
-                    message["project_id"] = str(message["project_id"])
-                if "shot_id" in message:
-                    message["shot_id"] = str(message["shot_id"])
-                if "created_at" in message:
-                    message["created_at"] = message["created_at"].isoformat()
-                if "updated_at" in message:
-                    message["updated_at"] = message["updated_at"].isoformat()
-                # Ensure read_by field exists (for old messages)
-                if "read_by" not in message:
-                    message["read_by"] = []
-                # Ensure read_by is a list of strings
-                if isinstance(message.get("read_by"), list):
-                    message["read_by"] = [str(r) for r in message["read_by"]]
-                else:
-                    message["read_by"] = []
+                self._serialize_chat_message(message)
             
             return messages
             
@@ -1508,13 +2512,105 @@ class Database:
             print(f"Error getting chat room messages: {e}")
             return []
     
+    def get_chat_room_read_cursors(self, chat_room_id: str) -> List[Dict]:
+        """Get every participant's read cursor for a chat room"""
+        try:
+            from bson import ObjectId
+            
+            read_states = self.db.chat_read_states.find(
+                {"chat_room_id": ObjectId(chat_room_id), "last_read_at": {"$exists": True}},
+                {"username": 1, "last_read_at": 1}
+            )
+            return [
+                {"username": state.get("username"), "last_read_at": state["last_read_at"].isoformat()}
+                for state in read_states
+            ]
+            
+        except Exception as e:
+            print(f"Error getting chat room read cursors: {e}")
+            return []
+    
+    def _apply_read_cursors(self, chat_room_id: str, messages: List[Dict]) -> List[Dict]:
+        """
+        Fill each message's read_by list from the room's read cursors
+        A user has read a message if their last_read_at is at or after its created_at;
+        read_by entries stored on messages before read cursors existed are kept
+        """
+        from bson import ObjectId
+        
+        if not messages:
+            return messages
+        
+        read_states = list(self.db.chat_read_states.find(
+            {"chat_room_id": ObjectId(chat_room_id), "last_read_at": {"$exists": True}},
+            {"username": 1, "last_read_at": 1}
+        ))
+        
+        for message in messages:
+            read_by = message.get("read_by")
+            read_by = [str(r) for r in read_by] if isinstance(read_by, list) else []
+            created_at = message.get("created_at")
+            if created_at:
+                for state in read_states:
+                    reader = state.get("username")
+                    if (reader != message.get("author_username") and reader not in read_by
+                            and state["last_read_at"] >= created_at):
+                        read_by.append(reader)
+            message["read_by"] = read_by
+        
+        return messages
+    
+    def _serialize_chat_message(self, message: Dict) -> Dict:
+        """Convert ObjectId and datetime fields of a chat message to strings"""
+        message["_id"] = str(message["_id"])
+        if "chat_room_id" in message:
+            message["chat_room_id"] = str(message["chat_room_id"])
+        if "project_id" in message:
+            message["project_id"] = str(message["project_id"])
+        if "shot_id" in message:
+            message["shot_id"] = str(message["shot_id"])
+        if "created_at" in message:
+            message["created_at"] = message["created_at"].isoformat()
+        if "updated_at" in message:
+            message["updated_at"] = message["updated_at"].isoformat()
+        # Ensure read_by is a list of strings
+        if isinstance(message.get("read_by"), list):
+            message["read_by"] = [str(r) for r in message["read_by"]]
+        else:
+            message["read_by"] = []
+        return message
+    
+    def _publish_chat_event(self, event: Dict, usernames: List[str]):
+        """Push a chat event to connected clients (delivery failures never fail the write)"""
+        try:
+            if usernames:
+                self.events.publish(event, usernames)
+        except Exception as e:
+            print(f"Error publishing chat event: {e}")
+    
+    def get_chat_message(self, message_id: str) -> Optional[Dict]:
+        """Get a single chat message by ID"""
+        try:
+            from bson import ObjectId
+            
+            message = self.db.messages.find_one({"_id": ObjectId(message_id)})
+            if not message:
+                return None
+            if "chat_room_id" in message:
+                self._apply_read_cursors(str(message["chat_room_id"]), [message])
+            return self._serialize_chat_message(message)
+            
+        except Exception as e:
+            print(f"Error getting chat message: {e}")
+            return None
+    
     def create_chat_message(self, chat_room_id: str, username: str, content: str) -> Optional[str]:
         """Create a new message in a chat room"""
         try:
             from bson import ObjectId
             
             # Get user info
-            user = self.db.users.find_one({"username": username})
+            user = self.get_user_info(username)
             author_name = user.get("name") if user else None
             
             # Get chat room info
@@ -1527,7 +2623,6 @@ class Database:
                 "author_username": username,
                 "author_name": author_name,
                 "content": content,
-                "read_by": [],  # List of usernames who have read this message
                 "created_at": datetime.utcnow(),
                 "updated_at": datetime.utcnow(),
             }
@@ -1540,43 +2635,265 @@ class Database:
             
             result = self.db.messages.insert_one(message)
             
-            # Update chat room's updated_at
+            # Update chat room's updated_at and last message summary
             self.db.chat_rooms.update_one(
                 {"_id": ObjectId(chat_room_id)},
-                {"$set": {"updated_at": datetime.utcnow()}}
+                {"$set": {
+                    "updated_at": datetime.utcnow(),
+                    "last_message": self._build_last_message_summary(
+                        result.inserted_id, content, username, message["created_at"]
+                    ),
+                    "summary_initialized": True
+                }}
             )
             
+            # Increment unread counters of the other participants
+            # (participants without a counter yet get one backfilled on their next listing)
+            participants = self._chat_room_audience(chat_room)
+            recipients = [p for p in participants if p != username]
+            if recipients:
+                self.db.chat_read_states.update_many(
+                    {
+                        "chat_room_id": ObjectId(chat_room_id),
+                        "username": {"$in": recipients},
+                        # Skip counters that a concurrent mark-as-read already recounted past this message
+                        "$or": [
+                            {"counted_until": {"$exists": False}},
+                            {"counted_until": {"$lt": message["created_at"]}}
+                        ]
+                    },
+                    {"$inc": {"unread_count": 1}}
+                )
+            
+            # Push the new message to connected participants
+            message["_id"] = result.inserted_id
+            self._publish_chat_event({
+                "type": "message",
+                "chat_room_id": chat_room_id,
+                "message": self._serialize_chat_message(dict(message))
+            }, participants + [username])
+            self.bump_versions(*[f"chat:{p}" for p in participants + [username]])
+            
             return str(result.inserted_id)
             
         except Exception as e:
             print(f"Error creating chat message: {e}")
             return None
     
+    def _chat_room_audience(self, chat_room: Dict) -> List[str]:
+        """
+        Users whose room list shows a chat room: its participants, and for a project room
+        also every project worker (get_user_all_chat_rooms lists it for all of them)
+        """
+        from bson import ObjectId
+        
+        audience = set(chat_room.get("participants", []))
+        if chat_room.get("chat_type") == "project" and ObjectId.is_valid(str(chat_room.get("project_id"))):
+            project = self.db.projects.find_one({"_id": ObjectId(str(chat_room["project_id"]))}, {"workers": 1})
+            if project:
+                audience.update(project.get("workers", []))
+        return list(audience)
+    
     def mark_chat_room_messages_as_read(self, chat_room_id: str, username: str) -> bool:
-        """Mark all messages in a chat room as read by a user"""
+        """
+        Mark all messages in a chat room as read by a user
+        Moves the user's read cursor to the room's last message (one document write).
+        If a message arrived meanwhile, the counter is recounted from the cursor; counted_until
+        records the newest message counted so its pending $inc is not applied twice.
+        """
         try:
             from bson import ObjectId
             
-            # Update all messages in the chat room that are not authored by the reader
-            # Add username to read_by array if not already present
-            result = self.db.messages.update_many(
-                {
-                    "chat_room_id": ObjectId(chat_room_id),
-                    "author_username": {"$ne": username},  # Don't mark own messages as read
-                    "read_by": {"$ne": username}  # Only if not already read
-                },
-                {
-                    "$addToSet": {"read_by": username},  # Add username to read_by array
-                    "$set": {"updated_at": datetime.utcnow()}
+            chat_room = self.db.chat_rooms.find_one(
+                {"_id": ObjectId(chat_room_id)},
+                {"last_message": 1, "summary_initialized": 1, "participants": 1}
+            )
+            if not chat_room:
+                return False
+            
+            if not chat_room.get("summary_initialized"):
+                self._backfill_chat_room_summaries([chat_room])
+            
+            update = {"$set": {"unread_count": 0, "updated_at": datetime.utcnow()}}
+            last_message = chat_room.get("last_message")
+            if last_message and last_message.get("created_at"):
+                # $max keeps the cursor from moving backwards on concurrent calls
+                update["$max"] = {
+                    "last_read_at": last_message["created_at"],
+                    "last_read_message_id": last_message.get("message_id"),
+                    "counted_until": last_message["created_at"]
                 }
+            
+            state_filter = {"chat_room_id": ObjectId(chat_room_id), "username": username}
+            previous_state = self.db.chat_read_states.find_one_and_update(
+                state_filter,
+                update,
+                upsert=True,
+                projection={"last_read_at": 1, "unread_count": 1}
             )
             
-            return result.modified_count > 0 or result.matched_count > 0
+            # A message created since the room was read may have had its $inc overwritten by
+            # the reset above: recount up to the room's current last message until it is stable
+            counted = last_message
+            for _ in range(3):
+                latest = (self.db.chat_rooms.find_one({"_id": ObjectId(chat_room_id)}, {"last_message": 1}) or {}).get("last_message")
+                if not latest or not latest.get("created_at") or (
+                        counted and latest.get("message_id") == counted.get("message_id")):
+                    break
+                state = self.db.chat_read_states.find_one(state_filter, {"last_read_at": 1}) or {}
+                created_at = {"$lte": latest["created_at"]}
+                if state.get("last_read_at"):
+                    created_at["$gt"] = state["last_read_at"]
+                unread_count = self.db.messages.count_documents({
+                    "chat_room_id": ObjectId(chat_room_id),
+                    "created_at": created_at,
+                    "author_username": {"$ne": username}
+                })
+                self.db.chat_read_states.update_one(
+                    state_filter,
+                    {"$set": {"unread_count": unread_count}, "$max": {"counted_until": latest["created_at"]}}
+                )
+                counted = latest
+            
+            # Push read receipts only when the cursor actually moved
+            last_read_at = update.get("$max", {}).get("last_read_at")
+            previous_read_at = (previous_state or {}).get("last_read_at")
+            if last_read_at and (not previous_read_at or previous_read_at < last_read_at):
+                self._publish_chat_event({
+                    "type": "read",
+                    "chat_room_id": chat_room_id,
+                    "username": username,
+                    "last_read_at": last_read_at.isoformat()
+                }, chat_room.get("participants", []) + [username])
+            
+            # Polling marks rooms read on every fetch; only a real change invalidates the room list
+            if not previous_state or previous_state.get("unread_count") != 0:
+                self.bump_versions(f"chat:{username}")
+            
+            return True
             
         except Exception as e:
             print(f"Error marking messages as read: {e}")
             return False
     
+    def normalize_reference_ids(self) -> Dict[str, int]:
+        """
+        Rewrite project_id / shot_id references stored as strings to ObjectIds
+        (shots.project_id, and project_id / shot_id of chat rooms, messages and files).
+        A chat room keyed by a string id that duplicates an ObjectId-keyed room of the same
+        project or shot is merged into it: its messages move over and the room is removed.
+        Returns the number of documents changed per collection
+        """
+        from bson import ObjectId
+        from pymongo import UpdateOne
+        
+        fields_by_collection = {
+            "shots": ("project_id",),
+            "chat_rooms": ("project_id", "shot_id"),
+            "messages": ("project_id", "shot_id"),
+            "files": ("project_id", "shot_id")
+        }
+        
+        # Merge duplicate chat rooms first, so converting their keys cannot create two rooms per shot
+        merged_rooms = 0
+        for room in self.db.chat_rooms.find({"chat_type": {"$in": ["project", "shot"]},
+                                             "$or": [{"project_id": {"$type": "string"}},
+                                                     {"shot_id": {"$type": "string"}}]}):
+            key_field = "shot_id" if room["chat_type"] == "shot" else "project_id"
+            key = room.get(key_field)
+            if not isinstance(key, str) or not ObjectId.is_valid(key):
+                continue
+            canonical = self.db.chat_rooms.find_one({"chat_type": room["chat_type"], key_field: ObjectId(key)})
+            if not canonical:
+                continue
+            self.db.messages.update_many({"chat_room_id": room["_id"]}, {"$set": {"chat_room_id": canonical["_id"]}})
+            self.db.chat_read_states.delete_many({"chat_room_id": room["_id"]})
+            self.db.chat_rooms.delete_one({"_id": room["_id"]})
+            # Summary and unread counters are rebuilt on next access
+            self.db.chat_rooms.update_one({"_id": canonical["_id"]}, {"$set": {"summary_initialized": False}})
+            merged_rooms += 1
+        
+        changed = {"merged_chat_rooms": merged_rooms}
+        for collection_name, fields in fields_by_collection.items():
+            collection = self.db[collection_name]
+            count = 0
+            batch = []
+            for document in collection.find({"$or": [{field: {"$type": "string"}} for field in fields]},
+                                            {field: 1 for field in fields}):
+                update = {field: ObjectId(document[field]) for field in fields
+                          if isinstance(document.get(field), str) and ObjectId.is_valid(document[field])}
+                if not update:
+                    continue
+                batch.append(UpdateOne({"_id": document["_id"]}, {"$set": update}))
+                if len(batch) >= 500:
+                    count += collection.bulk_write(batch, ordered=False).modified_count
+                    batch = []
+            if batch:
+                count += collection.bulk_write(batch, ordered=False).modified_count
+            changed[collection_name] = count
+        
+        if changed["shots"] or merged_rooms:
+            self.bump_versions("shots")
+        return changed
+    
+    def migrate_read_by_to_read_states(self, drop_read_by: bool = False) -> int:
+        """
+        Convert per-message read_by arrays into per-user read cursors
+        The cursor is the newest message each user appears in read_by; unread counters
+        are recomputed from the cursors. Optionally removes read_by from messages afterwards.
+        Returns the number of read states written
+        """
+        from pymongo import UpdateOne
+        
+        pipeline = [
+            {"$match": {"chat_room_id": {"$exists": True}, "read_by.0": {"$exists": True}}},
+            {"$unwind": "$read_by"},
+            {"$sort": {"created_at": 1}},
+            {"$group": {
+                "_id": {"chat_room_id": "$chat_room_id", "username": "$read_by"},
+                "last_read_at": {"$last": "$created_at"},
+                "last_read_message_id": {"$last": "$_id"}
+            }}
+        ]
+        
+        written = 0
+        batch = []
+        for cursor in self.db.messages.aggregate(pipeline, allowDiskUse=True):
+            chat_room_id = cursor["_id"]["chat_room_id"]
+            username = str(cursor["_id"]["username"])
+            unread_count = self.db.messages.count_documents({
+                "chat_room_id": chat_room_id,
+                "created_at": {"$gt": cursor["last_read_at"]},
+                "author_username": {"$ne": username}
+            })
+            batch.append(UpdateOne(
+                {"chat_room_id": chat_room_id, "username": username},
+                {
+                    "$max": {
+                        "last_read_at": cursor["last_read_at"],
+                        "last_read_message_id": cursor["last_read_message_id"]
+                    },
+                    "$set": {"unread_count": unread_count, "updated_at": datetime.utcnow()}
+                },
+                upsert=True
+            ))
+            if len(batch) >= 500:
+                self.db.chat_read_states.bulk_write(batch, ordered=False)
+                written += len(batch)
+                batch = []
+        
+        if batch:
+            self.db.chat_read_states.bulk_write(batch, ordered=False)
+            written += len(batch)
+        
+        if drop_read_by:
+            self.db.messages.update_many(
+                {"chat_room_id": {"$exists": True}, "read_by": {"$exists": True}},
+                {"$unset": {"read_by": ""}}
+            )
+        
+        return written
+    
     def get_or_create_personal_chat_room(self, username1: str, username2: str) -> Optional[Dict]:
         """Get or create a personal chat room between two users"""
         try:
@@ -1600,15 +2917,9 @@ class Database:
                     break
             
             if chat_room:
-                chat_room["_id"] = str(chat_room["_id"])
-                if "project_id" in chat_room:
-                    chat_room["project_id"] = str(chat_room["project_id"])
-                if "shot_id" in chat_room:
-                    chat_room["shot_id"] = str(chat_room["shot_id"])
-                if "created_at" in chat_room:
-                    chat_room["created_at"] = chat_room["created_at"].isoformat()
-                if "updated_at" in chat_room:
-                    chat_room["updated_at"] = chat_room["updated_at"].isoformat()
+                if not chat_room.get("summary_initialized"):
+                    self._backfill_chat_room_summaries([chat_room])
+                chat_room = self._serialize_chat_room(chat_room)
                 
                 # For personal chat rooms, add display_name with partner's name only
                 # (excluding current user's name)
@@ -1624,26 +2935,7 @@ class Database:
                             # Fallback: find the one that's not username1
                             partner_username = participants[0] if participants[0] != username1 else participants[1]
                         
-                        # Get partner's info to get their display name - MUST use name, not username
-                        partner_info = self.get_user(partner_username)
-                        if partner_info:
-                            # Force get name field from database
-                            partner_name = partner_info.get("name")
-                            # Check if name exists and is not empty
-                            if partner_name and str(partner_name).strip():
-                                chat_room["display_name"] = str(partner_name).strip()
-                            else:
-                                # If name is not set, STILL try to use name from database directly
-                                # Fallback: check database directly one more time
-                                db_user = self.db.users.find_one({"username": partner_username})
-                                if db_user and db_user.get("name") and str(db_user.get("name")).strip():
-                                    chat_room["display_name"] = str(db_user.get("name")).strip()
-                                else:
-                                    # Last resort: use username
-                                    chat_room["display_name"] = partner_username
-                        else:
-                            # If user not found, use username
-                            chat_room["display_name"] = partner_username
+                        chat_room["display_name"] = self._personal_chat_display_name(partner_username)
                 
                 return chat_room
             
@@ -1683,19 +2975,7 @@ class Database:
                 # Set display_name with partner's name only (for the requesting user - username1)
                 if chat_room:
                     # username1 is the requesting user, so show username2's name
-                    # Force get name field from user2 object
-                    partner_name = user2.get("name")
-                    # Check if name exists and is not empty
-                    if partner_name and str(partner_name).strip():
-                        chat_room["display_name"] = str(partner_name).strip()
-                    else:
-                        # If name is not set, check database directly
-                        db_user = self.db.users.find_one({"username": username2})
-                        if db_user and db_user.get("name") and str(db_user.get("name")).strip():
-                            chat_room["display_name"] = str(db_user.get("name")).strip()
-                        else:
-                            # Last resort: use username
-                            chat_room["display_name"] = username2
+                    chat_room["display_name"] = self._personal_chat_display_name(username2)
                 
                 return chat_room
             
@@ -1705,6 +2985,14 @@ class Database:
             print(f"Error getting or creating personal chat room: {e}")
             return None
     
+    def _personal_chat_display_name(self, partner_username: str) -> str:
+        """Display name of a personal chat room: the partner's name (from the user cache), else their username"""
+        partner_info = self.get_user_info(partner_username)
+        partner_name = partner_info.get("name") if partner_info else None
+        if partner_name and str(partner_name).strip():
+            return str(partner_name).strip()
+        return partner_username
+    
     def get_user_personal_chat_rooms(self, username: str) -> List[Dict]:
         """Get all personal chat rooms for a user"""
         try:
@@ -1715,16 +3003,11 @@ class Database:
                 "participants": username
             }).sort("updated_at", -1))
             
+            unread_counts = self._get_unread_counts(chat_rooms, username)
+            
             for chat_room in chat_rooms:
-                chat_room["_id"] = str(chat_room["_id"])
-                if "project_id" in chat_room:
-                    chat_room["project_id"] = str(chat_room["project_id"])
-                if "shot_id" in chat_room:
-                    chat_room["shot_id"] = str(chat_room["shot_id"])
-                if "created_at" in chat_room:
-                    chat_room["created_at"] = chat_room["created_at"].isoformat()
-                if "updated_at" in chat_room:
-                    chat_room["updated_at"] = chat_room["updated_at"].isoformat()
+                chat_room = self._serialize_chat_room(chat_room)
+                chat_room["unreadCount"] = unread_counts.get(chat_room["_id"], 0)
                 
                 # For personal chat rooms, add display_name with partner's name only
                 # (excluding current user's name)
@@ -1737,26 +3020,7 @@ class Database:
                     else:
                         partner_username = participants[0]
                     
-                    # Get partner's info to get their display name - MUST use name, not username
-                    partner_info = self.get_user(partner_username)
-                    if partner_info:
-                        # Force get name field from database
-                        partner_name = partner_info.get("name")
-                        # Check if name exists and is not empty
-                        if partner_name and str(partner_name).strip():
-                            chat_room["display_name"] = str(partner_name).strip()
-                        else:
-                            # If name is not set, STILL try to use name from database directly
-                            # Fallback: check database directly one more time
-                            db_user = self.db.users.find_one({"username": partner_username})
-                            if db_user and db_user.get("name") and str(db_user.get("name")).strip():
-                                chat_room["display_name"] = str(db_user.get("name")).strip()
-                            else:
-                                # Last resort: use username
-                                chat_room["display_name"] = partner_username
-                    else:
-                        # If user not found, use username
-                        chat_room["display_name"] = partner_username
+                    chat_room["display_name"] = self._personal_chat_display_name(partner_username)
             
             return chat_rooms
             
@@ -1765,220 +3029,137 @@ class Database:
             return []
     
     def get_user_all_chat_rooms(self, username: str) -> List[Dict]:
-        """Get all chat rooms for a user (project, shot, and personal)"""
+        """
+        Get all chat rooms for a user (project, shot, and personal)
+        Uses a fixed number of queries regardless of how many projects/shots the user has;
+        last message and unread count come from the summaries maintained on write
+        """
         try:
             from bson import ObjectId
             
-            all_chat_rooms = []
-            
-            # Get project chat rooms where user is a worker
-            # Create chat rooms if they don't exist
-            projects = self.db.projects.find({"workers": username})
-            for project in projects:
-                project_id = str(project["_id"])
-                project_chat_room = self.db.chat_rooms.find_one({
+            # Get projects where user is a worker
+            projects = list(self.db.projects.find(
+                {"workers": username},
+                {"name": 1, "owner": 1, "workers": 1}
+            ))
+            project_object_ids = [project["_id"] for project in projects]
+            project_map = {str(project["_id"]): project for project in projects}
+            
+            # Project chat rooms (one query for all projects)
+            project_rooms = {}
+            if project_object_ids:
+                for room in self.db.chat_rooms.find({
                     "chat_type": "project",
-                    "project_id": ObjectId(project_id)
-                })
-                
-                # If chat room doesn't exist, create it
-                if not project_chat_room:
-                    chat_room_id = self.create_chat_room(
-                        chat_type="project",
-                        name=project.get("name", f"Project {project_id}"),
-                        project_id=project_id,
-                        created_by=project.get("owner")
-                    )
-                    if chat_room_id:
-                        # Add all workers to the chat room
+                    "project_id": {"$in": project_object_ids}
+                }):
+                    project_rooms.setdefault(str(room["project_id"]), room)
+            
+            # Create project chat rooms that don't exist yet
+            for project_id, project in project_map.items():
+                if project_id in project_rooms:
+                    continue
+                chat_room_id = self.create_chat_room(
+                    chat_type="project",
+                    name=project.get("name", f"Project {project_id}"),
+                    project_id=project_id,
+                    created_by=project.get("owner")
+                )
+                if chat_room_id:
+                    # Add all workers to the chat room
+                    workers = project.get("workers", [])
+                    if workers:
+                        self.add_participants_to_chat_room(chat_room_id, workers)
+                    room = self.db.chat_rooms.find_one({"_id": ObjectId(chat_room_id)})
+                    if room:
+                        project_rooms[project_id] = room
+            
+            # Shots of all projects
+            shots = []
+            if project_object_ids:
+                shots = list(self.db.shots.find(
+                    {"project_id": reference_id_match(*project_object_ids)},
+                    {"project_id": 1, "shot_name": 1, "name": 1, "shot_workers": 1}
+                ))
+            shot_map = {str(shot["_id"]): shot for shot in shots}
+            
+            # Shot chat rooms (one query for all shots)
+            shot_rooms = {}
+            if shot_map:
+                for room in self.db.chat_rooms.find({
+                    "chat_type": "shot",
+                    "shot_id": reference_id_match(*shot_map.keys())
+                }):
+                    shot_id = str(room["shot_id"])
+                    # Prefer rooms keyed by ObjectId over ones written with a string id
+                    if shot_id not in shot_rooms or isinstance(room["shot_id"], ObjectId):
+                        shot_rooms[shot_id] = room
+            
+            # Create shot chat rooms that don't exist yet
+            for shot_id, shot in shot_map.items():
+                if shot_id in shot_rooms:
+                    continue
+                project = project_map.get(str(shot.get("project_id")), {})
+                shot_name = shot.get("shot_name") or shot.get("name") or f"Shot {shot_id}"
+                chat_room_id = self.create_chat_room(
+                    chat_type="shot",
+                    name=shot_name,
+                    project_id=str(shot.get("project_id")),
+                    shot_id=shot_id,
+                    created_by=None
+                )
+                if chat_room_id:
+                    # Get shot workers (if exists), otherwise use project workers
+                    shot_workers = shot.get("shot_workers", [])
+                    if shot_workers:
+                        self.set_chat_room_participants(chat_room_id, shot_workers)
+                    else:
                         workers = project.get("workers", [])
                         if workers:
                             self.add_participants_to_chat_room(chat_room_id, workers)
-                        # Get the created chat room
-                        project_chat_room = self.get_chat_room(chat_room_id)
-                
-                if project_chat_room:
-                    project_chat_room["_id"] = str(project_chat_room["_id"])
-                    project_chat_room["project_id"] = str(project_chat_room["project_id"])
-                    if "shot_id" in project_chat_room:
-                        project_chat_room["shot_id"] = str(project_chat_room["shot_id"])
-                    if "created_at" in project_chat_room:
-                        project_chat_room["created_at"] = project_chat_room["created_at"].isoformat()
-                    if "updated_at" in project_chat_room:
-                        project_chat_room["updated_at"] = project_chat_room["updated_at"].isoformat()
-                    # Add project name for display
-                    project_chat_room["display_name"] = f"{project.get('name', 'Project')} Chat"
-                    
-                    # Get last message time and content for this chat room
-                    last_message = self.db.messages.find_one(
-                        {"chat_room_id": ObjectId(project_chat_room["_id"])},
-                        sort=[("created_at", -1)]
-                    )
-                    if last_message:
-                        if "created_at" in last_message:
-                            project_chat_room["lastMessageTime"] = last_message["created_at"].isoformat()
-                        if "content" in last_message:
-                            project_chat_room["lastMessage"] = last_message.get("content", "")[:100]  # First 100 chars
-                        if "author_username" in last_message:
-                            project_chat_room["lastMessageAuthor"] = last_message.get("author_username", "")
-                    
-                    # Get unread message count for this user
-                    unread_count = self.db.messages.count_documents({
-                        "chat_room_id": ObjectId(project_chat_room["_id"]),
-                        "author_username": {"$ne": username},  # Not messages sent by the user
-                        "read_by": {"$ne": username}  # Not read by the user
-                    })
-                    project_chat_room["unreadCount"] = unread_count
-                    
-                    all_chat_rooms.append(project_chat_room)
-            
-            # Get shot chat rooms for projects where user is a worker
-            # Create chat rooms if they don't exist
-            for project in projects:
-                project_id = str(project["_id"])
-                # Try both string and ObjectId format for project_id in shots
-                shots = list(self.db.shots.find({"project_id": project_id}))
-                shots.extend(list(self.db.shots.find({"project_id": ObjectId(project_id)})))
-                # Remove duplicates
-                seen_shot_ids = set()
-                unique_shots = []
-                for shot in shots:
-                    shot_id_str = str(shot["_id"])
-                    if shot_id_str not in seen_shot_ids:
-                        seen_shot_ids.add(shot_id_str)
-                        unique_shots.append(shot)
-                
-                for shot in unique_shots:
-                    shot_id = str(shot["_id"])
-                    
-                    # Try to find existing chat room
-                    # Try both ObjectId and string formats
-                    shot_chat_room = None
-                    try:
-                        # First try with ObjectId
-                        shot_chat_room = self.db.chat_rooms.find_one({
-                            "chat_type": "shot",
-                            "shot_id": ObjectId(shot_id)
-                        })
-                        # If not found, try with string
-                        if not shot_chat_room:
-                            shot_chat_room = self.db.chat_rooms.find_one({
-                                "chat_type": "shot",
-                                "shot_id": shot_id
-                            })
-                    except Exception as e:
-                        print(f"Error finding shot chat room for shot {shot_id}: {e}")
-                        try:
-                            # Fallback to string format
-                            shot_chat_room = self.db.chat_rooms.find_one({
-                                "chat_type": "shot",
-                                "shot_id": shot_id
-                            })
-                        except Exception as e2:
-                            print(f"Error finding shot chat room with string format for shot {shot_id}: {e2}")
-                            shot_chat_room = None
-                    
-                    # If chat room doesn't exist, create it
-                    if not shot_chat_room:
-                        shot_name = shot.get("shot_name") or shot.get("name") or f"Shot {shot_id}"
-                        chat_room_id = self.create_chat_room(
-                            chat_type="shot",
-                            name=shot_name,
-                            project_id=project_id,
-                            shot_id=shot_id,
-                            created_by=None
-                        )
-                        if chat_room_id:
-                            # Get shot workers (if exists), otherwise use project workers
-                            shot_workers = shot.get("shot_workers", [])
-                            if shot_workers:
-                                # Use shot_workers if specified
-                                self.set_chat_room_participants(chat_room_id, shot_workers)
-                            else:
-                                # Otherwise, get project workers to add to shot chat room
-                                workers = project.get("workers", [])
-                                if workers:
-                                    self.add_participants_to_chat_room(chat_room_id, workers)
-                            # Get the created chat room (already formatted)
-                            shot_chat_room = self.get_chat_room(chat_room_id)
-                    
-                    # Only add shot chat room if user is in participants (shot_workers)
-                    if shot_chat_room:
-                        # Check if user is in participants
-                        participants = shot_chat_room.get("participants", [])
-                        if username not in participants:
-                            # User is not a participant, skip this chat room
-                            continue
-                        # Format chat room data (if not already formatted by get_chat_room)
-                        if isinstance(shot_chat_room.get("_id"), ObjectId):
-                            shot_chat_room["_id"] = str(shot_chat_room["_id"])
-                        if "project_id" in shot_chat_room and isinstance(shot_chat_room["project_id"], ObjectId):
-                            shot_chat_room["project_id"] = str(shot_chat_room["project_id"])
-                        if "shot_id" in shot_chat_room and isinstance(shot_chat_room["shot_id"], ObjectId):
-                            shot_chat_room["shot_id"] = str(shot_chat_room["shot_id"])
-                        if "created_at" in shot_chat_room and not isinstance(shot_chat_room["created_at"], str):
-                            shot_chat_room["created_at"] = shot_chat_room["created_at"].isoformat()
-                        if "updated_at" in shot_chat_room and not isinstance(shot_chat_room["updated_at"], str):
-                            shot_chat_room["updated_at"] = shot_chat_room["updated_at"].isoformat()
-                        
-                        # Add shot name for display
-                        shot_name = shot.get("shot_name") or shot.get("name") or f"Shot {shot_id}"
-                        shot_chat_room["display_name"] = f"{shot_name} Chat"
-                        
-                        # Get last message time and content for this chat room
-                        last_message = self.db.messages.find_one(
-                            {"chat_room_id": ObjectId(shot_chat_room["_id"])},
-                            sort=[("created_at", -1)]
-                        )
-                        if last_message:
-                            if "created_at" in last_message:
-                                shot_chat_room["lastMessageTime"] = last_message["created_at"].isoformat()
-                            if "content" in last_message:
-                                shot_chat_room["lastMessage"] = last_message.get("content", "")[:100]  # First 100 chars
-                            if "author_username" in last_message:
-                                shot_chat_room["lastMessageAuthor"] = last_message.get("author_username", "")
-                        
-                        # Get unread message count for this user
-                        unread_count = self.db.messages.count_documents({
-                            "chat_room_id": ObjectId(shot_chat_room["_id"]),
-                            "author_username": {"$ne": username},  # Not messages sent by the user
-                            "read_by": {"$ne": username}  # Not read by the user
-                        })
-                        shot_chat_room["unreadCount"] = unread_count
-                        
-                        # Only add if not already in list (avoid duplicates)
-                        if not any(room.get("_id") == shot_chat_room.get("_id") for room in all_chat_rooms):
-                            all_chat_rooms.append(shot_chat_room)
+                    room = self.db.chat_rooms.find_one({"_id": ObjectId(chat_room_id)})
+                    if room:
+                        shot_rooms[shot_id] = room
             
-            # Get personal chat rooms
-            personal_chat_rooms = self.get_user_personal_chat_rooms(username)
-            for chat_room in personal_chat_rooms:
+            # Personal chat rooms
+            personal_rooms = list(self.db.chat_rooms.find({
+                "chat_type": "personal",
+                "participants": username
+            }))
+            
+            # Collect rooms with display names
+            all_chat_rooms = []
+            seen_room_ids = set()
+            
+            for project_id, room in project_rooms.items():
+                project = project_map[project_id]
+                room["display_name"] = f"{project.get('name', 'Project')} Chat"
+                seen_room_ids.add(room["_id"])
+                all_chat_rooms.append(room)
+            
+            for shot_id, room in shot_rooms.items():
+                # Only add shot chat room if user is in participants (shot_workers)
+                if username not in room.get("participants", []) or room["_id"] in seen_room_ids:
+                    continue
+                shot = shot_map[shot_id]
+                shot_name = shot.get("shot_name") or shot.get("name") or f"Shot {shot_id}"
+                room["display_name"] = f"{shot_name} Chat"
+                seen_room_ids.add(room["_id"])
+                all_chat_rooms.append(room)
+            
+            for room in personal_rooms:
+                if room["_id"] in seen_room_ids:
+                    continue
                 # Personal chat room name is already set, use it as display_name
-                chat_room["display_name"] = chat_room.get("name", "Personal Chat")
-                
-                # Get last message time and content for this chat room
-                if "_id" in chat_room:
-                    last_message = self.db.messages.find_one(
-                        {"chat_room_id": ObjectId(chat_room["_id"])},
-                        sort=[("created_at", -1)]
-                    )
-                    if last_message:
-                        if "created_at" in last_message:
-                            chat_room["lastMessageTime"] = last_message["created_at"].isoformat()
-                        if "content" in last_message:
-                            chat_room["lastMessage"] = last_message.get("content", "")[:100]  # First 100 chars
-                        if "author_username" in last_message:
-                            chat_room["lastMessageAuthor"] = last_message.get("author_username", "")
-                    
-                    # Get unread message count for this user
-                    unread_count = self.db.messages.count_documents({
-                        "chat_room_id": ObjectId(chat_room["_id"]),
-                        "author_username": {"$ne": username},  # Not messages sent by the user
-                        "read_by": {"$ne": username}  # Not read by the user
-                    })
-                    chat_room["unreadCount"] = unread_count
-                
-                all_chat_rooms.append(chat_room)
+                room["display_name"] = room.get("name", "Personal Chat")
+                seen_room_ids.add(room["_id"])
+                all_chat_rooms.append(room)
+            
+            # Unread counters come from one read of chat_read_states,
+            # last message from the summary stored on each room
+            unread_counts = self._get_unread_counts(all_chat_rooms, username)
+            for room in all_chat_rooms:
+                self._serialize_chat_room(room)
+                room["unreadCount"] = unread_counts.get(room["_id"], 0)
             
             # Sort by updated_at (most recent first)
             all_chat_rooms.sort(key=lambda x: x.get("updated_at", ""), reverse=True)
@@ -1990,7 +3171,8 @@ class Database:
             return []
     
     def close(self):
-        """Close MongoDB connection"""
+        """Write buffered activity and close the MongoDB connection"""
+        self.activity.stop()
         if self.client:
             self.client.close()
 
@@ -0,0 +1,189 @@
+"""
+Background cascade deletion of projects
+
+Approving a project deletion only queues a job in deletion_jobs and removes the
+project document, so the admin request returns at once. A worker thread then
+removes what depended on the project:
+
+    "shots"    shots in batches: their files (and blob references), chat rooms,
+               messages, read states, upload sessions and upload folders
+    "project"  project files, chat rooms and messages, upload sessions,
+               uploads/projects/<id> and finally the project document
+
+Every step is idempotent and works in batches of DELETION_BATCH_SIZE. After each
+batch the job's progress counters are updated and its lease renewed; a job whose
+lease ran out (the worker crashed or restarted) is claimed again by any worker
+process and continues from its current step.
+"""
+import os
+import shutil
+import threading
+import uuid
+from typing import Dict, List
+import blob_store
+import thumbnails
+from chunked_uploads import remove_part_file
+from database import reference_id_match
+
+UPLOADS_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "uploads")
+
+
+class DeletionLeaseLost(Exception):
+    """Raised when another worker took over the job being run"""
+
+
+class ProjectDeletionWorker:
+    """Runs queued project deletion jobs on a background thread"""
+
+    def __init__(self, db, batch_size: int, lease_seconds: int, poll_interval: float, max_attempts: int):
+        self.db = db
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.worker_id = None
+        self._job = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+
+    def wake(self):
+        """Start working on queued jobs now instead of at the next poll"""
+        self.ensure_started()
+        self._wake.set()
+
+    def ensure_started(self):
+        """Start the worker thread on first use (after any fork of the worker process)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            # Identifies this process's thread in job leases
+            self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="project-deletion", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the worker thread after the current batch"""
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            while not self._stop.is_set() and self.run_next():
+                pass
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def run_next(self) -> bool:
+        """Claim and run one job; returns False when no job is waiting"""
+        job = self.db.claim_deletion_job(self.worker_id, self.lease_seconds)
+        if not job:
+            return False
+        self._job = job
+        try:
+            self._run_job(job)
+        except DeletionLeaseLost:
+            print(f"Deletion job {job['_id']} was taken over by another worker")
+        except Exception as e:
+            print(f"Error running deletion job {job['_id']}: {e}")
+            self.db.fail_deletion_job(job["_id"], self.worker_id, str(e), self.max_attempts, self.lease_seconds)
+        finally:
+            self._job = None
+        return True
+
+    def _run_job(self, job: Dict):
+        if job.get("step", "shots") == "shots":
+            self._delete_shots(job["project_id"])
+            self._checkpoint(step="project")
+        self._delete_project(job["project_id"])
+        self.db.finish_deletion_job(job["_id"], self.worker_id)
+        self.db.bump_versions("projects", "shots")
+        print(f"Deletion job {job['_id']} finished: project {job['project_id']} removed")
+
+    def _checkpoint(self, progress: Dict[str, int] = None, step: str = None):
+        """Record progress and renew the lease of the current job"""
+        if not self.db.checkpoint_deletion_job(self._job["_id"], self.worker_id, self.lease_seconds, progress, step):
+            raise DeletionLeaseLost(str(self._job["_id"]))
+
+    def _delete_batched(self, collection, query: Dict, counter: str) -> int:
+        """Delete matching documents batch by batch"""
+        deleted = 0
+        while True:
+            ids = [document["_id"] for document in collection.find(query, {"_id": 1}).limit(self.batch_size)]
+            if not ids:
+                return deleted
+            count = collection.delete_many({"_id": {"$in": ids}}).deleted_count
+            deleted += count
+            self._checkpoint({counter: count})
+
+    def _delete_files(self, query: Dict):
+        """Delete files records, then release their blobs (a crash in between only leaks a reference)"""
+        files = self.db.db.files
+        while True:
+            records = list(files.find(query, {"blob_sha256": 1, "file_path": 1}).limit(self.batch_size))
+            if not records:
+                return
+            count = files.delete_many({"_id": {"$in": [record["_id"] for record in records]}}).deleted_count
+            for record in records:
+                blob_store.release_file_data(self.db, record)
+            self._checkpoint({"files": count})
+
+    def _delete_chat_rooms(self, query: Dict):
+        """Delete chat rooms with their messages and read states"""
+        chat_rooms = self.db.db.chat_rooms
+        while True:
+            rooms = list(chat_rooms.find(query, {"participants": 1}).limit(self.batch_size))
+            if not rooms:
+                return
+            room_ids = [room["_id"] for room in rooms]
+            self._delete_batched(self.db.db.messages, {"chat_room_id": {"$in": room_ids}}, "messages")
+            self._delete_batched(self.db.db.chat_read_states, {"chat_room_id": {"$in": room_ids}}, "read_states")
+            count = chat_rooms.delete_many({"_id": {"$in": room_ids}}).deleted_count
+            participants = {participant for room in rooms for participant in room.get("participants", [])}
+            self.db.bump_versions(*[f"chat:{participant}" for participant in participants])
+            self._checkpoint({"chat_rooms": count})
+
+    def _delete_upload_sessions(self, target_type: str, target_ids: List[str]):
+        """Delete unfinished uploads into the deleted project or shots, with their partial files"""
+        query = {"target_type": target_type, "target_id": {"$in": target_ids}}
+        for upload in self.db.db.upload_sessions.find(query, {"part_path": 1, "status": 1}):
+            if upload.get("status") != "committed":
+                remove_part_file(upload.get("part_path"))
+        self.db.db.upload_sessions.delete_many(query)
+
+    def _remove_folder(self, *parts: str):
+        path = os.path.join(*parts)
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+
+    def _delete_shots(self, project_id):
+        """Delete the project's shots and everything attached to them"""
+        shots = self.db.db.shots
+        while True:
+            query = {"project_id": reference_id_match(project_id)}
+            shot_ids = [shot["_id"] for shot in shots.find(query, {"_id": 1}).limit(self.batch_size)]
+            if not shot_ids:
+                return
+            self._delete_files({"shot_id": reference_id_match(*shot_ids)})
+            self._delete_chat_rooms({"shot_id": reference_id_match(*shot_ids)})
+            self._delete_batched(self.db.db.messages, {"shot_id": reference_id_match(*shot_ids)}, "messages")
+            self._delete_upload_sessions("shot", [str(shot_id) for shot_id in shot_ids])
+            for shot_id in shot_ids:
+                self._remove_folder(UPLOADS_ROOT, "shots", str(shot_id))
+                self._remove_folder(thumbnails.THUMBNAILS_ROOT, str(shot_id))
+            # Shots go last, so a resumed job finds the ones whose data may be incomplete
+            count = shots.delete_many({"_id": {"$in": shot_ids}}).deleted_count
+            self._checkpoint({"shots": count})
+
+    def _delete_project(self, project_id):
+        """Delete the project's own files, chats and uploads, then the project document"""
+        self._delete_files({"project_id": reference_id_match(project_id)})
+        self._delete_chat_rooms({"project_id": reference_id_match(project_id)})
+        self._delete_batched(self.db.db.messages, {"project_id": reference_id_match(project_id)}, "messages")
+        self._delete_upload_sessions("project", [str(project_id)])
+        self._remove_folder(UPLOADS_ROOT, "projects", str(project_id))
+        self.db.db.projects.delete_one({"_id": project_id})
@@ -0,0 +1,85 @@
+"""
+Serving stored files (downloads, inline media, thumbnails)
+
+Responses support HTTP Range requests (206 Partial Content), ETag and
+Last-Modified validators and conditional requests (304), so reviewers can
+scrub large movies without downloading them first.
+
+FILE_SERVE_MODE picks who sends the bytes:
+- "direct": Flask streams the file
+- "x-accel": nginx, via X-Accel-Redirect to an internal location mapped to backend/uploads
+- "x-sendfile": Apache/lighttpd, via the X-Sendfile header
+In the proxy modes the worker only returns headers and the proxy handles ranges itself.
+
+nginx example for x-accel mode:
+    location /protected-uploads/ {
+        internal;
+        alias /path/to/QEPipeline/backend/uploads/;
+    }
+"""
+import os
+from urllib.parse import quote
+from flask import send_file
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+from config import FILE_SERVE_MODE, X_ACCEL_UPLOADS_PREFIX
+
+UPLOADS_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "uploads")
+
+
+def _x_accel_location(file_path: str):
+    """Internal nginx URI for a file under UPLOADS_ROOT (None for files stored elsewhere)"""
+    relative_path = os.path.relpath(os.path.abspath(file_path), UPLOADS_ROOT)
+    if relative_path.startswith(os.pardir):
+        return None
+    return X_ACCEL_UPLOADS_PREFIX.rstrip("/") + "/" + quote(relative_path.replace(os.sep, "/"))
+
+
+def _offload_response(file_path: str, as_attachment: bool, download_name: str, mimetype: str):
+    """Headers-only response that tells the front proxy which file to send (None to serve directly)"""
+    if FILE_SERVE_MODE == "x-accel":
+        location = _x_accel_location(file_path)
+        header = ("X-Accel-Redirect", location) if location else None
+    elif FILE_SERVE_MODE == "x-sendfile":
+        header = ("X-Sendfile", os.path.abspath(file_path))
+    else:
+        header = None
+    if not header:
+        return None
+
+    # Let send_file work out Content-Type, Content-Disposition and Last-Modified, then drop the body;
+    # the proxy answers Range and conditional requests itself
+    response = send_file(file_path, mimetype=mimetype, as_attachment=as_attachment,
+                         download_name=download_name, conditional=False, etag=False)
+    response.close()
+    response.response = []
+    response.headers.pop("Content-Length", None)
+    response.headers[header[0]] = header[1]
+    return response
+
+
+def send_media_file(file_path: str, as_attachment: bool = False, download_name: str = None,
+                    max_age: int = 0, mimetype: str = None):
+    """
+    Send a stored file with range, validator and caching support
+    max_age > 0 lets the browser reuse the file without revalidating (use for immutable files);
+    0 makes it revalidate with If-None-Match / If-Modified-Since every time
+    """
+    response = _offload_response(file_path, as_attachment, download_name, mimetype)
+    if response is None:
+        # Werkzeug answers Range (206), If-Range, If-None-Match and If-Modified-Since
+        try:
+            response = send_file(file_path, mimetype=mimetype, as_attachment=as_attachment,
+                                 download_name=download_name, conditional=True, etag=True, max_age=max_age)
+        except RequestedRangeNotSatisfiable as e:
+            # 416 with Content-Range: bytes */<size> (the routes' generic handlers would turn it into a 500)
+            return e.get_response()
+        response.headers["Accept-Ranges"] = "bytes"
+
+    # Project files are not public; keep them out of shared proxy caches
+    response.cache_control.public = False
+    response.cache_control.private = True
+    if max_age:
+        response.cache_control.max_age = max_age
+    else:
+        response.cache_control.no_cache = True
+    return response
@@ -0,0 +1,43 @@
+"""
+gunicorn settings for the QEPipeline backend (values come from config.py / .env)
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The app is loaded once in the master (indexes and the admin user are set up a
+single time) and forked into SERVER_WORKERS processes with SERVER_THREADS
+threads each. After the fork each worker opens its own MongoDB client and
+starts with empty caches; on shutdown it flushes buffered activity first.
+With more than one worker set CHAT_EVENT_BROKER=mongodb so chat events reach
+every process.
+"""
+from config import SERVER_HOST, SERVER_PORT, SERVER_WORKERS, SERVER_THREADS, SERVER_KEEPALIVE_SECONDS
+from config import SERVER_TIMEOUT_SECONDS, SERVER_GRACEFUL_TIMEOUT_SECONDS, SERVER_MAX_REQUESTS
+
+bind = f"{SERVER_HOST}:{SERVER_PORT}"
+workers = SERVER_WORKERS
+# Threads per worker; up to CHAT_EVENT_MAX_STREAMS of them serve chat event streams, the rest API requests
+worker_class = "gthread"
+threads = SERVER_THREADS
+keepalive = SERVER_KEEPALIVE_SECONDS
+timeout = SERVER_TIMEOUT_SECONDS
+graceful_timeout = SERVER_GRACEFUL_TIMEOUT_SECONDS
+max_requests = SERVER_MAX_REQUESTS
+max_requests_jitter = SERVER_MAX_REQUESTS // 10
+preload_app = True
+accesslog = "-"
+
+
+def when_ready(server):
+    # The master's client was only needed to load the app; workers open their own
+    from database import db
+    db.close()
+
+
+def post_fork(server, worker):
+    from database import db
+    db.reinitialize_after_fork()
+
+
+def worker_exit(server, worker):
+    from database import db
+    db.close()
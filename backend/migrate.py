@@ -0,0 +1,112 @@
+"""
+One-off data migrations for QEPipeline
+
+Usage:
+    python migrate.py read-states [--drop-read-by]
+    python migrate.py blobs
+    python migrate.py reference-ids
+"""
+import argparse
+import os
+import sys
+
+
+def migrate_read_states(db, args):
+    """Convert per-message read_by arrays into per-user read cursors"""
+    print("Migrating chat read_by arrays to read cursors...")
+    written = db.migrate_read_by_to_read_states(drop_read_by=args.drop_read_by)
+    print(f"✓ {written} read state(s) written")
+    if args.drop_read_by:
+        print("✓ read_by removed from chat messages")
+
+
+def migrate_blobs(db, args):
+    """Move files stored before the blob store into it (identical files end up as one copy)"""
+    import blob_store
+
+    print("Moving stored files into the content-addressed blob store...")
+    adopted = {}
+    migrated = 0
+    missing = 0
+    saved_bytes = 0
+    for record in db.db.files.find({"blob_sha256": {"$exists": False}}, {"file_path": 1}):
+        file_path = record.get("file_path")
+        if file_path in adopted:
+            # Several records shared one path (flat upload folder)
+            digest, size, new_path = adopted[file_path]
+        elif file_path and os.path.exists(file_path):
+            digest, size = blob_store.hash_file(file_path)
+            if os.path.exists(blob_store.blob_path(digest)):
+                saved_bytes += size
+            new_path = blob_store.link_blob(file_path, digest)
+            adopted[file_path] = (digest, size, new_path)
+        else:
+            missing += 1
+            continue
+
+        db.add_blob_reference(digest, size)
+        db.db.files.update_one(
+            {"_id": record["_id"]},
+            {"$set": {"file_path": new_path, "blob_sha256": digest}}
+        )
+        migrated += 1
+
+    # Originals are removed only once every record pointing at them was updated
+    for file_path in adopted:
+        try:
+            os.remove(file_path)
+        except OSError as e:
+            print(f"⚠ Could not remove {file_path}: {e}")
+
+    print(f"✓ {migrated} file record(s) moved to the blob store")
+    print(f"✓ {saved_bytes / (1024 * 1024):.1f} MB of duplicate data freed")
+    if missing:
+        print(f"⚠ {missing} record(s) skipped because the file is missing on disk")
+
+
+def migrate_reference_ids(db, args):
+    """
+    Store every project_id / shot_id reference as an ObjectId
+    Run again once every process is upgraded: until then older processes may still write strings
+    (reads match both, see database.reference_id_match)
+    """
+    print("Converting string project_id / shot_id references to ObjectIds...")
+    changed = db.normalize_reference_ids()
+    if changed.get("merged_chat_rooms"):
+        print(f"✓ {changed['merged_chat_rooms']} duplicate chat room(s) merged")
+    for collection_name in ("shots", "chat_rooms", "messages", "files"):
+        print(f"✓ {changed.get(collection_name, 0)} {collection_name} document(s) updated")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="QEPipeline data migrations")
+    subparsers = parser.add_subparsers(dest="migration", required=True)
+
+    read_states = subparsers.add_parser("read-states", help="Convert chat read_by arrays into read cursors")
+    read_states.add_argument("--drop-read-by", action="store_true", help="Remove read_by from messages afterwards")
+    read_states.set_defaults(func=migrate_read_states)
+
+    blobs = subparsers.add_parser("blobs", help="Move stored files into the content-addressed blob store")
+    blobs.set_defaults(func=migrate_blobs)
+
+    reference_ids = subparsers.add_parser("reference-ids", help="Store project_id / shot_id references as ObjectIds")
+    reference_ids.set_defaults(func=migrate_reference_ids)
+
+    args = parser.parse_args()
+
+    from database import db
+
+    print("=" * 60)
+    print(f"Migration: {args.migration}")
+    print("=" * 60)
+    try:
+        args.func(db, args)
+    except Exception as e:
+        print(f"\n✗ Migration failed: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Bounded worker pool for bcrypt
+
+bcrypt is deliberately slow, so hashing and verification run on a small pool of
+threads (bcrypt releases the GIL while it works) instead of on every request
+thread at once. In each server process at most BCRYPT_WORKERS passwords are
+processed in parallel and BCRYPT_MAX_QUEUE more may wait; beyond that
+PasswordPoolBusy is raised and the API answers 503 with Retry-After, so a burst
+of logins cannot pin every worker.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+import bcrypt
+from config import BCRYPT_ROUNDS, BCRYPT_WORKERS, BCRYPT_MAX_QUEUE
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when too many password operations are already running or queued"""
+
+
+class PasswordPool:
+    """Runs bcrypt on a fixed number of threads with a bounded queue and latency metrics"""
+
+    def __init__(self, workers: int, max_queue: int, rounds: int):
+        self.rounds = rounds
+        self.workers = workers
+        self.max_queue = max_queue
+        self.reinitialize()
+
+    def reinitialize(self):
+        """Create the executor and counters (again in a forked child, whose copy has no worker threads)"""
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        # One slot per running or waiting operation
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_queue)
+        self._lock = threading.Lock()
+        self._metrics = {"hash": [0, 0.0, 0.0], "verify": [0, 0.0, 0.0]}  # count, total, max seconds
+        self.rejected = 0
+
+    def _run(self, operation: str, function, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordPoolBusy("Too many password operations in progress")
+        try:
+            started = time.perf_counter()
+            result = self._executor.submit(function, *args).result()
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                metric = self._metrics[operation]
+                metric[0] += 1
+                metric[1] += elapsed
+                metric[2] = max(metric[2], elapsed)
+            return result
+        finally:
+            self._slots.release()
+
+    def hash(self, password: str) -> bytes:
+        """Hash a password with the configured cost factor"""
+        return self._run("hash", lambda: bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(self.rounds)))
+
+    def verify(self, password: str, password_hash: bytes) -> bool:
+        """Check a password against a stored hash"""
+        return self._run("verify", bcrypt.checkpw, password.encode('utf-8'), password_hash)
+
+    def stats(self) -> Dict:
+        """Operation counts and latencies (queue wait included) for monitoring"""
+        with self._lock:
+            stats = {"rounds": self.rounds, "rejected": self.rejected}
+            for operation, (count, total, maximum) in self._metrics.items():
+                stats[operation] = {
+                    "count": count,
+                    "avg_ms": round(total / count * 1000, 1) if count else None,
+                    "max_ms": round(maximum * 1000, 1)
+                }
+            return stats
+
+
+password_pool = PasswordPool(BCRYPT_WORKERS, BCRYPT_MAX_QUEUE, BCRYPT_ROUNDS)
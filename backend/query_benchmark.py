@@ -0,0 +1,193 @@
+"""
+Query count benchmark for QEPipeline database operations
+
+Seeds a throwaway database, runs the hot read paths and reports how many
+MongoDB commands each call issues as the amount of data grows.
+
+Exits with status 1 when a path that should issue a constant number of
+commands (get_shot_messages) grows with the data.
+
+Usage:
+    python query_benchmark.py --uri mongodb://localhost:27017
+
+tests/test_query_benchmark.py checks the same query counts without a MongoDB server.
+"""
+import argparse
+import os
+import sys
+import time
+from pymongo import monitoring
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Counts MongoDB commands issued by the driver"""
+
+    # Connection housekeeping, and getMore: fetching the next batch of an open cursor
+    # is not another query (large results need more batches at the same query count)
+    IGNORED_COMMANDS = {"hello", "isMaster", "ismaster", "ping", "endSessions", "buildInfo", "getMore"}
+
+    def __init__(self):
+        self.commands = []
+
+    def started(self, event):
+        if event.command_name not in self.IGNORED_COMMANDS:
+            self.commands.append(event.command_name)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    def reset(self):
+        self.commands = []
+
+    @property
+    def count(self) -> int:
+        return len(self.commands)
+
+
+counter = CommandCounter()
+
+
+def measure(label: str, func, *args, **kwargs):
+    """Run func once and print command count and elapsed time"""
+    counter.reset()
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    size = len(result) if isinstance(result, list) else 1
+    print(f"  {label:<50} commands={counter.count:<5} results={size:<6} time={elapsed_ms:.1f}ms")
+    return result
+
+
+def seed_chat_rooms(db, username: str, project_count: int, shot_count: int, messages_per_room: int):
+    """Create projects, shots, chat rooms and messages for one worker"""
+    from datetime import datetime, timedelta
+
+    for collection in ("projects", "shots", "chat_rooms", "chat_read_states", "messages"):
+        db.db[collection].delete_many({})
+
+    now = datetime.utcnow()
+    project_ids = db.db.projects.insert_many([
+        {
+            "name": f"Benchmark Project {p}",
+            "owner": username,
+            "workers": [username, "other_worker"],
+            "members": [username],
+            "created_at": now,
+            "updated_at": now
+        }
+        for p in range(project_count)
+    ]).inserted_ids
+
+    shots = []
+    for s in range(shot_count):
+        project_id = project_ids[s % project_count]
+        shots.append({
+            "project_id": project_id,
+            "shot_name": f"SH{s:04d}",
+            "created_at": now,
+            "updated_at": now
+        })
+    if shots:
+        db.db.shots.insert_many(shots)
+
+    # First call creates the missing project and shot chat rooms
+    db.get_user_all_chat_rooms(username)
+
+    messages = []
+    for room in db.db.chat_rooms.find({}, {"_id": 1}):
+        for m in range(messages_per_room):
+            author = username if m % 3 == 0 else "other_worker"
+            messages.append({
+                "chat_room_id": room["_id"],
+                "author_username": author,
+                "author_name": author,
+                "content": f"Message {m}",
+                "read_by": [username] if m % 2 == 0 else [],
+                "created_at": now + timedelta(seconds=m),
+                "updated_at": now + timedelta(seconds=m)
+            })
+    if messages:
+        db.db.messages.insert_many(messages)
+
+    # Messages were inserted directly, so let the rooms rebuild their summaries
+    db.db.chat_rooms.update_many({}, {"$unset": {"summary_initialized": "", "last_message": ""}})
+    db.db.chat_read_states.delete_many({})
+
+
+def benchmark_chat_rooms(db, shot_counts):
+    """Command count of get_user_all_chat_rooms as the number of shots grows"""
+    username = "benchmark_worker"
+    print("\nget_user_all_chat_rooms")
+    for shot_count in shot_counts:
+        seed_chat_rooms(db, username, project_count=10, shot_count=shot_count, messages_per_room=5)
+        measure(f"10 projects / {shot_count} shots (backfill)", db.get_user_all_chat_rooms, username)
+        measure(f"10 projects / {shot_count} shots", db.get_user_all_chat_rooms, username)
+
+
+def seed_shot_messages(db, username: str, message_count: int):
+    """Create one shot whose messages all carry a file attachment"""
+    for collection in ("projects", "shots", "chat_rooms", "messages", "files"):
+        db.db[collection].delete_many({})
+
+    project_id = db.create_project("Benchmark Project", username, workers=[username])
+    shot_id = db.create_shot(project_id, "SH0001")
+    for m in range(message_count):
+        file_id = db.create_shot_file(shot_id, username, f"v{m:03d}.mov", f"/tmp/v{m:03d}.mov", 1024, "video/quicktime")
+        db.create_shot_message(shot_id, username, f"Version {m}", file_id)
+    return shot_id
+
+
+def benchmark_shot_messages(db, message_counts) -> bool:
+    """Command count of get_shot_messages as attachments grow; returns False if it is not constant"""
+    username = "benchmark_worker"
+    print("\nget_shot_messages (every message has a file)")
+    command_counts = []
+    for message_count in message_counts:
+        shot_id = seed_shot_messages(db, username, message_count)
+        measure(f"{message_count} messages with files", db.get_shot_messages, shot_id)
+        command_counts.append(counter.count)
+
+    if len(set(command_counts)) > 1:
+        print(f"  ✗ Command count grows with attachments: {command_counts}")
+        return False
+    print(f"  ✓ Constant command count: {command_counts[0] if command_counts else 0}")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="QEPipeline query count benchmark")
+    parser.add_argument("--uri", default="mongodb://localhost:27017", help="MongoDB connection string")
+    parser.add_argument("--db-name", default="qepipeline_benchmark", help="Throwaway database name")
+    parser.add_argument("--shots", default="10,100,300,1000", help="Comma-separated shot counts")
+    parser.add_argument("--messages", default="10,100,500", help="Comma-separated shot message counts")
+    args = parser.parse_args()
+
+    if args.db_name == "qepipeline":
+        print("Refusing to run against the main 'qepipeline' database")
+        sys.exit(1)
+
+    # Must be set before config/database are imported
+    os.environ["MONGODB_URI"] = args.uri
+    os.environ["MONGODB_DB_NAME"] = args.db_name
+    monitoring.register(counter)
+
+    from database import db
+
+    shot_counts = [int(value) for value in args.shots.split(",") if value.strip()]
+    message_counts = [int(value) for value in args.messages.split(",") if value.strip()]
+    try:
+        benchmark_chat_rooms(db, shot_counts)
+        passed = benchmark_shot_messages(db, message_counts)
+    finally:
+        db.client.drop_database(args.db_name)
+        db.close()
+
+    if not passed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Production server for the QEPipeline backend
+
+Usage:
+    python serve.py                      # gunicorn on Linux/macOS, waitress on Windows
+    python serve.py --server waitress
+    python serve.py --workers 4 --threads 16 --port 5000
+
+gunicorn pre-forks SERVER_WORKERS processes (see gunicorn.conf.py); waitress,
+which also runs on Windows, serves SERVER_THREADS threads in one process.
+`python app.py` remains the development server (reloader and debugger on).
+"""
+import argparse
+import os
+import signal
+import sys
+from config import SERVER_HOST, SERVER_PORT, SERVER_WORKERS, SERVER_THREADS, SERVER_TIMEOUT_SECONDS
+from config import CHAT_EVENT_BROKER, CHAT_EVENT_MAX_STREAMS
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def serve_gunicorn(args):
+    """Replace this process with a gunicorn master using gunicorn.conf.py"""
+    command = [sys.executable, "-m", "gunicorn", "-c", os.path.join(BACKEND_DIR, "gunicorn.conf.py"),
+               "--bind", f"{args.host}:{args.port}", "--workers", str(args.workers), "--threads", str(args.threads),
+               "wsgi:app"]
+    os.chdir(BACKEND_DIR)
+    # Settings derived from the worker count (BCRYPT_WORKERS) follow a --workers override
+    os.environ["SERVER_WORKERS"] = str(args.workers)
+    os.execv(sys.executable, command)
+
+
+def serve_waitress(args):
+    """Serve the app with waitress in this process"""
+    from waitress import serve
+    from wsgi import app
+    from database import db
+    from password_pool import password_pool
+
+    if "BCRYPT_WORKERS" not in os.environ:
+        # A single process may use every CPU for bcrypt (the default assumes SERVER_WORKERS processes)
+        password_pool.workers = os.cpu_count() or 2
+        password_pool.reinitialize()
+
+    # Treat SIGTERM like Ctrl+C so the cleanup below runs
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f"Serving on http://{args.host}:{args.port} (waitress, {args.threads} threads)")
+    try:
+        serve(app, host=args.host, port=args.port, threads=args.threads,
+              channel_timeout=SERVER_TIMEOUT_SECONDS, ident="qepipeline")
+    finally:
+        # Ctrl+C / SIGTERM: write buffered activity before exiting
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the QEPipeline backend with a production WSGI server")
+    parser.add_argument("--server", choices=["gunicorn", "waitress"],
+                        default="waitress" if os.name == "nt" else "gunicorn")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS, help="gunicorn worker processes")
+    parser.add_argument("--threads", type=int, default=SERVER_THREADS, help="threads per process")
+    args = parser.parse_args()
+
+    if args.server == "gunicorn" and args.workers > 1 and CHAT_EVENT_BROKER != "mongodb":
+        print("⚠ CHAT_EVENT_BROKER is not 'mongodb': chat events only reach clients connected to the same worker")
+
+    if args.threads <= CHAT_EVENT_MAX_STREAMS:
+        print(f"⚠ --threads {args.threads} leaves no threads for API requests while "
+              f"{CHAT_EVENT_MAX_STREAMS} chat event streams (CHAT_EVENT_MAX_STREAMS) are open")
+
+    if args.server == "gunicorn":
+        serve_gunicorn(args)
+    else:
+        serve_waitress(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Throughput benchmark for QEPipeline backend servers
+
+Sends concurrent GET requests to the chat and shot endpoints of running servers
+and reports requests/sec and latency per endpoint, e.g. to compare the
+development server with the production server on the same database:
+
+    python app.py                                    # development server on :5000
+    python serve.py --port 8000                      # production server on :8000
+    python server_benchmark.py --shot-id <shot id> --username <user> \\
+        --target dev=http://localhost:5000 --target prod=http://localhost:8000
+
+The project and shot chat room are looked up from the shot. Only read
+endpoints are requested, so the benchmark does not change any data.
+"""
+import argparse
+import sys
+import threading
+import time
+import requests
+
+
+def percentile(values, fraction):
+    """Value below which the given fraction of sorted values lie"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def build_endpoints(base_url, shot_id, username):
+    """Chat and shot endpoints to request, as (label, path)"""
+    shot = requests.get(f"{base_url}/api/shot/{shot_id}", timeout=10)
+    shot.raise_for_status()
+    project_id = shot.json()["shot"]["project_id"]
+    room = requests.get(f"{base_url}/api/shot/{shot_id}/chat/room", timeout=10)
+    room.raise_for_status()
+    chat_room_id = room.json()["chat_room"]["_id"]
+
+    return [
+        ("shot", f"/api/shot/{shot_id}"),
+        ("shot messages", f"/api/shot/{shot_id}/messages?limit=50"),
+        ("project shots", f"/api/project/{project_id}/shots?limit=50"),
+        ("chat rooms", f"/api/users/{username}/chat-rooms"),
+        ("chat messages", f"/api/chat-room/{chat_room_id}/messages?limit=50"),
+    ]
+
+
+def run_endpoint(base_url, path, concurrency, duration):
+    """Request one endpoint from concurrency keep-alive clients for duration seconds"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client():
+        session = requests.Session()
+        own_latencies = []
+        own_errors = 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                response = session.get(f"{base_url}{path}", timeout=30)
+                response.content
+                if response.status_code != 200:
+                    own_errors += 1
+            except requests.RequestException:
+                own_errors += 1
+            own_latencies.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(own_latencies)
+            errors[0] += own_errors
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare requests/sec of QEPipeline servers")
+    parser.add_argument("--target", action="append", required=True,
+                        help="name=base URL of a running server (repeat to compare)")
+    parser.add_argument("--shot-id", required=True, help="shot whose project and chat room are requested")
+    parser.add_argument("--username", required=True, help="user whose chat room list is requested")
+    parser.add_argument("--concurrency", type=int, default=16, help="parallel keep-alive clients")
+    parser.add_argument("--duration", type=float, default=10, help="seconds per endpoint")
+    args = parser.parse_args()
+
+    targets = []
+    for target in args.target:
+        name, separator, url = target.partition("=")
+        if not separator:
+            parser.error(f"--target must be name=url, got {target!r}")
+        targets.append((name, url.rstrip("/")))
+
+    results = {}
+    for name, url in targets:
+        print(f"Benchmarking {name} ({url}), {args.concurrency} clients, {args.duration:g}s per endpoint...")
+        try:
+            endpoints = build_endpoints(url, args.shot_id, args.username)
+        except (requests.RequestException, KeyError) as e:
+            print(f"✗ {name}: could not look up the shot: {e}")
+            return 1
+        for label, path in endpoints:
+            results[(name, label)] = run_endpoint(url, path, args.concurrency, args.duration)
+
+    labels = [label for label, _ in endpoints]
+    print()
+    print(f"{'endpoint':<16}{'server':<10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}")
+    for label in labels:
+        for name, _ in targets:
+            result = results[(name, label)]
+            print(f"{label:<16}{name:<10}{result['rps']:>10.1f}{result['p50_ms']:>10.1f}"
+                  f"{result['p95_ms']:>10.1f}{result['errors']:>8}")
+        if len(targets) > 1:
+            baseline = results[(targets[0][0], label)]["rps"]
+            for name, _ in targets[1:]:
+                if baseline:
+                    print(f"{'':<16}{name} is {results[(name, label)]['rps'] / baseline:.2f}x {targets[0][0]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
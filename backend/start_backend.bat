@@ -47,13 +47,14 @@ if errorlevel 1 (
 
 echo.
 echo ========================================
-echo Starting Flask server...
+echo Starting production server (waitress)...
 echo ========================================
 echo Server will be available at: http://localhost:5000
 echo Press Ctrl+C to stop the server
+echo (run start_backend_simple.bat for the Flask development server)
 echo.
 
-python app.py
+python serve.py
 
 pause
 
@@ -0,0 +1,19 @@
+"""
+Test setup: backend modules run against an in-memory mongomock client
+
+Run from the backend directory:
+    pip install -r requirements-dev.txt
+    python -m pytest tests
+"""
+import os
+import sys
+import mongomock
+import pymongo
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Must be set before database.py is imported (it connects at import time); .env does not override these
+os.environ["MONGODB_URI"] = "mongodb://localhost:27017"
+os.environ["MONGODB_DB_NAME"] = "qepipeline_test"
+pymongo.MongoClient = mongomock.MongoClient
@@ -0,0 +1,67 @@
+"""
+Query counts of hot read paths (the checks of query_benchmark.py, without a MongoDB server)
+"""
+from types import SimpleNamespace
+from query_benchmark import CommandCounter, seed_shot_messages
+
+
+class CountingDatabase:
+    """Wraps a database and records every read operation sent to its collections"""
+
+    READ_METHODS = {"find", "find_one", "find_one_and_update", "aggregate", "count_documents", "distinct"}
+
+    def __init__(self, database):
+        self._database = database
+        self.reads = []
+
+    def __getattr__(self, name):
+        return CountingCollection(self, getattr(self._database, name))
+
+    def __getitem__(self, name):
+        return CountingCollection(self, self._database[name])
+
+
+class CountingCollection:
+    def __init__(self, counter: CountingDatabase, collection):
+        self._counter = counter
+        self._collection = collection
+
+    def __getattr__(self, name):
+        attribute = getattr(self._collection, name)
+        if name not in CountingDatabase.READ_METHODS:
+            return attribute
+
+        def counted(*args, **kwargs):
+            self._counter.reads.append(f"{self._collection.name}.{name}")
+            return attribute(*args, **kwargs)
+        return counted
+
+
+def count_reads(db, func, *args):
+    """Run func and return the read operations it issued"""
+    original = db.db
+    db.db = CountingDatabase(original)
+    try:
+        func(*args)
+        return db.db.reads
+    finally:
+        db.db = original
+
+
+def test_command_counter_ignores_cursor_batches():
+    counter = CommandCounter()
+    for name in ("find", "getMore", "getMore", "aggregate", "hello", "endSessions"):
+        counter.started(SimpleNamespace(command_name=name))
+    assert counter.commands == ["find", "aggregate"]
+
+
+def test_shot_messages_reads_do_not_grow_with_attachments():
+    from database import db
+
+    counts = []
+    for message_count in (10, 100, 300):
+        shot_id = seed_shot_messages(db, "benchmark_worker", message_count)
+        assert len(db.get_shot_messages(shot_id)) == message_count
+        counts.append(len(count_reads(db, db.get_shot_messages, shot_id)))
+
+    assert len(set(counts)) == 1, f"reads grow with attachments: {counts}"
@@ -0,0 +1,208 @@
+"""
+Shot thumbnail renditions
+
+The uploaded image is kept as the original; fixed-size renditions ("grid",
+"card", "full") are derived from it in a compact format and cached on disk
+under uploads/thumbnails/<shot_id>/<version>-<size>.<ext>. Renditions are
+generated at upload time and lazily when one is missing (older thumbnails,
+cleared cache).
+
+Each upload gets a new version, which clients put in the URL (?v=...), so a
+versioned URL always refers to the same bytes and can be cached for a long time.
+
+Sprite sheets pack the renditions of a page of shots into one image so a
+project's shot grid loads in two requests (layout + image). A sheet is keyed by
+the size and every member's (shot_id, version), so it is rebuilt as soon as any
+member thumbnail changes and an existing sheet never changes content.
+
+Pillow is optional: without it the original image is served for every size and
+no sheets are built.
+"""
+import hashlib
+import math
+import os
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from PIL import Image, features
+except ImportError:
+    # Pillow not installed, serve original thumbnails
+    Image = None
+
+# Longest edges (width, height) each rendition fits into
+RENDITIONS = {
+    "grid": (160, 90),
+    "card": (480, 270),
+    "full": (1280, 720),
+}
+
+THUMBNAILS_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "uploads", "thumbnails")
+SHEETS_ROOT = os.path.join(THUMBNAILS_ROOT, "sheets")
+
+# Rendition sizes that can be packed into a sheet, and the sheet layout
+SHEET_SIZES = ("grid", "card")
+SHEET_COLUMNS = 20
+# Sheets not requested for this long are removed when another sheet is built
+SHEET_UNUSED_DAYS = 7
+
+
+def renditions_available() -> bool:
+    """Whether renditions can be generated (Pillow is installed)"""
+    return Image is not None
+
+
+def new_version() -> str:
+    """Version tag for a newly uploaded thumbnail"""
+    return uuid.uuid4().hex[:12]
+
+
+def current_version(thumbnail_path: str, stored_version: Optional[str]) -> str:
+    """Version of a shot thumbnail; thumbnails uploaded before versions existed are keyed by modification time"""
+    return stored_version or f"m{int(os.path.getmtime(thumbnail_path))}"
+
+
+def _output_format():
+    """WebP when Pillow was built with it, JPEG otherwise; returns (format, extension, mimetype)"""
+    if features.check("webp"):
+        return "WEBP", "webp", "image/webp"
+    return "JPEG", "jpg", "image/jpeg"
+
+
+def rendition_mimetype() -> str:
+    """Content type of generated renditions"""
+    return _output_format()[2]
+
+
+def rendition_path(shot_id: str, version: str, size: str) -> str:
+    """Where a rendition is cached"""
+    _, extension, _ = _output_format()
+    return os.path.join(THUMBNAILS_ROOT, shot_id, f"{version}-{size}.{extension}")
+
+
+def generate_rendition(original_path: str, shot_id: str, version: str, size: str) -> Optional[str]:
+    """
+    Create (or reuse) the cached rendition of an original image
+    Returns the rendition path, or None when renditions are unavailable or the image cannot be read
+    """
+    if Image is None or size not in RENDITIONS:
+        return None
+
+    path = rendition_path(shot_id, version, size)
+    if os.path.exists(path):
+        return path
+
+    image_format, _, _ = _output_format()
+    try:
+        with Image.open(original_path) as image:
+            # Let JPEG decoding downscale early instead of decoding full resolution
+            image.draft("RGB", RENDITIONS[size])
+            image.thumbnail(RENDITIONS[size], Image.LANCZOS)
+            keep_alpha = image_format == "WEBP" and image.mode in ("RGBA", "LA", "P")
+            image = image.convert("RGBA" if keep_alpha else "RGB")
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temporary name so concurrent requests never serve a partial file
+            temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            if image_format == "WEBP":
+                image.save(temp_path, image_format, quality=80, method=4)
+            else:
+                image.save(temp_path, image_format, quality=80, optimize=True, progressive=True)
+            os.replace(temp_path, path)
+        return path
+    except Exception as e:
+        print(f"Error generating {size} thumbnail for shot {shot_id}: {e}")
+        return None
+
+
+def generate_renditions(original_path: str, shot_id: str, version: str):
+    """Create every rendition of a newly uploaded thumbnail"""
+    for size in RENDITIONS:
+        generate_rendition(original_path, shot_id, version, size)
+
+
+def remove_renditions(shot_id: str, keep_version: str = None):
+    """Delete cached renditions of a shot (except those of keep_version)"""
+    shot_dir = os.path.join(THUMBNAILS_ROOT, shot_id)
+    if shot_id == "sheets" or not os.path.isdir(shot_dir):
+        return
+    for name in os.listdir(shot_dir):
+        if keep_version and name.startswith(f"{keep_version}-"):
+            continue
+        try:
+            os.remove(os.path.join(shot_dir, name))
+        except OSError as e:
+            print(f"Error removing thumbnail rendition: {e}")
+
+
+def sheet_key(size: str, members: List[Tuple[str, str, str]]) -> str:
+    """Cache key of a sheet; members are (shot_id, version, original_path) in sheet order"""
+    member_tag = ",".join(f"{shot_id}:{version}" for shot_id, version, _ in members)
+    return hashlib.sha1(f"{size}|{member_tag}".encode()).hexdigest()
+
+
+def sheet_path(key: str) -> str:
+    """Where a sheet is cached"""
+    _, extension, _ = _output_format()
+    return os.path.join(SHEETS_ROOT, f"{key}.{extension}")
+
+
+def _prune_sheets():
+    """Remove sheets that have not been requested for SHEET_UNUSED_DAYS"""
+    cutoff = time.time() - SHEET_UNUSED_DAYS * 86400
+    for name in os.listdir(SHEETS_ROOT):
+        path = os.path.join(SHEETS_ROOT, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError as e:
+            print(f"Error pruning thumbnail sheet: {e}")
+
+
+def build_sheet(members: List[Tuple[str, str, str]], size: str) -> Optional[Tuple[str, Dict[str, Tuple[int, int]]]]:
+    """
+    Create (or reuse) the sprite sheet for members, (shot_id, version, original_path) tuples
+    Each thumbnail is centred in a cell of the rendition size, filled row by row.
+    Returns (key, {shot_id: (x, y)}) or None when sheets are unavailable
+    """
+    if Image is None or size not in SHEET_SIZES or not members:
+        return None
+
+    cell_width, cell_height = RENDITIONS[size]
+    layout = {}
+    for index, (shot_id, _, _) in enumerate(members):
+        layout[shot_id] = ((index % SHEET_COLUMNS) * cell_width, (index // SHEET_COLUMNS) * cell_height)
+
+    key = sheet_key(size, members)
+    path = sheet_path(key)
+    if os.path.exists(path):
+        # Mark as used so pruning keeps sheets that are still requested
+        os.utime(path)
+        return key, layout
+
+    image_format, _, _ = _output_format()
+    columns = min(len(members), SHEET_COLUMNS)
+    rows = math.ceil(len(members) / SHEET_COLUMNS)
+    mode = "RGBA" if image_format == "WEBP" else "RGB"
+    try:
+        sheet = Image.new(mode, (columns * cell_width, rows * cell_height))
+        for shot_id, version, original_path in members:
+            # Reuses the cached per-shot renditions
+            rendition = generate_rendition(original_path, shot_id, version, size)
+            if not rendition:
+                continue
+            with Image.open(rendition) as image:
+                image = image.convert(mode)
+                x, y = layout[shot_id]
+                sheet.paste(image, (x + (cell_width - image.width) // 2, y + (cell_height - image.height) // 2))
+
+        os.makedirs(SHEETS_ROOT, exist_ok=True)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        sheet.save(temp_path, image_format, quality=80)
+        os.replace(temp_path, path)
+        _prune_sheets()
+        return key, layout
+    except Exception as e:
+        print(f"Error building thumbnail sheet: {e}")
+        return None
@@ -0,0 +1,81 @@
+"""
+Process-local read-through cache of user display info
+
+Messages, files, project pages and chat listings only need a user's name, role
+and admin flag, which rarely change. Entries expire after a TTL and are dropped
+explicitly when a user is created, approved or updated in this process; other
+worker processes pick up changes once their entry expires.
+"""
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+
+class UserProfileCache:
+    """TTL cache of {username: profile or None} with hit/miss counters"""
+
+    def __init__(self, ttl_seconds: float, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, usernames: Iterable[str], loader: Callable[[list], Dict[str, Dict]]) -> Dict[str, Optional[Dict]]:
+        """
+        Look up several users; the ones not cached are fetched with a single loader call
+        loader receives the missing usernames and returns {username: profile};
+        usernames it does not return are cached as unknown (None)
+        """
+        now = time.monotonic()
+        found = {}
+        missing = []
+        with self._lock:
+            for username in set(usernames):
+                entry = self._entries.get(username)
+                if entry and entry[0] > now:
+                    found[username] = entry[1]
+                    self.hits += 1
+                else:
+                    missing.append(username)
+                    self.misses += 1
+
+        if missing:
+            loaded = loader(missing)
+            expires_at = now + self.ttl_seconds
+            with self._lock:
+                if len(self._entries) + len(missing) > self.max_entries:
+                    # Bounded memory: start over rather than tracking recency
+                    self._entries.clear()
+                for username in missing:
+                    profile = loaded.get(username)
+                    self._entries[username] = (expires_at, profile)
+                    found[username] = profile
+        return found
+
+    def get(self, username: str, loader: Callable[[list], Dict[str, Dict]]) -> Optional[Dict]:
+        """Look up one user (None if the user does not exist)"""
+        return self.get_many([username], loader).get(username)
+
+    def invalidate(self, *usernames: str):
+        """Forget cached entries after a user changed"""
+        with self._lock:
+            for username in usernames:
+                self._entries.pop(username, None)
+
+    def clear(self):
+        """Forget every cached entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        """Hit/miss counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else None
+            }
@@ -0,0 +1,13 @@
+"""
+WSGI entry point for production servers
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+    python serve.py
+
+The MongoDB client is created when this module is imported; under gunicorn
+(preload_app) that happens once in the master and gunicorn.conf.py's post_fork
+hook gives every worker its own client and caches.
+"""
+from app import create_app
+
+app = create_app()
@@ -7,6 +7,9 @@ async function apiFetch(url, options = {}) {
     'Content-Type': 'application/json',
     ...options.headers
   };
+  if (adminToken) {
+    headers['Authorization'] = `Bearer ${adminToken}`;
+  }
   
   const response = await fetch(url, {
     ...options,
@@ -17,7 +20,8 @@ async function apiFetch(url, options = {}) {
 }
 
 let adminUsername = "";
-let adminPassword = "";
+// Signed token from /api/login; admin requests send it instead of the password
+let adminToken = "";
 
 // Check if user is already logged in as admin
 function checkLoggedInAdmin() {
@@ -36,6 +40,20 @@ function checkLoggedInAdmin() {
           const loginForm = document.getElementById("admin-login-form");
           const pendingSection = document.getElementById("pending-deletions");
           
+          const storedToken = localStorage.getItem("qepipeline_auth_token");
+          if (storedToken) {
+            // Already logged in as admin; the login token authorizes admin requests
+            adminToken = storedToken;
+            if (loginForm) {
+              loginForm.style.display = "none";
+            }
+            if (pendingSection) {
+              pendingSection.style.display = "block";
+            }
+            loadPendingDeletions();
+            return;
+          }
+          
           if (loginForm) {
             loginForm.style.display = "block";
             const usernameInput = document.getElementById("admin-username");
@@ -81,7 +99,7 @@ async function handleAdminLogin(event) {
   const pendingSection = document.getElementById("pending-deletions");
 
   adminUsername = document.getElementById("admin-username").value.trim();
-  adminPassword = document.getElementById("admin-password").value;
+  const adminPassword = document.getElementById("admin-password").value;
 
   if (!adminUsername || !adminPassword) {
     setStatus(statusEl, "Please enter admin credentials.", "error");
@@ -91,19 +109,24 @@ async function handleAdminLogin(event) {
   setStatus(statusEl, "Verifying admin access...");
 
   try {
-    // Test admin credentials by fetching pending deletions
-    const response = await apiFetch(
-      `${API_BASE_URL}/api/admin/pending-deletions?username=${encodeURIComponent(adminUsername)}&password=${encodeURIComponent(adminPassword)}`
-    );
+    // Log in once; bcrypt runs only for this request
+    const response = await apiFetch(`${API_BASE_URL}/api/login`, {
+      method: "POST",
+      body: JSON.stringify({ username: adminUsername, password: adminPassword }),
+    });
+
+    const result = await response.json();
 
     if (!response.ok) {
-      if (response.status === 401) {
-        throw new Error("Invalid admin credentials");
-      }
-      throw new Error("Failed to verify admin access");
+      throw new Error(result.error || "Invalid admin credentials");
     }
-
-    const result = await response.json();
+    if (!result.is_admin) {
+      throw new Error("This account does not have admin access");
+    }
+    if (!result.token) {
+      throw new Error("Admin access is disabled: the server has no SECRET_KEY configured");
+    }
+    adminToken = result.token;
     
     // Hide login form and show pending deletions
     if (loginForm) {
@@ -126,9 +149,17 @@ async function loadPendingDeletions() {
 
   try {
     const response = await apiFetch(
-      `${API_BASE_URL}/api/admin/pending-deletions?username=${encodeURIComponent(adminUsername)}&password=${encodeURIComponent(adminPassword)}`
+      `${API_BASE_URL}/api/admin/pending-deletions`
     );
 
+    if (response.status === 401) {
+      // Token expired or not an admin token: ask for credentials again
+      adminToken = "";
+      document.getElementById("admin-login-form").style.display = "block";
+      document.getElementById("pending-deletions").style.display = "none";
+      return;
+    }
+
     if (!response.ok) {
       throw new Error("Failed to load pending deletions");
     }
@@ -181,8 +212,6 @@ async function approveDeletion(projectId) {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify({
-        admin_username: adminUsername,
-        admin_password: adminPassword,
         project_id: projectId,
         approve: true
       }),
@@ -202,7 +231,7 @@ async function approveDeletion(projectId) {
     // Reload list
     loadPendingDeletions();
 
-    alert(`Project "${projectName}" deletion approved and project deleted successfully!`);
+    alert(`Project "${projectName}" deletion approved. Its shots, files and chats are being removed in the background.`);
   } catch (error) {
     alert(`Error: ${error.message}`);
     console.error("Approve deletion error:", error);
@@ -223,8 +252,6 @@ async function rejectDeletion(projectId) {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify({
-        admin_username: adminUsername,
-        admin_password: adminPassword,
         project_id: projectId,
         approve: false
       }),
@@ -7,6 +7,9 @@ async function apiFetch(url, options = {}) {
     'Content-Type': 'application/json',
     ...options.headers
   };
+  if (adminToken) {
+    headers['Authorization'] = `Bearer ${adminToken}`;
+  }
   
   const response = await fetch(url, {
     ...options,
@@ -17,7 +20,8 @@ async function apiFetch(url, options = {}) {
 }
 
 let adminUsername = "";
-let adminPassword = "";
+// Signed token from /api/login; admin requests send it instead of the password
+let adminToken = "";
 
 // Check if user is already logged in as admin
 function checkLoggedInAdmin() {
@@ -38,6 +42,20 @@ function checkLoggedInAdmin() {
           const loginForm = document.getElementById("admin-login-form");
           const pendingSection = document.getElementById("pending-registrations");
           
+          const storedToken = localStorage.getItem("qepipeline_auth_token");
+          if (storedToken) {
+            // Already logged in as admin; the login token authorizes admin requests
+            adminToken = storedToken;
+            if (loginForm) {
+              loginForm.style.display = "none";
+            }
+            if (pendingSection) {
+              pendingSection.style.display = "block";
+            }
+            loadPendingRegistrations();
+            return;
+          }
+          
           if (loginForm) {
             loginForm.style.display = "block";
             const usernameInput = document.getElementById("admin-username");
@@ -86,7 +104,7 @@ async function handleAdminLogin(event) {
   const pendingSection = document.getElementById("pending-registrations");
 
   adminUsername = document.getElementById("admin-username").value.trim();
-  adminPassword = document.getElementById("admin-password").value;
+  const adminPassword = document.getElementById("admin-password").value;
 
   if (!adminUsername || !adminPassword) {
     setStatus(statusEl, "Please enter admin credentials.", "error");
@@ -96,19 +114,24 @@ async function handleAdminLogin(event) {
   setStatus(statusEl, "Verifying admin access...");
 
   try {
-    // Test admin credentials by fetching pending registrations
-    const response = await apiFetch(
-      `${API_BASE_URL}/api/admin/pending?username=${encodeURIComponent(adminUsername)}&password=${encodeURIComponent(adminPassword)}`
-    );
+    // Log in once; bcrypt runs only for this request
+    const response = await apiFetch(`${API_BASE_URL}/api/login`, {
+      method: "POST",
+      body: JSON.stringify({ username: adminUsername, password: adminPassword }),
+    });
+
+    const result = await response.json();
 
     if (!response.ok) {
-      if (response.status === 401) {
-        throw new Error("Invalid admin credentials");
-      }
-      throw new Error("Failed to verify admin access");
+      throw new Error(result.error || "Invalid admin credentials");
     }
-
-    const result = await response.json();
+    if (!result.is_admin) {
+      throw new Error("This account does not have admin access");
+    }
+    if (!result.token) {
+      throw new Error("Admin access is disabled: the server has no SECRET_KEY configured");
+    }
+    adminToken = result.token;
     
     // Hide login form and show pending registrations
     if (loginForm) {
@@ -131,9 +154,17 @@ async function loadPendingRegistrations() {
 
   try {
     const response = await apiFetch(
-      `${API_BASE_URL}/api/admin/pending?username=${encodeURIComponent(adminUsername)}&password=${encodeURIComponent(adminPassword)}`
+      `${API_BASE_URL}/api/admin/pending`
     );
 
+    if (response.status === 401) {
+      // Token expired or not an admin token: ask for credentials again
+      adminToken = "";
+      document.getElementById("admin-login-form").style.display = "block";
+      document.getElementById("pending-registrations").style.display = "none";
+      return;
+    }
+
     if (!response.ok) {
       throw new Error("Failed to load pending registrations");
     }
@@ -178,8 +209,6 @@ async function approveRegistration(username) {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify({
-        admin_username: adminUsername,
-        admin_password: adminPassword,
         username: username,
         approve: true
       }),
@@ -217,8 +246,6 @@ async function rejectRegistration(username) {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify({
-        admin_username: adminUsername,
-        admin_password: adminPassword,
         username: username,
         approve: false
       }),
@@ -41,7 +41,11 @@ if (!window.chatState) {
     currentUser: null,
     lastMessageCheck: null, // Timestamp of last message check
     pollingInterval: null, // Interval ID for polling
-    isPolling: false // Flag to prevent multiple polling intervals
+    isPolling: false, // Flag to prevent multiple polling intervals
+    eventSource: null, // Server-push (SSE) connection
+    pushConnected: false, // True while the push channel is delivering events
+    pushRetryTimer: null, // Reopens the push channel after the server refused it
+    lastFullSync: 0 // Timestamp of last full poll
   };
 }
 
@@ -69,7 +73,11 @@ function initChat() {
       currentUser: null,
       lastMessageCheck: null,
       pollingInterval: null,
-      isPolling: false
+      isPolling: false,
+      eventSource: null,
+      pushConnected: false,
+      pushRetryTimer: null,
+      lastFullSync: 0
     };
     // Update reference
     Object.assign(chatState, window.chatState);
@@ -627,7 +635,7 @@ async function loadAllChatRooms() {
       // Load shot chat rooms for all relevant projects
       for (const projId of projectsToLoad) {
         try {
-          const shotsResponse = await apiFetch(`${getApiBaseUrl()}/api/project/${projId}/shots`);
+          const shotsResponse = await apiFetch(`${getApiBaseUrl()}/api/project/${projId}/shots?fields=shot_name`);
           if (shotsResponse.ok) {
             const shotsResult = await shotsResponse.json();
             if (shotsResult.shots && Array.isArray(shotsResult.shots)) {
@@ -1964,6 +1972,9 @@ function startChatPolling() {
   // Set flag to indicate polling is active
   chatState.isPolling = true;
   
+  // Prefer server push; polling below covers the gaps while it is unavailable
+  startChatPush();
+  
   // Poll every 2 seconds for real-time updates
   chatState.pollingInterval = setInterval(async () => {
     try {
@@ -1972,6 +1983,12 @@ function startChatPolling() {
         return;
       }
       
+      // While the push channel is connected, only resync every 30 seconds as a safety net
+      if (chatState.pushConnected && Date.now() - chatState.lastFullSync < 30000) {
+        return;
+      }
+      chatState.lastFullSync = Date.now();
+      
       // Check for new messages in the currently open chat room
       if (chatState.currentChatRoomId) {
         await checkForNewMessages();
@@ -1994,10 +2011,144 @@ function stopChatPolling() {
     clearInterval(chatState.pollingInterval);
     chatState.pollingInterval = null;
   }
+  stopChatPush();
   chatState.isPolling = false;
   console.log("⏹️ Stopped chat polling");
 }
 
+// Open the server-push (SSE) channel for chat events
+function startChatPush() {
+  stopChatPush();
+  
+  if (typeof EventSource === "undefined" || !chatState.currentUser || chatState.currentUser === "guest") {
+    return;
+  }
+  
+  const url = `${getApiBaseUrl()}/api/users/${encodeURIComponent(chatState.currentUser)}/events`;
+  const source = new EventSource(url);
+  chatState.eventSource = source;
+  
+  source.addEventListener("ready", () => {
+    if (source.wasConnected) {
+      // Reconnected (the server ends streams regularly): fetch what was sent in between
+      chatState.lastFullSync = 0;
+    } else {
+      console.log("✅ Chat push channel connected");
+    }
+    source.wasConnected = true;
+    chatState.pushConnected = true;
+  });
+  
+  source.addEventListener("message", (event) => {
+    handlePushedChatMessage(JSON.parse(event.data));
+  });
+  
+  source.addEventListener("read", (event) => {
+    handlePushedReadReceipt(JSON.parse(event.data));
+  });
+  
+  source.addEventListener("rooms_changed", () => {
+    checkForChatRoomUpdates();
+  });
+  
+  source.addEventListener("resync", () => {
+    // Server dropped events for this client, fall back to a full fetch
+    chatState.lastFullSync = 0;
+  });
+  
+  source.onerror = () => {
+    // EventSource reconnects on its own; resume polling until it does
+    chatState.pushConnected = false;
+    if (source.readyState === EventSource.CLOSED && chatState.eventSource === source) {
+      // Refused (e.g. 503 when the server has too many open streams): keep polling, retry later
+      chatState.eventSource = null;
+      chatState.pushRetryTimer = setTimeout(startChatPush, 60000);
+    }
+  };
+}
+
+// Close the server-push channel
+function stopChatPush() {
+  if (chatState.pushRetryTimer) {
+    clearTimeout(chatState.pushRetryTimer);
+    chatState.pushRetryTimer = null;
+  }
+  if (chatState.eventSource) {
+    chatState.eventSource.close();
+    chatState.eventSource = null;
+  }
+  chatState.pushConnected = false;
+}
+
+// Apply a new message delivered by the push channel
+function handlePushedChatMessage(event) {
+  const message = event.message;
+  if (!message) {
+    return;
+  }
+  
+  const isCurrentRoom = chatState.currentChatRoomId === event.chat_room_id;
+  const isOwnMessage = message.author_username === chatState.currentUser;
+  
+  if (isCurrentRoom && !chatState.messages.some(msg => msg._id === message._id)) {
+    chatState.messages.push(message);
+    renderMessages();
+    
+    const messagesList = document.getElementById("chat-messages-list");
+    if (messagesList) {
+      messagesList.scrollTop = messagesList.scrollHeight;
+    }
+    
+    if (!isOwnMessage) {
+      markChatRoomAsRead(event.chat_room_id);
+    }
+  }
+  
+  const chatRoomIndex = chatState.chatRooms.findIndex(room => room._id === event.chat_room_id);
+  if (chatRoomIndex < 0) {
+    // Room not in our list yet (e.g. just added as participant)
+    checkForChatRoomUpdates();
+    return;
+  }
+  
+  const chatRoom = chatState.chatRooms[chatRoomIndex];
+  chatRoom.lastMessageTime = message.created_at;
+  chatRoom.lastMessage = (message.content || "").substring(0, 100);
+  chatRoom.lastMessageAuthor = message.author_username || "";
+  if (!isCurrentRoom && !isOwnMessage) {
+    chatRoom.unreadCount = (chatRoom.unreadCount || 0) + 1;
+  }
+  
+  sortChatRoomsByLastMessage();
+  renderChatRoomsList();
+  
+  const totalUnread = chatState.chatRooms.reduce((sum, room) => sum + (room.unreadCount || 0), 0);
+  updateChatToggleButton(totalUnread);
+}
+
+// Apply a read receipt delivered by the push channel
+function handlePushedReadReceipt(event) {
+  if (event.username === chatState.currentUser) {
+    // Read in another tab: clear the badge here too
+    const chatRoomIndex = chatState.chatRooms.findIndex(room => room._id === event.chat_room_id);
+    if (chatRoomIndex >= 0 && chatState.chatRooms[chatRoomIndex].unreadCount) {
+      chatState.chatRooms[chatRoomIndex].unreadCount = 0;
+      renderChatRoomsList();
+      const totalUnread = chatState.chatRooms.reduce((sum, room) => sum + (room.unreadCount || 0), 0);
+      updateChatToggleButton(totalUnread);
+    }
+    return;
+  }
+  
+  if (chatState.currentChatRoomId !== event.chat_room_id) {
+    return;
+  }
+  
+  if (applyReadCursor(event.username, event.last_read_at)) {
+    renderMessages();
+  }
+}
+
 // Check for new messages in the current chat room
 async function checkForNewMessages() {
   if (!chatState.currentChatRoomId) {
@@ -2005,8 +2156,20 @@ async function checkForNewMessages() {
   }
   
   try {
-    const url = `${getApiBaseUrl()}/api/chat-room/${chatState.currentChatRoomId}/messages`;
-    const response = await apiFetch(url);
+    const chatRoomId = chatState.currentChatRoomId;
+    const lastKnownMessage = chatState.messages[chatState.messages.length - 1];
+    
+    // Only fetch messages newer than the ones we already have
+    let url = `${getApiBaseUrl()}/api/chat-room/${chatRoomId}/messages`;
+    if (lastKnownMessage && lastKnownMessage._id) {
+      url += `?after=${encodeURIComponent(lastKnownMessage._id)}`;
+    }
+    let response = await apiFetch(url);
+    
+    if (response.status === 400 && lastKnownMessage && lastKnownMessage.created_at) {
+      // The last known message was deleted: continue from its timestamp instead
+      response = await apiFetch(`${getApiBaseUrl()}/api/chat-room/${chatRoomId}/messages?after=${encodeURIComponent(lastKnownMessage.created_at)}`);
+    }
     
     if (!response.ok) {
       return;
@@ -2014,6 +2177,11 @@ async function checkForNewMessages() {
     
     const result = await response.json();
     
+    // User switched rooms while the request was in flight
+    if (chatRoomId !== chatState.currentChatRoomId) {
+      return;
+    }
+    
     if (result.messages && Array.isArray(result.messages)) {
       // Ensure all messages have read_by field
       result.messages.forEach(msg => {
@@ -2024,23 +2192,18 @@ async function checkForNewMessages() {
         }
       });
       
-      // Compare message count to detect new messages
-      const currentMessageCount = chatState.messages.length;
-      const newMessageCount = result.messages.length;
-      
-      // Check if messages have changed (new messages or read_by updates)
-      const messagesChanged = newMessageCount !== currentMessageCount ||
-        result.messages.some((msg, idx) => {
-          const currentMsg = chatState.messages[idx];
-          if (!currentMsg) return true;
-          const currentReadBy = (currentMsg.read_by || []).join(',');
-          const newReadBy = (msg.read_by || []).join(',');
-          return currentReadBy !== newReadBy;
-        });
+      const newMessages = result.messages.filter(msg => !chatState.messages.some(existing => existing._id === msg._id));
+      
+      // Delta responses carry read cursors instead of re-sending old messages
+      let readStatusChanged = false;
+      (result.read_cursors || []).forEach(cursor => {
+        if (applyReadCursor(cursor.username, cursor.last_read_at)) {
+          readStatusChanged = true;
+        }
+      });
       
-      if (messagesChanged) {
-        // Messages changed (new messages or read status updates), reload messages
-        chatState.messages = result.messages;
+      if (newMessages.length > 0) {
+        chatState.messages = chatState.messages.concat(newMessages);
         renderMessages();
         
         // Scroll to bottom to show new messages
@@ -2050,25 +2213,21 @@ async function checkForNewMessages() {
         }
         
         // Update last message time in chat rooms list
-        if (chatState.messages.length > 0) {
-          const lastMessage = chatState.messages[chatState.messages.length - 1];
-          const chatRoomIndex = chatState.chatRooms.findIndex(room => room._id === chatState.currentChatRoomId);
-          if (chatRoomIndex >= 0) {
-            chatState.chatRooms[chatRoomIndex].lastMessageTime = lastMessage.created_at;
-            chatState.chatRooms[chatRoomIndex].lastMessage = (lastMessage.content || "").substring(0, 100);
-            chatState.chatRooms[chatRoomIndex].lastMessageAuthor = lastMessage.author_username || "";
-            // Clear unread count since user is viewing the chat
-            chatState.chatRooms[chatRoomIndex].unreadCount = 0;
-            sortChatRoomsByLastMessage();
-            renderChatRoomsList();
-          }
+        const lastMessage = chatState.messages[chatState.messages.length - 1];
+        const chatRoomIndex = chatState.chatRooms.findIndex(room => room._id === chatState.currentChatRoomId);
+        if (chatRoomIndex >= 0) {
+          chatState.chatRooms[chatRoomIndex].lastMessageTime = lastMessage.created_at;
+          chatState.chatRooms[chatRoomIndex].lastMessage = (lastMessage.content || "").substring(0, 100);
+          chatState.chatRooms[chatRoomIndex].lastMessageAuthor = lastMessage.author_username || "";
+          // Clear unread count since user is viewing the chat
+          chatState.chatRooms[chatRoomIndex].unreadCount = 0;
+          sortChatRoomsByLastMessage();
+          renderChatRoomsList();
         }
         
         chatState.lastMessageCheck = new Date();
-      } else if (newMessageCount < currentMessageCount || 
-                 JSON.stringify(chatState.messages) !== JSON.stringify(result.messages)) {
-        // Messages might have been updated (e.g., read receipts), reload them
-        chatState.messages = result.messages;
+      } else if (readStatusChanged) {
+        // Read receipts changed, re-render
         renderMessages();
       }
     }
@@ -2078,6 +2237,30 @@ async function checkForNewMessages() {
   }
 }
 
+// Mark loaded messages as read by a user up to their read cursor
+// Returns true if any message's read_by changed
+function applyReadCursor(username, lastReadAt) {
+  if (!username || !lastReadAt) {
+    return false;
+  }
+  
+  const lastReadTime = new Date(lastReadAt).getTime();
+  let changed = false;
+  chatState.messages.forEach(msg => {
+    if (msg.author_username === username || !msg.created_at) {
+      return;
+    }
+    if (new Date(msg.created_at).getTime() <= lastReadTime) {
+      msg.read_by = Array.isArray(msg.read_by) ? msg.read_by : [];
+      if (!msg.read_by.includes(username)) {
+        msg.read_by.push(username);
+        changed = true;
+      }
+    }
+  });
+  return changed;
+}
+
 // Check for chat room updates (unread counts, last messages)
 async function checkForChatRoomUpdates() {
   try {
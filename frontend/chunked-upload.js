@@ -0,0 +1,169 @@
+// Chunked Upload - Shared resumable upload for project and shot files
+// Files are sent in chunks (POST /api/uploads, PUT chunks at offsets, POST commit).
+// A failed chunk is retried, and re-selecting the same file after a dropped
+// connection resumes from the last byte the server stored. Smaller files are
+// hashed first and skip the transfer when the server already has the content.
+
+const CHUNKED_UPLOAD_RETRIES = 5;
+const CHUNKED_UPLOAD_STORAGE_PREFIX = "qepipeline_upload_";
+// Files up to this size are hashed in the browser so content the server already has is not sent again
+const CHUNKED_UPLOAD_HASH_MAX_SIZE = 256 * 1024 * 1024;
+
+/**
+ * Send a request to the upload API with the ngrok header when needed
+ */
+async function chunkedUploadFetch(url, options = {}) {
+  const headers = { ...(options.headers || {}) };
+  if (window.API_BASE_URL && window.API_BASE_URL.includes("ngrok")) {
+    headers["ngrok-skip-browser-warning"] = "true";
+  }
+  return fetch(url, { ...options, headers });
+}
+
+/**
+ * Key under which an unfinished upload of this file is remembered
+ */
+function getChunkedUploadKey(targetType, targetId, file) {
+  return `${CHUNKED_UPLOAD_STORAGE_PREFIX}${targetType}_${targetId}_${file.name}_${file.size}_${file.lastModified}`;
+}
+
+/**
+ * SHA-256 of a file as hex, or null when the file is too large or hashing is unavailable
+ */
+async function hashFileForUpload(file) {
+  if (file.size > CHUNKED_UPLOAD_HASH_MAX_SIZE || !window.crypto || !window.crypto.subtle) {
+    return null;
+  }
+  try {
+    const digest = await window.crypto.subtle.digest("SHA-256", await file.arrayBuffer());
+    return Array.from(new Uint8Array(digest))
+      .map((byte) => byte.toString(16).padStart(2, "0"))
+      .join("");
+  } catch (error) {
+    console.warn("Could not hash file for upload:", error);
+    return null;
+  }
+}
+
+/**
+ * Find an unfinished upload of the same file, or start a new one
+ * Resolves to {upload} or, when the server already stores identical content, {file}
+ */
+async function getOrStartChunkedUpload(targetType, targetId, file, username) {
+  const storageKey = getChunkedUploadKey(targetType, targetId, file);
+  const existingId = localStorage.getItem(storageKey);
+
+  if (existingId) {
+    const response = await chunkedUploadFetch(`${window.API_BASE_URL}/api/uploads/${existingId}`);
+    if (response.ok) {
+      const result = await response.json();
+      if (result.upload && result.upload.file_size === file.size) {
+        return { upload: result.upload };
+      }
+    }
+    localStorage.removeItem(storageKey);
+  }
+
+  const response = await chunkedUploadFetch(`${window.API_BASE_URL}/api/uploads`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({
+      target_type: targetType,
+      target_id: targetId,
+      username: username,
+      filename: file.name,
+      file_size: file.size,
+      file_type: file.type || "application/octet-stream",
+      sha256: await hashFileForUpload(file),
+    }),
+  });
+  const result = await response.json();
+  if (!response.ok) {
+    throw new Error(result.error || "Failed to start upload");
+  }
+  if (result.deduplicated) {
+    return { file: result };
+  }
+
+  localStorage.setItem(storageKey, result.upload.upload_id);
+  return { upload: result.upload };
+}
+
+/**
+ * Upload a file in chunks and create its file record
+ * @param {string} targetType - "project" or "shot"
+ * @param {string} targetId - Project or shot ID
+ * @param {File} file - File to upload
+ * @param {string} username - Uploading user
+ * @param {Function} onProgress - Optional callback(bytesUploaded, totalBytes)
+ * @returns {Promise<Object>} The created file (file_id, filename, file_size, file_type)
+ */
+async function uploadFileInChunks(targetType, targetId, file, username, onProgress) {
+  const storageKey = getChunkedUploadKey(targetType, targetId, file);
+  const started = await getOrStartChunkedUpload(targetType, targetId, file, username);
+  if (started.file) {
+    // Identical content is already on the server; nothing to send
+    if (onProgress) {
+      onProgress(file.size, file.size);
+    }
+    return started.file;
+  }
+  let upload = started.upload;
+  let offset = upload.offset;
+  let failures = 0;
+
+  while (upload.status === "uploading" && offset < file.size) {
+    if (onProgress) {
+      onProgress(offset, file.size);
+    }
+
+    const chunk = file.slice(offset, Math.min(offset + upload.chunk_size, file.size));
+    let result = null;
+    try {
+      const response = await chunkedUploadFetch(
+        `${window.API_BASE_URL}/api/uploads/${upload.upload_id}?offset=${offset}`,
+        {
+          method: "PUT",
+          headers: { "Content-Type": "application/octet-stream" },
+          body: chunk,
+        }
+      );
+      result = await response.json();
+      if (!response.ok && response.status !== 409) {
+        throw new Error(result.error || "Failed to upload chunk");
+      }
+      failures = 0;
+    } catch (error) {
+      failures += 1;
+      if (failures > CHUNKED_UPLOAD_RETRIES) {
+        throw error;
+      }
+      // Back off, then resume from wherever the server got to
+      await new Promise((resolve) => setTimeout(resolve, 1000 * failures));
+      const response = await chunkedUploadFetch(`${window.API_BASE_URL}/api/uploads/${upload.upload_id}`);
+      if (!response.ok) {
+        continue;
+      }
+      result = await response.json();
+    }
+
+    // 200 and 409 both carry the server's current offset
+    upload = result.upload || upload;
+    offset = upload.offset;
+  }
+
+  if (onProgress) {
+    onProgress(file.size, file.size);
+  }
+
+  const response = await chunkedUploadFetch(`${window.API_BASE_URL}/api/uploads/${upload.upload_id}/commit`, {
+    method: "POST",
+  });
+  const result = await response.json();
+  if (!response.ok) {
+    throw new Error(result.error || "Failed to finish upload");
+  }
+
+  localStorage.removeItem(storageKey);
+  return result;
+}
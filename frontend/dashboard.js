@@ -93,6 +93,7 @@ function displayUserInfo(username) {
 // Logout function
 function handleLogout() {
   localStorage.removeItem("qepipeline_logged_in");
+  localStorage.removeItem("qepipeline_auth_token");
   localStorage.removeItem("qepipeline_username");
   window.location.href = "index.html";
 }
@@ -849,10 +850,12 @@ async function loadPartners(username) {
     let activeUsers = [];
     try {
       const API_BASE_URL = getAPIBaseURL();
-      const activeResponse = await fetch(`${API_BASE_URL}/api/users/active?minutes=5`);
+      const usernames = partners.map(partner => encodeURIComponent(partner.username)).join(',');
+      const activeResponse = await fetch(`${API_BASE_URL}/api/users/presence?minutes=5&usernames=${usernames}`);
       if (activeResponse.ok) {
         const activeResult = await activeResponse.json();
-        activeUsers = (activeResult.users || []).map(u => u.username);
+        const presence = activeResult.presence || {};
+        activeUsers = Object.keys(presence).filter(username => presence[username].active);
       }
     } catch (error) {
       console.error("Error loading active users:", error);
@@ -100,6 +100,11 @@ async function handleLogin(event) {
     // Save login session
     localStorage.setItem("qepipeline_username", username);
     localStorage.setItem("qepipeline_logged_in", "true");
+    if (result.token) {
+      localStorage.setItem("qepipeline_auth_token", result.token);
+    } else {
+      localStorage.removeItem("qepipeline_auth_token");
+    }
 
     if (rememberToggle && rememberToggle.checked) {
       localStorage.setItem("qepipeline_saved_username", username);
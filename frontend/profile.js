@@ -145,6 +145,7 @@ function escapeHtml(text) {
 // Logout function
 function handleLogout() {
   localStorage.removeItem("qepipeline_logged_in");
+  localStorage.removeItem("qepipeline_auth_token");
   localStorage.removeItem("qepipeline_username");
   window.location.href = "index.html";
 }
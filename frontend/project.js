@@ -35,6 +35,15 @@ async function apiFetch(url, options = {}) {
 let currentProjectId = null;
 let currentProject = null;
 
+// File lists are fetched one page at a time, with only the fields the list renders
+const FILES_PAGE_SIZE = 50;
+const FILE_LIST_FIELDS = "filename,file_type,file_size,author_name,author_username,created_at";
+// Shot list is paged by the server; only the fields the list renders are requested
+const SHOTS_PAGE_SIZE = 200;
+const SHOT_LIST_FIELDS = "shot_name,description";
+// Shots per thumbnail sprite sheet request (keeps the ids query under common 8 KB URL limits)
+const SHOT_SHEET_PAGE_SIZE = 200;
+
 // Check if user is logged in
 function checkAuth() {
   const loggedIn = localStorage.getItem("qepipeline_logged_in");
@@ -256,10 +265,12 @@ async function loadWorkers() {
     let activeUsers = [];
     try {
       const API_BASE_URL = getApiBaseUrl();
-      const activeResponse = await apiFetch(`${API_BASE_URL}/api/users/active?minutes=5`);
+      const usernames = workers.map(worker => encodeURIComponent(worker.username || worker)).join(',');
+      const activeResponse = await apiFetch(`${API_BASE_URL}/api/users/presence?minutes=5&usernames=${usernames}`);
       if (activeResponse.ok) {
         const activeResult = await activeResponse.json();
-        activeUsers = (activeResult.users || []).map(u => u.username);
+        const presence = activeResult.presence || {};
+        activeUsers = Object.keys(presence).filter(username => presence[username].active);
       }
     } catch (error) {
       console.error("Error loading active users:", error);
@@ -346,8 +357,49 @@ async function loadWorkers() {
   }
 }
 
+// Load the thumbnails of the listed shots from one sprite sheet per page of shots
+async function loadShotThumbnails(projectId, shots) {
+  const API_BASE_URL = getApiBaseUrl();
+  
+  for (let start = 0; start < shots.length; start += SHOT_SHEET_PAGE_SIZE) {
+    const ids = shots.slice(start, start + SHOT_SHEET_PAGE_SIZE).map(shot => shot._id);
+    try {
+      const response = await apiFetch(`${API_BASE_URL}/api/project/${projectId}/thumbnail-sheet?size=grid&ids=${ids.join(',')}`);
+      if (!response.ok) continue;
+      const sheet = await response.json();
+      
+      let sheetUrl = null;
+      if (sheet.sheet_url) {
+        const sheetResponse = await apiFetch(`${API_BASE_URL}${sheet.sheet_url}`);
+        if (sheetResponse.ok) {
+          sheetUrl = URL.createObjectURL(await sheetResponse.blob());
+        }
+      }
+      
+      for (const [shotId, tile] of Object.entries(sheet.shots)) {
+        const element = document.querySelector(`.shot-thumbnail[data-shot-id="${shotId}"]`);
+        if (!element) continue;
+        
+        if (sheetUrl) {
+          element.style.backgroundImage = `url(${sheetUrl})`;
+          element.style.backgroundPosition = `-${tile.x}px -${tile.y}px`;
+        } else {
+          // No sheet on this server; fall back to the shot's own (cacheable) thumbnail
+          const tileResponse = await apiFetch(`${API_BASE_URL}${tile.url}`);
+          if (!tileResponse.ok) continue;
+          element.style.backgroundImage = `url(${URL.createObjectURL(await tileResponse.blob())})`;
+          element.style.backgroundSize = "contain";
+          element.style.backgroundPosition = "center";
+        }
+      }
+    } catch (error) {
+      console.error("Error loading shot thumbnails:", error);
+    }
+  }
+}
+
 // Load shots
-async function loadShots(projectId) {
+async function loadShots(projectId, cursor = null) {
   const shotsList = document.getElementById("shots-list");
   
   if (!shotsList) {
@@ -363,7 +415,11 @@ async function loadShots(projectId) {
     
     console.log("Loading shots for project:", projectId);
     const API_BASE_URL = getApiBaseUrl();
-    const response = await apiFetch(`${API_BASE_URL}/api/project/${projectId}/shots`);
+    const params = new URLSearchParams({ limit: SHOTS_PAGE_SIZE, fields: SHOT_LIST_FIELDS });
+    if (cursor) {
+      params.set("cursor", cursor);
+    }
+    const response = await apiFetch(`${API_BASE_URL}/api/project/${projectId}/shots?${params}`);
     
     if (!response.ok) {
       const errorText = await response.text();
@@ -382,9 +438,13 @@ async function loadShots(projectId) {
     }
     
     const shots = result.shots || [];
-    console.log("Shots array:", shots);
     
-    if (shots.length === 0) {
+    const loadMoreBtn = shotsList.querySelector(".shot-list-load-more");
+    if (loadMoreBtn) {
+      loadMoreBtn.remove();
+    }
+    
+    if (shots.length === 0 && !cursor) {
       shotsList.innerHTML = `
         <div class="empty-state">
           <p>No shots yet.</p>
@@ -394,26 +454,43 @@ async function loadShots(projectId) {
       return;
     }
     
-    shotsList.innerHTML = shots.map(shot => {
-      console.log("Rendering shot:", shot);
-      return `
+    const shotsHtml = shots.map(shot => `
       <div class="shot-item" data-shot-id="${shot._id}">
+        <div class="shot-thumbnail" data-shot-id="${shot._id}"></div>
         <div class="shot-name">${escapeHtml(shot.shot_name || shot.name || 'Unnamed Shot')}</div>
         <div class="shot-description">${escapeHtml(shot.description || '')}</div>
       </div>
-    `;
-    }).join('');
+    `).join('');
     
-    // Add click handlers to shot items
-    document.querySelectorAll('.shot-item').forEach(item => {
-      item.addEventListener('click', () => {
-        const shotId = item.getAttribute('data-shot-id');
-        if (shotId) {
-          window.location.href = `shot.html?id=${shotId}`;
-        }
-      });
+    // Replace the list, or append the next page
+    if (cursor) {
+      shotsList.insertAdjacentHTML('beforeend', shotsHtml);
+    } else {
+      shotsList.innerHTML = shotsHtml;
+    }
+    
+    // Add click handlers to the new shot items
+    shots.forEach(shot => {
+      const item = shotsList.querySelector(`.shot-item[data-shot-id="${shot._id}"]`);
+      if (item) {
+        item.addEventListener('click', () => {
+          window.location.href = `shot.html?id=${shot._id}`;
+        });
+      }
     });
     
+    if (result.next_cursor) {
+      const moreBtn = document.createElement("button");
+      moreBtn.className = "file-item-btn shot-list-load-more";
+      moreBtn.textContent = "Load more";
+      moreBtn.addEventListener("click", () => {
+        loadShots(projectId, result.next_cursor);
+      });
+      shotsList.appendChild(moreBtn);
+    }
+    
+    loadShotThumbnails(projectId, shots);
+    
     console.log("Shots loaded successfully");
     
   } catch (error) {
@@ -1164,14 +1241,18 @@ function initProject() {
 }
 
 
-// Load project files
-async function loadProjectFiles() {
+// Load project files (pass the previous page's next_cursor to append the next page)
+async function loadProjectFiles(cursor = null) {
   if (!currentProjectId) {
     return;
   }
   
   try {
-    const response = await apiFetch(`${API_BASE_URL}/api/project/${currentProjectId}/files`);
+    const params = new URLSearchParams({ limit: FILES_PAGE_SIZE, fields: FILE_LIST_FIELDS });
+    if (cursor) {
+      params.set("cursor", cursor);
+    }
+    const response = await apiFetch(`${API_BASE_URL}/api/project/${currentProjectId}/files?${params}`);
     
     if (!response.ok) {
       console.error("Failed to load files");
@@ -1186,10 +1267,17 @@ async function loadProjectFiles() {
       return;
     }
     
-    // Clear existing files
-    filesList.innerHTML = "";
+    const loadMoreBtn = filesList.querySelector(".file-list-load-more");
+    if (loadMoreBtn) {
+      loadMoreBtn.remove();
+    }
+    
+    // Clear existing files (unless appending the next page)
+    if (!cursor) {
+      filesList.innerHTML = "";
+    }
     
-    if (files.length === 0) {
+    if (files.length === 0 && !cursor) {
       filesList.innerHTML = '<div class="chat-empty">No files uploaded yet.</div>';
       return;
     }
@@ -1269,6 +1357,16 @@ async function loadProjectFiles() {
       filesList.appendChild(fileEl);
     });
     
+    if (result.next_cursor) {
+      const moreBtn = document.createElement("button");
+      moreBtn.className = "file-item-btn file-list-load-more";
+      moreBtn.textContent = "Load more";
+      moreBtn.addEventListener("click", () => {
+        loadProjectFiles(result.next_cursor);
+      });
+      filesList.appendChild(moreBtn);
+    }
+    
   } catch (error) {
     console.error("Error loading files:", error);
   }
@@ -1310,19 +1408,8 @@ async function handleProjectFileUpload(files) {
   
   for (const file of files) {
     try {
-      const formData = new FormData();
-      formData.append("file", file);
-      formData.append("username", username);
-      
-      const response = await apiFetch(`${API_BASE_URL}/api/project/${currentProjectId}/files`, {
-        method: "POST",
-        body: formData,
-      });
-      
-      if (!response.ok) {
-        const result = await response.json();
-        throw new Error(result.error || "Failed to upload file");
-      }
+      // Chunked so large plates survive dropped connections (see chunked-upload.js)
+      await uploadFileInChunks("project", currentProjectId, file, username);
       
       // Reload files list
       await loadProjectFiles();
@@ -1405,6 +1492,7 @@ function displayUserInfo(username) {
 // Logout function
 function handleLogout() {
   localStorage.removeItem("qepipeline_logged_in");
+  localStorage.removeItem("qepipeline_auth_token");
   localStorage.removeItem("qepipeline_username");
   window.location.href = "index.html";
 }
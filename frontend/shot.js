@@ -36,6 +36,10 @@ let currentShotId = null;
 let currentShot = null;
 let currentProjectId = null;
 
+// File lists are fetched one page at a time, with only the fields the list renders
+const FILES_PAGE_SIZE = 50;
+const FILE_LIST_FIELDS = "filename,file_type,file_size,author_name,author_username,created_at";
+
 // Check if user is logged in
 function checkAuth() {
   const loggedIn = localStorage.getItem("qepipeline_logged_in");
@@ -144,7 +148,10 @@ async function loadThumbnail() {
   
   try {
     const API_BASE_URL = getApiBaseUrl();
-    const response = await apiFetch(`${API_BASE_URL}/api/shot/${currentShotId}/thumbnail`);
+    // The version makes the URL unique per upload, so the browser can cache it long-term
+    const version = currentShot && currentShot.thumbnail_version;
+    const versionParam = version ? `&v=${encodeURIComponent(version)}` : "";
+    const response = await apiFetch(`${API_BASE_URL}/api/shot/${currentShotId}/thumbnail?size=full${versionParam}`);
     if (response.ok) {
       const blob = await response.blob();
       const imageUrl = URL.createObjectURL(blob);
@@ -248,6 +255,11 @@ async function uploadThumbnail(file) {
           progressText.textContent = "Upload complete!";
         }
         
+        const result = JSON.parse(xhr.responseText);
+        if (currentShot) {
+          currentShot.thumbnail_version = result.thumbnail_version;
+        }
+        
         // Reload thumbnail
         setTimeout(() => {
           loadThumbnail();
@@ -327,6 +339,9 @@ async function handleRemoveThumbnail() {
     });
     
     if (response.ok) {
+      if (currentShot) {
+        delete currentShot.thumbnail_version;
+      }
       showThumbnailPlaceholder();
     } else {
       const result = await response.json();
@@ -756,9 +771,9 @@ async function handleDurationSave() {
       if (response.ok) {
         const result = await response.json();
         
-        // Update current shot data
+        // Update current shot data (the server returns the stored duration, including other tabs' edits)
         if (currentShot) {
-          currentShot.duration = {
+          currentShot.duration = result.duration || {
             start_frame: startFrame,
             end_frame: endFrame,
             total_frames: totalFrames,
@@ -1546,14 +1561,18 @@ function closeMediaFullscreen() {
 }
 
 
-// Load shot files
-async function loadShotFiles() {
+// Load shot files (pass the previous page's next_cursor to append the next page)
+async function loadShotFiles(cursor = null) {
   if (!currentShotId) {
     return;
   }
   
   try {
-    const response = await apiFetch(`${API_BASE_URL}/api/shot/${currentShotId}/files`);
+    const params = new URLSearchParams({ limit: FILES_PAGE_SIZE, fields: FILE_LIST_FIELDS });
+    if (cursor) {
+      params.set("cursor", cursor);
+    }
+    const response = await apiFetch(`${API_BASE_URL}/api/shot/${currentShotId}/files?${params}`);
     
     if (!response.ok) {
       console.error("Failed to load files");
@@ -1568,10 +1587,17 @@ async function loadShotFiles() {
       return;
     }
     
-    // Clear existing files
-    filesList.innerHTML = "";
+    const loadMoreBtn = filesList.querySelector(".file-list-load-more");
+    if (loadMoreBtn) {
+      loadMoreBtn.remove();
+    }
     
-    if (files.length === 0) {
+    // Clear existing files (unless appending the next page)
+    if (!cursor) {
+      filesList.innerHTML = "";
+    }
+    
+    if (files.length === 0 && !cursor) {
       filesList.innerHTML = '<div class="chat-empty">No files uploaded yet.</div>';
       return;
     }
@@ -1651,6 +1677,16 @@ async function loadShotFiles() {
       filesList.appendChild(fileEl);
     });
     
+    if (result.next_cursor) {
+      const moreBtn = document.createElement("button");
+      moreBtn.className = "file-item-btn file-list-load-more";
+      moreBtn.textContent = "Load more";
+      moreBtn.addEventListener("click", () => {
+        loadShotFiles(result.next_cursor);
+      });
+      filesList.appendChild(moreBtn);
+    }
+    
   } catch (error) {
     console.error("Error loading files:", error);
   }
@@ -1692,19 +1728,8 @@ async function handleShotFileUpload(files) {
   
   for (const file of files) {
     try {
-      const formData = new FormData();
-      formData.append("file", file);
-      formData.append("username", username);
-      
-      const response = await apiFetch(`${API_BASE_URL}/api/shot/${currentShotId}/files`, {
-        method: "POST",
-        body: formData,
-      });
-      
-      if (!response.ok) {
-        const result = await response.json();
-        throw new Error(result.error || "Failed to upload file");
-      }
+      // Chunked so large plates survive dropped connections (see chunked-upload.js)
+      await uploadFileInChunks("shot", currentShotId, file, username);
       
       // Reload files list
       await loadShotFiles();
@@ -2787,6 +2812,7 @@ function displayUserInfo(username) {
 // Logout function
 function handleLogout() {
   localStorage.removeItem("qepipeline_logged_in");
+  localStorage.removeItem("qepipeline_auth_token");
   localStorage.removeItem("qepipeline_username");
   window.location.href = "index.html";
 }